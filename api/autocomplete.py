@@ -0,0 +1,172 @@
+import re
+import time
+import threading
+from array import array
+from bisect import bisect_left
+
+from django.db.models import Count
+
+from contracts.models import Contract, DataVersion
+
+
+# How often, in seconds, the engine checks whether contract data has
+# changed. Until then, searches don't touch the database at all.
+VERSION_CHECK_INTERVAL = 5
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+# This mirrors the sanitization done by contracts.models.convert_to_tsquery.
+QUERY_JUNK_RE = re.compile(r'[^a-zA-Z\s]')
+
+
+def split_words(text):
+    '''
+    Splits text into lowercase words.
+
+    >>> split_words('Interpretation Services Class 4: Afrikan,Akan')
+    ['interpretation', 'services', 'class', '4', 'afrikan', 'akan']
+    '''
+
+    return WORD_RE.findall(text.lower())
+
+
+def split_query(query):
+    '''
+    Splits a search query into lowercase terms, the same way
+    convert_to_tsquery() does.
+
+    >>> split_query('senior typist (st)')
+    ['senior', 'typist', 'st']
+    '''
+
+    return QUERY_JUNK_RE.sub('', query).lower().split()
+
+
+class AutocompleteIndex(object):
+    '''
+    An immutable, in-memory index of labor categories and their counts.
+
+    Categories are stored in result order (by descending count, then by
+    name), so a set of matching category positions can be sorted to
+    get the results in order. Every distinct word in every category is
+    kept in a sorted list, along with the positions of the categories
+    containing it, so the words starting with a prefix can be found with
+    a binary search.
+    '''
+
+    def __init__(self, counts):
+        counts = sorted(counts, key=lambda item: (-item[1], item[0]))
+        self.categories = [name for name, _ in counts]
+        self.counts = [count for _, count in counts]
+        self.upper_categories = [name.upper() for name in self.categories]
+
+        postings = {}
+        for i, name in enumerate(self.categories):
+            for word in set(split_words(name)):
+                postings.setdefault(word, array('I')).append(i)
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _prefix_matches(self, prefix):
+        matches = set()
+        i = bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            matches.update(self.postings[i])
+            i += 1
+        return matches
+
+    def match_all(self, query):
+        '''
+        Returns the positions of the categories which, for every term in
+        the query, have a word starting with that term.
+        '''
+
+        matches = None
+        for term in split_query(query):
+            term_matches = self._prefix_matches(term)
+            matches = term_matches if matches is None else \
+                matches & term_matches
+            if not matches:
+                break
+        return sorted(matches or ())
+
+    def match_phrase(self, query):
+        '''
+        Returns the positions of the categories containing the query,
+        case-insensitively.
+        '''
+
+        query = query.upper()
+        return (i for i, name in enumerate(self.upper_categories)
+                if query in name)
+
+    def search(self, query, query_type='match_all', limit=None):
+        if query_type == 'match_phrase':
+            positions = self.match_phrase(query)
+        else:
+            positions = self.match_all(query)
+
+        results = []
+        for i in positions:
+            if limit is not None and len(results) >= limit:
+                break
+            results.append({
+                'labor_category': self.categories[i],
+                'count': self.counts[i],
+            })
+        return results
+
+
+class AutocompleteEngine(object):
+    '''
+    Serves labor category autocomplete results from an AutocompleteIndex
+    of current contracts, rebuilding the index when contract data has
+    changed (as indicated by DataVersion).
+    '''
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.index = None
+        self.version = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        '''
+        Rebuilds the index from the current contract data.
+        '''
+
+        # Get the version first, so that if the data changes while we
+        # load it, we'll notice next time.
+        version = DataVersion.get_current()
+        counts = Contract.objects.order_by()\
+            .values_list('labor_category')\
+            .annotate(count=Count('id'))
+        self.index = AutocompleteIndex(counts)
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def get_index(self):
+        '''
+        Returns the index, loading it if it's missing or (at most once
+        every check_interval seconds) if contract data has changed.
+        '''
+
+        with self.lock:
+            now = time.monotonic()
+            if self.index is None:
+                self.load()
+            elif now - self.checked_at >= self.check_interval:
+                self.checked_at = now
+                if DataVersion.get_current() != self.version:
+                    self.load()
+            return self.index
+
+    def search(self, query, query_type='match_all', limit=None):
+        return self.get_index().search(query, query_type, limit)
+
+
+autocomplete_engine = AutocompleteEngine()
@@ -0,0 +1,259 @@
+'''
+    This module provides caching of API results derived from Contract
+    data.
+
+    Cache keys include the current contracts.models.DataVersion token,
+    so cached results are invalidated as soon as any code path that
+    writes Contract data bumps the version.
+'''
+
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from contracts.models import DataVersion
+
+
+# The query params that affect the results of
+# api.views.get_contracts_queryset().
+CONTRACTS_QUERY_PARAMS = (
+    'q',
+    'experience_range',
+    'min_experience',
+    'max_experience',
+    'min_education',
+    'education',
+    'schedule',
+    'site',
+    'business_size',
+    'price',
+    'price__gte',
+    'price__lte',
+    'sort',
+    'query_type',
+    'exclude',
+)
+
+# Entries of LRUCache instances, and the total size of their pickled
+# values, keyed by their LOCATION, so that they are shared by all
+# threads in the process.
+_lru_caches = {}
+_lru_sizes = {}
+_lru_locks = {}
+
+
+class LRUCache(BaseCache):
+    '''
+    An in-process Django cache backend that evicts the least recently
+    used entry when it is full (unlike Django's LocMemCache, which
+    culls a fraction of its entries in arbitrary order).
+
+    Supports the standard TIMEOUT and OPTIONS['MAX_ENTRIES'] settings,
+    as well as OPTIONS['MAX_BYTES'], which limits the total size of the
+    cached (pickled) values. Values bigger than that aren't cached.
+    '''
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._max_bytes = options.get('MAX_BYTES')
+        self._name = name
+        self._cache = _lru_caches.setdefault(name, OrderedDict())
+        _lru_sizes.setdefault(name, 0)
+        self._lock = _lru_locks.setdefault(name, threading.RLock())
+
+    @property
+    def size(self):
+        '''
+        The total size, in bytes, of the cached values.
+        '''
+
+        return _lru_sizes[self._name]
+
+    def _remove(self, key):
+        # Must be called with the lock held. If key is None, removes the
+        # least recently used entry.
+        if key is None:
+            key, (expiry, pickled) = self._cache.popitem(last=False)
+        else:
+            expiry, pickled = self._cache.pop(key)
+        _lru_sizes[self._name] -= len(pickled)
+
+    def _get_live(self, key):
+        # Must be called with the lock held.
+        expiry, pickled = self._cache[key]
+        if expiry is not None and expiry <= time.time():
+            self._remove(key)
+            raise KeyError(key)
+        self._cache.move_to_end(key)
+        return pickled
+
+    def _set(self, key, value, timeout):
+        # Must be called with the lock held.
+        expiry = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if key in self._cache:
+            self._remove(key)
+        if self._max_bytes is not None and len(pickled) > self._max_bytes:
+            return
+        self._cache[key] = (expiry, pickled)
+        _lru_sizes[self._name] += len(pickled)
+        while (len(self._cache) > self._max_entries or
+               (self._max_bytes is not None and
+                _lru_sizes[self._name] > self._max_bytes)):
+            self._remove(None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._lock:
+            try:
+                self._get_live(key)
+                return False
+            except KeyError:
+                self._set(key, value, timeout)
+                return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._lock:
+            try:
+                pickled = self._get_live(key)
+            except KeyError:
+                return default
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._lock:
+            try:
+                self._get_live(key)
+                return True
+            except KeyError:
+                return False
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            _lru_sizes[self._name] = 0
+
+
+def normalize_query_params(query_params, keys, wage_field=None):
+    '''
+    Returns a JSON-serializable, order-independent representation of the
+    given keys of a QueryDict, suitable for use in a cache key.
+
+    If `wage_field` is provided, it replaces the `contract-year` param
+    it was derived from, and is used as the default `sort`, mirroring
+    api.views.get_contracts_queryset().
+
+    Examples:
+
+        >>> from django.http import QueryDict
+        >>> normalize_query_params(QueryDict('sort=b&q=a&foo=1'),
+        ...                        ['q', 'sort'])
+        [['q', ['a']], ['sort', ['b']]]
+        >>> normalize_query_params(QueryDict(''), ['sort'], wage_field='w')
+        [['sort', ['w']], ['wage_field', 'w']]
+    '''
+
+    normalized = {}
+
+    for key in keys:
+        values = query_params.getlist(key)
+        if values:
+            normalized[key] = values
+
+    if wage_field is not None:
+        normalized['wage_field'] = wage_field
+        if 'sort' in keys:
+            normalized.setdefault('sort', [wage_field])
+
+    return [[key, normalized[key]] for key in sorted(normalized)]
+
+
+class ResultCache:
+    '''
+    Caches the results of API queries in the Django cache named by
+    settings.API_CACHE, keeping count of hits and misses. If
+    settings.API_CACHE is None, nothing is cached.
+    '''
+
+    def __init__(self):
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'API_CACHE', None)
+        if alias is None:
+            return None
+        return caches[alias]
+
+    def make_key(self, namespace, params):
+        '''
+        Returns the cache key for the given namespace and normalized
+        params (see normalize_query_params()) at the current data
+        version, or None if caching is disabled.
+        '''
+
+        if self.cache is None:
+            return None
+        data = json.dumps([params, DataVersion.get_current()],
+                          sort_keys=True)
+        digest = hashlib.sha1(data.encode('utf-8')).hexdigest()
+        return 'api:{}:{}'.format(namespace, digest)
+
+    def get(self, key, default=None):
+        '''
+        Returns the result cached under the given key (as returned by
+        make_key()), or `default` if there isn't one.
+        '''
+
+        if key is None:
+            return default
+        sentinel = object()
+        result = self.cache.get(key, sentinel)
+        if result is sentinel:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return result
+
+    def set(self, key, result):
+        if key is not None:
+            self.cache.set(key, result)
+
+
+result_cache = ResultCache()
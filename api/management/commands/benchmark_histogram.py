@@ -0,0 +1,91 @@
+import random
+import timeit
+from array import array
+from unittest import mock
+
+import djclick as click
+
+from api import utils
+
+
+def legacy_get_histogram(values, num_bins=10):
+    '''
+    The original O(values * bins) implementation of
+    api.utils.get_histogram(), kept around for comparison.
+    '''
+
+    values = [float(v) for v in values]
+
+    if (len(values) == 0):
+        mn, mx = 0.0, 1.0
+    else:
+        mn, mx = min(values), max(values)
+
+    if (mn == mx):
+        mn -= 0.5
+        mx += 0.5
+
+    bin_width = (mx - mn) / num_bins
+
+    bins = [{
+        'min': mn + bin_width * i,
+        'max': mn + bin_width * (i + 1),
+        'count': 0
+    } for i in range(0, num_bins)]
+
+    for val in values:
+        for b in bins:
+            if (val >= b['min'] and val < b['max']):
+                b['count'] += 1
+        if (val == mx and b['max'] == mx):
+            b['count'] += 1
+
+    return bins
+
+
+def time_it(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+@click.command()
+@click.option('--bins', default=12, help='number of histogram bins')
+@click.option('--repeat', default=3, help='number of timing runs per case')
+@click.option('--sizes', default='10000,100000,1000000',
+              help='comma-separated list of input sizes')
+def command(bins, repeat, sizes):
+    '''
+    Benchmark the legacy histogram implementation against the current
+    one (with and without numpy) on random wage data.
+    '''
+
+    if utils.numpy is None:
+        click.echo('numpy is not installed; only the pure-Python '
+                   'implementation will be benchmarked.')
+
+    for size in [int(s) for s in sizes.split(',')]:
+        values = [round(random.uniform(10, 500), 2) for _ in range(size)]
+        doubles = array('d', values)
+
+        results = [
+            ('legacy', time_it(
+                lambda: legacy_get_histogram(values, bins), repeat)),
+        ]
+
+        with mock.patch.object(utils, 'numpy', None):
+            results.append(('python (list)', time_it(
+                lambda: utils.get_histogram(values, bins), repeat)))
+            results.append(("python (array('d'))", time_it(
+                lambda: utils.get_histogram(doubles, bins), repeat)))
+
+        if utils.numpy is not None:
+            results.append(('numpy (list)', time_it(
+                lambda: utils.get_histogram(values, bins), repeat)))
+            results.append(("numpy (array('d'))", time_it(
+                lambda: utils.get_histogram(doubles, bins), repeat)))
+
+        click.echo('{:,} values, {} bins:'.format(size, bins))
+        legacy_time = results[0][1]
+        for name, seconds in results:
+            click.echo('  {:<22} {:>9.4f}s  ({:.1f}x)'.format(
+                name, seconds, legacy_time / seconds
+            ))
@@ -0,0 +1,105 @@
+import re
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+
+from api.views import get_contracts_queryset
+
+
+# A representative mix of the filters that the rates API sees in practice.
+CANNED_QUERIES = (
+    ('default sort', ''),
+    ('keyword search', 'q=engineer'),
+    ('phrase search', 'q=business analyst&query_type=match_phrase'),
+    ('exact search', 'q=Business Analyst II&query_type=match_exact'),
+    ('schedule', 'schedule=MOBIS'),
+    ('site', 'site=customer'),
+    ('business size', 'business_size=s'),
+    ('education sort', 'sort=education_level'),
+    ('next year price', 'contract-year=1&price__gte=50&price__lte=150'),
+    ('combined', 'q=engineer&schedule=IT Schedule 70&site=contractor'
+                 '&business_size=o&min_education=BA&experience_range=5,10'),
+)
+
+WAGE_FIELDS = {
+    '1': 'next_year_price',
+    '2': 'second_year_price',
+}
+
+INDEX_USAGE_RE = re.compile(
+    r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)'
+    r'(?: Backward)? (?:using|on) (\S+)'
+)
+
+
+def get_queryset(querystring):
+    params = QueryDict(querystring)
+    wage_field = WAGE_FIELDS.get(params.get('contract-year'),
+                                 'current_price')
+    return get_contracts_queryset(params, wage_field)
+
+
+def explain(queryset, analyze=True):
+    '''
+    Returns the lines of the postgres query plan for the given queryset.
+    '''
+
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN ANALYZE ' if analyze else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_indexes_used(plan):
+    '''
+    Returns the names of the indexes used by a query plan.
+
+    >>> get_indexes_used([
+    ...     'Limit  (cost=0.29..2.84 rows=200 width=310)',
+    ...     '  ->  Index Scan using price_index on contracts_contract',
+    ...     '        ->  Bitmap Index Scan on search_index',
+    ... ])
+    ['price_index', 'search_index']
+    '''
+
+    return [match.group(1) for line in plan
+            for match in INDEX_USAGE_RE.finditer(line)]
+
+
+class Command(BaseCommand):
+    help = '''\
+    Runs EXPLAIN ANALYZE over a canned set of representative rates API
+    queries, to verify which indexes they use.
+    '''
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--no-analyze',
+            action='store_false',
+            dest='analyze',
+            default=True,
+            help='only plan the queries, without running them'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+
+        for name, querystring in CANNED_QUERIES:
+            # The API only ever fetches a page of results at a time.
+            queryset = get_queryset(querystring)[:settings.PAGINATION]
+            plan = explain(queryset, analyze=options['analyze'])
+            indexes = get_indexes_used(plan)
+
+            self.stdout.write('{} ({}): {}'.format(
+                name,
+                querystring or 'no params',
+                ', '.join(indexes) or 'no indexes used'
+            ))
+            if verbosity >= 2:
+                for line in plan:
+                    self.stdout.write('    ' + line)
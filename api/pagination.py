@@ -1,16 +1,48 @@
+import base64
+import binascii
+import functools
+import json
+import operator
 from collections import OrderedDict
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
 
 
-class ContractPagination(pagination.PageNumberPagination):
+class ContractStatsMixin():
+    '''
+    Adds the wage statistics passed to the constructor to
+    paginated responses.
+    '''
 
     def __init__(self, context):
         super().__init__()
         self.context = context
         self.page_size = settings.PAGINATION
 
+    def get_average(self):
+        return self.context.get('average', 0)
+
+    def get_minimum(self):
+        return self.context.get('minimum', 0)
+
+    def get_maximum(self):
+        return self.context.get('maximum', 0)
+
+    def get_wage_histogram(self):
+        return self.context.get('wage_histogram', [])
+
+    def get_first_standard_deviation(self):
+        return self.context.get('first_standard_deviation', 0)
+
+
+class ContractPagination(ContractStatsMixin,
+                         pagination.PageNumberPagination):
+
     def get_paginated_response(self, data):
         return Response(OrderedDict([
             ('count', self.page.paginator.count),
@@ -24,17 +56,168 @@ class ContractPagination(pagination.PageNumberPagination):
             ('results', data)
         ]))
 
-    def get_average(self):
-        return self.context.get('average', 0)
 
-    def get_minimum(self):
-        return self.context.get('minimum', 0)
+class ContractCursorPagination(ContractStatsMixin, pagination.BasePagination):
+    '''
+    Keyset pagination for contracts, used when the `cursor` query param
+    is present (an empty cursor means the first page).
 
-    def get_maximum(self):
-        return self.context.get('maximum', 0)
+    Rather than using an OFFSET, each page is fetched by filtering for
+    the contracts that sort after the last contract of the previous
+    page, which is identified by the cursor. Contracts are ordered by
+    the queryset's sort columns plus `id` as a tiebreaker, so every
+    page costs about the same to fetch.
 
-    def get_wage_histogram(self):
-        return self.context.get('wage_histogram', [])
+    When the `skip_stats` query param is truthy, the count and wage
+    statistics are omitted (i.e. null) on every page but the first.
+    '''
 
-    def get_first_standard_deviation(self):
-        return self.context.get('first_standard_deviation', 0)
+    cursor_query_param = 'cursor'
+
+    skip_stats_query_param = 'skip_stats'
+
+    @classmethod
+    def is_requested(cls, request):
+        return cls.cursor_query_param in request.query_params
+
+    @classmethod
+    def should_skip_stats(cls, request):
+        return bool(
+            request.query_params.get(cls.cursor_query_param) and
+            request.query_params.get(cls.skip_stats_query_param) in
+            ('1', 'true', 'yes', 'on')
+        )
+
+    @staticmethod
+    def get_ordering(queryset):
+        '''
+        Returns a list of (column, is_descending) tuples describing the
+        ordering of the given ContractsQuerySet, ending with `id`.
+        '''
+
+        ordering = []
+        for term in queryset.query.order_by:
+            column = term.lstrip('-')
+            if column == 'pk':
+                column = 'id'
+            ordering.append((column, term.startswith('-')))
+            if column == 'id':
+                break
+        else:
+            ordering.append(('id', False))
+        return ordering
+
+    @staticmethod
+    def apply_ordering(queryset, ordering):
+        return queryset.order_by(*[
+            ('-' if desc else '') + column for column, desc in ordering
+        ])
+
+    @staticmethod
+    def get_sort_value(obj, column):
+        return obj.serializable_value(column)
+
+    @staticmethod
+    def filter_after(queryset, ordering, values):
+        '''
+        Filters the queryset to the contracts that sort after the one
+        with the given values for the ordering columns. Postgres sorts
+        NULLs as larger than any other value, which is taken into
+        account.
+        '''
+
+        # A contract sorts after the cursor if, for some column, it sorts
+        # after the cursor's value and is equal to the cursor's values for
+        # all preceding columns.
+        after = []
+        equal_so_far = Q()
+        for (column, desc), value in zip(ordering, values):
+            if value is None:
+                if desc:
+                    after.append(
+                        equal_so_far & Q(**{column + '__isnull': False})
+                    )
+                equal = Q(**{column + '__isnull': True})
+            else:
+                if desc:
+                    later = Q(**{column + '__lt': value})
+                else:
+                    later = (Q(**{column + '__gt': value}) |
+                             Q(**{column + '__isnull': True}))
+                after.append(equal_so_far & later)
+                equal = Q(**{column: value})
+            equal_so_far &= equal
+
+        return queryset.filter(functools.reduce(operator.or_, after))
+
+    def encode_cursor(self, values):
+        data = json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+                .decode('utf-8')
+            )
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound('Invalid cursor')
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.skip_stats = self.should_skip_stats(request)
+
+        ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, ordering)
+
+        self.count = None
+        if not self.skip_stats:
+            self.count = queryset.count()
+
+        queryset = self.apply_ordering(queryset, ordering)
+        if cursor is not None:
+            queryset = self.filter_after(queryset, ordering, cursor)
+
+        results = list(queryset[:self.page_size + 1])
+        self.next_cursor = None
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_cursor = self.encode_cursor([
+                self.get_sort_value(results[-1], column)
+                for column, _ in ordering
+            ])
+
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.next_cursor)
+
+    def get_paginated_response(self, data):
+        stats = [
+            ('average', self.get_average()),
+            ('minimum', self.get_minimum()),
+            ('maximum', self.get_maximum()),
+            ('wage_histogram', self.get_wage_histogram()),
+            ('first_standard_deviation', self.get_first_standard_deviation()),
+        ]
+        if self.skip_stats:
+            stats = [(name, None) for name, _ in stats]
+
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            # Keyset pagination only moves forward.
+            ('previous', None),
+        ] + stats + [
+            ('results', data)
+        ]))
@@ -0,0 +1,22 @@
+from debug_toolbar.panels import Panel
+
+from .cache import result_cache
+
+
+class ResultCachePanel(Panel):
+    '''
+    A Django Debug Toolbar panel that displays the hit/miss counters
+    of the API result cache for the current process.
+    '''
+
+    title = 'API Result Cache'
+
+    template = 'api/panels/cache.html'
+
+    @property
+    def nav_subtitle(self):
+        stats = result_cache.get_stats()
+        return '{hits} hits, {misses} misses'.format(**stats)
+
+    def generate_stats(self, request, response):
+        self.record_stats(result_cache.get_stats())
@@ -1,13 +1,17 @@
+from unittest.mock import patch
 from django.test import TestCase, Client, override_settings
 from model_mommy import mommy
 from model_mommy.recipe import seq
-from contracts.models import Contract
+from contracts.models import Contract, DataVersion
 from contracts.mommy_recipes import get_contract_recipe
+from api import views
 
 from itertools import cycle
 
 
 RATES_API_PATH = '/api/rates/'
+RATES_CSV_API_PATH = '/api/rates/csv/'
+AUTOCOMPLETE_API_PATH = '/api/search/'
 
 
 @override_settings(PAGINATION=1)
@@ -41,6 +45,167 @@ class ContractsPaginationTest(TestCase):
         self.assertEqual(resp.status_code, 404)
 
 
+@override_settings(PAGINATION=1)
+class ContractsCursorPaginationTest(TestCase):
+
+    def setUp(self):
+        ContractsTest.make_test_set()
+        self.path = RATES_API_PATH
+
+    def get_all_pages(self, params):
+        params = dict(params, cursor='')
+        resp = self.client.get(self.path, params)
+        pages = [resp]
+        while resp.data['next']:
+            resp = self.client.get(resp.data['next'])
+            self.assertEqual(resp.status_code, 200)
+            pages.append(resp)
+        return pages
+
+    def get_ids(self, params):
+        return [result['id']
+                for resp in self.get_all_pages(params)
+                for result in resp.data['results']]
+
+    def test_first_page(self):
+        resp = self.client.get(self.path, {'cursor': ''})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 3)
+        self.assertEqual(resp.data['previous'], None)
+        self.assertIn('cursor=', resp.data['next'])
+        self.assertEqual([r['id'] for r in resp.data['results']], [3])
+
+    def test_pages_follow_sort_order(self):
+        self.assertEqual(self.get_ids({}), [3, 1, 2])
+        self.assertEqual(self.get_ids({'sort': '-current_price'}), [2, 1, 3])
+
+    def test_ties_are_broken_by_id(self):
+        self.assertEqual(self.get_ids({'sort': 'schedule'}), [1, 2, 3])
+        self.assertEqual(self.get_ids({'sort': '-schedule'}), [1, 2, 3])
+
+    def test_null_values_are_paged_through(self):
+        Contract.objects.filter(id=2).update(schedule='MOBIS')
+        self.assertEqual(self.get_ids({'sort': 'schedule'}), [2, 1, 3])
+        self.assertEqual(self.get_ids({'sort': '-schedule'}), [1, 3, 2])
+
+    def test_education_sort_is_supported(self):
+        self.assertEqual(self.get_ids({'sort': 'education_level'}),
+                         [1, 3, 2])
+        self.assertEqual(self.get_ids({'sort': '-education_level'}),
+                         [2, 3, 1])
+
+    def test_stats_are_skipped_on_later_pages_when_asked(self):
+        pages = self.get_all_pages({'skip_stats': '1'})
+        self.assertEqual(pages[0].data['count'], 3)
+        self.assertEqual(pages[0].data['minimum'], 16.0)
+        for resp in pages[1:]:
+            self.assertEqual(resp.data['count'], None)
+            self.assertEqual(resp.data['minimum'], None)
+            self.assertEqual(resp.data['wage_histogram'], None)
+
+    def test_stats_are_included_on_later_pages_by_default(self):
+        pages = self.get_all_pages({})
+        for resp in pages:
+            self.assertEqual(resp.data['count'], 3)
+            self.assertEqual(resp.data['maximum'], 50.0)
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(self.path, {'cursor': 'blarg'})
+        self.assertEqual(resp.status_code, 404)
+
+
+class RatesCSVTest(TestCase):
+
+    def get_csv_lines(self, params=None):
+        resp = self.client.get(RATES_CSV_API_PATH, params or {})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        if resp.streaming:
+            content = b''.join(resp.streaming_content)
+        else:
+            content = resp.content
+        return content.decode('utf-8').splitlines()
+
+    def test_streams_header_rows_and_results(self):
+        ContractsTest.make_test_set()
+        lines = self.get_csv_lines({'q': 'accounting', 'business_size': 's'})
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(
+            lines[1],
+            'accounting,None Specified,None Specified,None Specified,'
+            'small business,,,,,,,,,'
+        )
+        self.assertTrue(lines[2].startswith('Contract #,Business Size,'))
+
+    def test_rows_are_formatted(self):
+        ContractsTest.make_test_set()
+        lines = self.get_csv_lines({'q': 'accounting'})
+        self.assertEqual(
+            lines[3],
+            'ABC234,other than small business,,,,,,Numbers R Us,'
+            '"Accounting, CPA",Masters,5,50.00,,'
+        )
+
+    def test_rows_are_sorted(self):
+        ContractsTest.make_test_set()
+        lines = self.get_csv_lines({'sort': '-current_price'})
+        self.assertEqual([line.split(',')[0] for line in lines[3:]],
+                         ['ABC234', 'ABC123', 'ABC345'])
+
+    def test_header_rows_are_streamed_before_querying(self):
+        ContractsTest.make_test_set()
+        with patch.object(views, 'iter_values_list') as m:
+            m.return_value = iter([])
+            resp = self.client.get(RATES_CSV_API_PATH, {'q': 'accounting'})
+            first_chunk = next(iter(resp.streaming_content))
+            self.assertFalse(m.called)
+        self.assertEqual(len(first_chunk.decode('utf-8').splitlines()), 3)
+
+    def test_streams_more_than_one_chunk(self):
+        get_contract_recipe().make(_quantity=5)
+        with patch.object(views, 'CSV_CHUNK_SIZE', 2):
+            lines = self.get_csv_lines()
+        self.assertEqual(len(lines), 8)
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        get_contract_recipe().make(
+            _quantity=5,
+            labor_category=cycle(['Software Engineer', 'Engineer',
+                                  'Software Engineer', 'Accountant',
+                                  'Software Engineer'])
+        )
+        DataVersion.bump()
+
+    def test_empty_query_returns_nothing(self):
+        resp = self.client.get(AUTOCOMPLETE_API_PATH)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, [])
+
+    def test_results_are_ordered_by_count(self):
+        resp = self.client.get(AUTOCOMPLETE_API_PATH, {'q': 'engineer'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([dict(r) for r in resp.data], [
+            {'labor_category': 'Software Engineer', 'count': 3},
+            {'labor_category': 'Engineer', 'count': 1},
+        ])
+
+    def test_match_phrase_matches_substrings(self):
+        resp = self.client.get(AUTOCOMPLETE_API_PATH, {
+            'q': 'countan', 'query_type': 'match_phrase'
+        })
+        self.assertEqual([dict(r) for r in resp.data], [
+            {'labor_category': 'Accountant', 'count': 1},
+        ])
+
+    def test_results_are_limited(self):
+        with patch.object(views, 'MAX_AUTOCOMPLETE_RESULTS', 1):
+            resp = self.client.get(AUTOCOMPLETE_API_PATH, {'q': 'engineer'})
+        self.assertEqual(len(resp.data), 1)
+
+
 class ContractsTest(TestCase):
     """ tests for the /api/rates endpoint """
     BUSINESS_SIZES = ('small business', 'other than small business')
@@ -451,12 +616,12 @@ class ContractsTest(TestCase):
                                   'business_size': None}])
 
     def test_filter_by_year_out(self):
-        get_contract_recipe().make(_quantity=1)
+        contract = get_contract_recipe().make()
         resp = self.c.get(self.path, {'current-year': '2'})
         self.assertEqual(resp.status_code, 200)
 
         self.assertResultsEqual(resp.data['results'],
-                                [{'id': 28,
+                                [{'id': contract.id,
                                   'idv_piid': 'ABC1231',
                                   'vendor_name': 'CompanyName1',
                                   'labor_category': 'Business Analyst II',
@@ -0,0 +1,128 @@
+import unittest
+from itertools import cycle
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api import views
+from api.autocomplete import AutocompleteIndex, AutocompleteEngine
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import DataVersion
+
+
+COUNTS = [
+    ('Engineer', 1),
+    ('Software Engineer', 3),
+    ('Senior Software Engineer', 2),
+    ('Accountant', 2),
+    ('Interpretation Services Class 4: Afrikan,Akan', 1),
+]
+
+
+class AutocompleteIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AutocompleteIndex(COUNTS)
+
+    def search(self, query, query_type='match_all', limit=None):
+        return [r['labor_category']
+                for r in self.index.search(query, query_type, limit)]
+
+    def test_results_are_ordered_by_count_then_name(self):
+        self.assertEqual(self.search('engineer'), [
+            'Software Engineer', 'Senior Software Engineer', 'Engineer'
+        ])
+
+    def test_results_include_counts(self):
+        self.assertEqual(self.index.search('account'), [
+            {'labor_category': 'Accountant', 'count': 2}
+        ])
+
+    def test_match_all_requires_every_term_to_prefix_a_word(self):
+        self.assertEqual(self.search('soft eng'), [
+            'Software Engineer', 'Senior Software Engineer'
+        ])
+        self.assertEqual(self.search('sen eng'), [
+            'Senior Software Engineer'
+        ])
+        self.assertEqual(self.search('ware'), [])
+
+    def test_match_all_ignores_non_letters(self):
+        self.assertEqual(self.search('afrikan, (akan)'), [
+            'Interpretation Services Class 4: Afrikan,Akan'
+        ])
+        self.assertEqual(self.search('$@#%'), [])
+
+    def test_match_phrase_matches_substrings(self):
+        self.assertEqual(self.search('WARE eng', 'match_phrase'), [
+            'Software Engineer', 'Senior Software Engineer'
+        ])
+
+    def test_limit(self):
+        self.assertEqual(self.search('engineer', limit=1), [
+            'Software Engineer'
+        ])
+        self.assertEqual(self.search('n', 'match_phrase', limit=2), [
+            'Software Engineer', 'Accountant'
+        ])
+
+
+class AutocompleteEngineTests(TestCase):
+
+    def setUp(self):
+        get_contract_recipe().make(
+            _quantity=3, labor_category=cycle(['Tester', 'Manager']))
+        get_contract_recipe().make(labor_category='Tester',
+                                   current_price=None)
+        self.engine = AutocompleteEngine(check_interval=0)
+
+    def test_loads_counts_of_current_contracts(self):
+        self.assertEqual(self.engine.search('t'), [
+            {'labor_category': 'Tester', 'count': 2}
+        ])
+
+    def test_reloads_when_data_changes(self):
+        self.engine.search('t')
+        get_contract_recipe().make(labor_category='Tester')
+        DataVersion.bump()
+        self.assertEqual(self.engine.search('t'), [
+            {'labor_category': 'Tester', 'count': 3}
+        ])
+
+    def test_does_not_check_version_within_interval(self):
+        self.engine.check_interval = 60
+        self.engine.search('t')
+        get_contract_recipe().make(labor_category='Tester')
+        DataVersion.bump()
+        with mock.patch.object(self.engine, 'load') as load:
+            self.engine.search('t')
+        self.assertFalse(load.called)
+
+
+@override_settings(API_AUTOCOMPLETE_IN_MEMORY=True)
+class InMemoryAutocompleteApiTests(TestCase):
+
+    def setUp(self):
+        get_contract_recipe().make(
+            _quantity=3,
+            labor_category=cycle(['Software Engineer', 'Engineer']))
+        patcher = mock.patch.object(views, 'autocomplete_engine',
+                                    AutocompleteEngine())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_results_from_engine(self):
+        res = self.client.get('/api/search/', {'q': 'engineer'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data, [
+            {'labor_category': 'Software Engineer', 'count': 2},
+            {'labor_category': 'Engineer', 'count': 1},
+        ])
+
+    def test_match_phrase(self):
+        res = self.client.get('/api/search/', {
+            'q': 'ware', 'query_type': 'match_phrase'
+        })
+        self.assertEqual(res.data, [
+            {'labor_category': 'Software Engineer', 'count': 2},
+        ])
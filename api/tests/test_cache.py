@@ -0,0 +1,190 @@
+import unittest
+
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from model_mommy import mommy
+
+from api.cache import (LRUCache, ResultCache, normalize_query_params,
+                       result_cache)
+from contracts.loaders.upsert import upsert_contracts
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import Contract, DataVersion
+
+
+class LRUCacheTests(unittest.TestCase):
+
+    def make_cache(self, max_entries=2, max_bytes=None):
+        cache = LRUCache('test-lru', {'OPTIONS': {
+            'MAX_ENTRIES': max_entries,
+            'MAX_BYTES': max_bytes,
+        }})
+        cache.clear()
+        return cache
+
+    def test_get_and_set_work(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.get('foo'))
+        cache.set('foo', {'bar': 1})
+        self.assertEqual(cache.get('foo'), {'bar': 1})
+
+    def test_evicts_least_recently_used(self):
+        cache = self.make_cache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_add_does_not_overwrite(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add('a', 1))
+        self.assertFalse(cache.add('a', 2))
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_delete_works(self):
+        cache = self.make_cache()
+        cache.set('a', 1)
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_evicts_least_recently_used_when_too_big(self):
+        cache = self.make_cache(max_entries=10, max_bytes=250)
+        cache.set('a', b'a' * 100)
+        cache.set('b', b'b' * 100)
+        cache.get('a')
+        cache.set('c', b'c' * 100)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.size, 250)
+
+    def test_values_bigger_than_max_bytes_are_not_cached(self):
+        cache = self.make_cache(max_bytes=100)
+        cache.set('a', b'a')
+        cache.set('a', b'a' * 1000)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_expired_entries_are_not_returned(self):
+        cache = self.make_cache()
+        cache.set('a', 1, timeout=-1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_values_are_copied(self):
+        cache = self.make_cache()
+        value = [1]
+        cache.set('a', value)
+        value.append(2)
+        self.assertEqual(cache.get('a'), [1])
+
+
+class NormalizeQueryParamsTests(unittest.TestCase):
+
+    def test_param_order_does_not_matter(self):
+        self.assertEqual(
+            normalize_query_params(QueryDict('q=a&site=b'), ['q', 'site']),
+            normalize_query_params(QueryDict('site=b&q=a'), ['q', 'site'])
+        )
+
+    def test_unknown_params_are_ignored(self):
+        self.assertEqual(
+            normalize_query_params(QueryDict('q=a&_=123'), ['q']),
+            normalize_query_params(QueryDict('q=a'), ['q'])
+        )
+
+    def test_wage_field_is_default_sort(self):
+        self.assertEqual(
+            normalize_query_params(QueryDict(''), ['sort'],
+                                   wage_field='next_year_price'),
+            normalize_query_params(QueryDict('sort=next_year_price'),
+                                   ['sort'], wage_field='next_year_price')
+        )
+
+
+@override_settings(API_CACHE='api')
+class ResultCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache()
+        self.cache.cache.clear()
+
+    def test_counts_hits_and_misses(self):
+        key = self.cache.make_key('foo', [])
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, 'bar')
+        self.assertEqual(self.cache.get(key), 'bar')
+        self.assertEqual(self.cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_key_changes_when_data_version_is_bumped(self):
+        key = self.cache.make_key('foo', [])
+        DataVersion.bump()
+        self.assertNotEqual(self.cache.make_key('foo', []), key)
+
+    def test_key_changes_when_contracts_are_bulk_written(self):
+        key = self.cache.make_key('foo', [])
+        upsert_contracts([get_contract_recipe().prepare(schedule='PES')],
+                         Contract._base_manager.filter(schedule='PES'))
+        self.assertNotEqual(self.cache.make_key('foo', []), key)
+
+    @override_settings(API_CACHE=None)
+    def test_does_nothing_when_disabled(self):
+        key = self.cache.make_key('foo', [])
+        self.assertIsNone(key)
+        self.cache.set(key, 'bar')
+        self.assertIsNone(self.cache.get(key))
+
+
+@override_settings(API_CACHE='api')
+class CachedApiTests(TestCase):
+
+    def setUp(self):
+        result_cache.cache.clear()
+        result_cache.reset_stats()
+
+    def test_rates_are_invalidated_when_data_changes(self):
+        mommy.make(Contract, current_price=20, hourly_rate_year1=20)
+        res = self.client.get('/api/rates/')
+        self.assertEqual(res.data['count'], 1)
+
+        Contract.objects.filter(current_price=20).delete()
+        DataVersion.bump()
+        res = self.client.get('/api/rates/')
+        self.assertEqual(res.data['count'], 0)
+
+    def test_rates_are_cached(self):
+        mommy.make(Contract, current_price=20, hourly_rate_year1=20)
+        first = self.client.get('/api/rates/', {'histogram': 2})
+        second = self.client.get('/api/rates/', {'histogram': 2})
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(result_cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_rates_are_invalidated_by_bulk_writes(self):
+        upsert_contracts(
+            [get_contract_recipe().prepare(schedule='PES', current_price=20)],
+            Contract._base_manager.filter(schedule='PES'))
+        res = self.client.get('/api/rates/')
+        self.assertEqual(res.data['count'], 1)
+
+        upsert_contracts(
+            [get_contract_recipe().prepare(schedule='PES', current_price=20,
+                                           labor_category=category)
+             for category in ['Tester', 'Manager']],
+            Contract._base_manager.filter(schedule='PES'))
+        res = self.client.get('/api/rates/')
+        self.assertEqual(res.data['count'], 2)
+
+    def test_search_is_invalidated_when_data_changes(self):
+        mommy.make(Contract, labor_category='Tester', current_price=20,
+                   hourly_rate_year1=20)
+        DataVersion.bump()
+        res = self.client.get('/api/search/', {'q': 'test'})
+        self.assertEqual(len(res.data), 1)
+
+        mommy.make(Contract, labor_category='Tester', current_price=20,
+                   hourly_rate_year1=20)
+        DataVersion.bump()
+        res = self.client.get('/api/search/', {'q': 'test'})
+        self.assertEqual(res.data[0]['count'], 2)
@@ -0,0 +1,33 @@
+import io
+
+from django.test import TestCase
+from django.core.management import call_command
+
+from contracts.mommy_recipes import get_contract_recipe
+from ..management.commands import explain_api_queries
+
+
+class ExplainApiQueriesTests(TestCase):
+    def setUp(self):
+        get_contract_recipe().make(_quantity=5)
+
+    def test_explains_every_canned_query(self):
+        output = io.StringIO()
+        call_command('explain_api_queries', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), len(explain_api_queries.CANNED_QUERIES))
+        for (name, _), line in zip(explain_api_queries.CANNED_QUERIES,
+                                   lines):
+            self.assertTrue(line.startswith(name))
+
+    def test_verbose_output_includes_plan(self):
+        output = io.StringIO()
+        call_command('explain_api_queries', analyze=False, verbosity=2,
+                     stdout=output)
+        self.assertRegex(output.getvalue(), 'cost=')
+
+    def test_explain_returns_plan_lines(self):
+        queryset = explain_api_queries.get_queryset('schedule=MOBIS')
+        plan = explain_api_queries.explain(queryset, analyze=False)
+        self.assertTrue(len(plan) > 0)
+        self.assertRegex(plan[0], 'cost=')
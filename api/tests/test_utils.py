@@ -2,8 +2,15 @@
 import unittest
 import random
 import decimal
+from array import array
+from unittest import mock
 
-from api.utils import get_histogram
+from django.test import TestCase
+from model_mommy import mommy
+
+from api import utils
+from api.utils import get_histogram, get_wage_stats
+from contracts.models import Contract
 
 
 class HistogramTests(unittest.TestCase):
@@ -58,3 +65,109 @@ class HistogramTests(unittest.TestCase):
         mn = min(values)
         self.assertEqual(bins[0]['min'], mn)
         self.assertEqual(bins[-1]['max'], mx)
+
+    def test_max_value_lands_in_last_bin(self):
+        values = [0.1, 0.2, 0.3]
+        bins = get_histogram(values, 7)
+        self.assertEqual(bins[-1]['count'], 1)
+        self.assertEqual(sum(b['count'] for b in bins), 3)
+
+    def test_accepts_double_arrays_and_buffers(self):
+        values = [round(random.random() * 100, 2) for _ in range(1000)]
+        expected = get_histogram(values, 9)
+        doubles = array('d', values)
+        self.assertEqual(get_histogram(doubles, 9), expected)
+        self.assertEqual(get_histogram(memoryview(doubles), 9), expected)
+        self.assertEqual(get_histogram(doubles.tobytes(), 9), expected)
+
+    def test_accepts_iterators(self):
+        values = [1, 2, 3, 4]
+        self.assertEqual(get_histogram(iter(values), 3),
+                         get_histogram(values, 3))
+
+
+class PurePythonHistogramTests(HistogramTests):
+
+    def setUp(self):
+        patcher = mock.patch.object(utils, 'numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class WageStatsTests(TestCase):
+
+    def make_contracts(self, prices):
+        for price in prices:
+            mommy.make(Contract, hourly_rate_year1=price, current_price=price)
+
+    def test_returns_none_on_empty_input(self):
+        stats = get_wage_stats(Contract.objects.all(), 'current_price')
+        self.assertIsNone(stats['minimum'])
+        self.assertIsNone(stats['maximum'])
+        self.assertIsNone(stats['average'])
+        self.assertIsNone(stats['stddev'])
+        self.assertNotIn('wage_histogram', stats)
+
+    def test_histogram_on_empty_input_matches_get_histogram(self):
+        stats = get_wage_stats(Contract.objects.all(), 'current_price',
+                               num_bins=10)
+        self.assertEqual(stats['wage_histogram'], get_histogram([], 10))
+
+    def test_computes_stats(self):
+        self.make_contracts([16, 18, 50])
+        stats = get_wage_stats(Contract.objects.all(), 'current_price')
+        self.assertEqual(stats['minimum'], 16)
+        self.assertEqual(stats['maximum'], 50)
+        self.assertEqual(stats['average'], 28)
+        self.assertEqual(int(stats['stddev']), 15)
+
+    def test_histogram_matches_get_histogram(self):
+        prices = [random.randrange(11, 200) for _ in range(50)]
+        self.make_contracts(prices)
+        stats = get_wage_stats(Contract.objects.all(), 'current_price',
+                               num_bins=7)
+        self.assertEqual(stats['wage_histogram'], get_histogram(prices, 7))
+
+    def test_histogram_matches_get_histogram_on_bin_edges(self):
+        # Cent values that lie on (or within rounding error of) a bin edge,
+        # where naively scaling each value into a bin disagrees with
+        # comparing it against the edges themselves.
+        for prices, num_bins in [
+            (['44.31', '91.13', '114.54'], 3),
+            (['10.00', '10.10', '10.20', '10.30'], 3),
+            (['0.10', '0.20', '0.30', '0.70'], 6),
+            (['12.01', '33.34', '54.67', '76.00'], 3),
+        ]:
+            prices = [decimal.Decimal(p) for p in prices]
+            Contract.objects.all().delete()
+            self.make_contracts(prices)
+            stats = get_wage_stats(Contract.objects.all(), 'current_price',
+                                   num_bins=num_bins)
+            self.assertEqual(stats['wage_histogram'],
+                             get_histogram(prices, num_bins),
+                             msg='%s, %d bins' % (prices, num_bins))
+
+    def test_histogram_when_inputs_are_same_value(self):
+        self.make_contracts([20, 20])
+        stats = get_wage_stats(Contract.objects.all(), 'current_price',
+                               num_bins=2)
+        self.assertEqual(stats['wage_histogram'],
+                         get_histogram([20, 20], 2))
+
+    def test_works_with_sorted_and_filtered_querysets(self):
+        self.make_contracts([16, 18, 50])
+        qs = Contract.objects.filter(current_price__gt=17)\
+            .order_by('-education_level')
+        stats = get_wage_stats(qs, 'current_price', num_bins=2)
+        self.assertEqual(stats['minimum'], 18)
+        self.assertEqual([b['count'] for b in stats['wage_histogram']],
+                         [1, 1])
+
+    def test_raises_on_invalid_num_bins(self):
+        self.assertRaises(
+            ValueError,
+            get_wage_stats,
+            Contract.objects.all(),
+            'current_price',
+            0
+        )
@@ -1,24 +1,26 @@
+import uuid
+from array import array
 
+from django.db import connection, connections, transaction
+from django.db.backends.utils import CursorWrapper
 
-def get_histogram(values, num_bins=10):
-    """
-    Get a histogram of a list of numeric values.
-    Returns array of "bin" dicts with keys `count`, `max`, and `min`.
-    """
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-    if (num_bins <= 0):
-        raise ValueError('num_bins must be greater than 0')
 
-    # convert values to floats
-    values = [float(v) for v in values]
+def _get_histogram_range(mn, mx):
+    '''
+    Return the (min, max) range the histogram bins should span, given
+    the min and max of the values being binned (or None if there
+    are no values).
+    '''
 
     # When input array is empty, can't determine range so use 0.0 - 1.0
     # as numpy.histogram does
-    if (len(values) == 0):
+    if mn is None or mx is None:
         mn, mx = 0.0, 1.0
-    else:
-        # find the min and max
-        mn, mx = min(values), max(values)
 
     # Adjust mn and mx if they are equivalent (ie, the input array
     # values are all the same number)
@@ -26,22 +28,281 @@ def get_histogram(values, num_bins=10):
         mn -= 0.5
         mx += 0.5
 
+    return mn, mx
+
+
+def _make_bins(mn, mx, num_bins):
     bin_width = (mx - mn) / num_bins
 
-    # initialize the bins
-    bins = [{
+    return [{
         'min': mn + bin_width * i,
         'max': mn + bin_width * (i + 1),
         'count': 0
     } for i in range(0, num_bins)]
 
-    # bin the values
+
+def _as_float_array(values):
+    '''
+    Convert the given values to a one-dimensional numpy array of floats,
+    avoiding a copy when they are already a float buffer (e.g. an
+    `array('d')` or a memoryview of one).
+    '''
+
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return numpy.frombuffer(values, dtype=float)
+    if isinstance(values, (list, tuple, array)) or \
+            hasattr(values, '__array__'):
+        return numpy.asarray(values, dtype=float)
+    return numpy.fromiter((float(v) for v in values), dtype=float)
+
+
+def _as_float_sequence(values):
+    '''
+    Pure-Python counterpart of _as_float_array().
+    '''
+
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        view = memoryview(values)
+        if view.format != 'd':
+            view = view.cast('B').cast('d')
+        return view
+    if isinstance(values, array) and values.typecode == 'd':
+        return values
+    return [float(v) for v in values]
+
+
+def _count_bins_numpy(values, edges):
+    num_bins = len(edges) - 1
+    mn, mx = edges[0], edges[-1]
+    edges = numpy.asarray(edges)
+
+    # Compute a first guess of each value's bin arithmetically, then nudge
+    # it by one bin where floating point rounding put it on the wrong side
+    # of an edge, so we get exactly the same results as comparing each
+    # value against each bin's `min` and `max`.
+    indices = ((values - mn) * (num_bins / (mx - mn))).astype(int)
+    numpy.clip(indices, 0, num_bins - 1, out=indices)
+    indices -= (values < edges[indices]) & (indices > 0)
+    indices += (values >= edges[indices + 1]) & (indices < num_bins - 1)
+
+    return numpy.bincount(indices, minlength=num_bins).tolist()
+
+
+def _count_bins_python(values, edges):
+    num_bins = len(edges) - 1
+    mn, mx = edges[0], edges[-1]
+    scale = num_bins / (mx - mn)
+    last = num_bins - 1
+    counts = [0] * num_bins
+
     for val in values:
-        for b in bins:
-            if (val >= b['min'] and val < b['max']):
-                b['count'] += 1
-        # correction for when a value == the max value
-        if (val == mx and b['max'] == mx):
-            b['count'] += 1
+        i = int((val - mn) * scale)
+        if i > last:
+            i = last
+        elif i < 0:
+            i = 0
+        if i > 0 and val < edges[i]:
+            i -= 1
+        elif i < last and val >= edges[i + 1]:
+            i += 1
+        counts[i] += 1
+
+    return counts
+
+
+def get_histogram(values, num_bins=10):
+    """
+    Get a histogram of a list of numeric values.
+    Returns array of "bin" dicts with keys `count`, `max`, and `min`.
+
+    `values` may be any iterable of numbers, or a buffer of doubles
+    such as an `array('d')`. Values are binned in a single pass, using
+    numpy if it is installed.
+    """
+
+    if (num_bins <= 0):
+        raise ValueError('num_bins must be greater than 0')
+
+    if numpy is not None:
+        values = _as_float_array(values)
+    else:
+        values = _as_float_sequence(values)
+
+    if (len(values) == 0):
+        mn, mx = _get_histogram_range(None, None)
+    elif numpy is not None:
+        mn, mx = _get_histogram_range(float(values.min()),
+                                      float(values.max()))
+    else:
+        # find the min and max
+        mn, mx = _get_histogram_range(min(values), max(values))
+
+    # initialize the bins
+    bins = _make_bins(mn, mx, num_bins)
+
+    if len(values):
+        # the lower edge of each bin, plus the upper edge of the last
+        # one, which is always the max value so that it lands in the
+        # last bin
+        edges = [b['min'] for b in bins] + [mx]
+
+        if numpy is not None:
+            counts = _count_bins_numpy(values, edges)
+        else:
+            counts = _count_bins_python(values, edges)
+
+        for b, count in zip(bins, counts):
+            b['count'] = count
 
     return bins
+
+
+WAGE_STATS_SQL = '''
+    WITH wages AS (
+        SELECT wage FROM ({values_sql}) AS filtered (wage)
+    ), stats AS (
+        SELECT MIN(wage) AS minimum,
+               MAX(wage) AS maximum,
+               AVG(wage) AS average,
+               STDDEV_POP(wage) AS stddev
+        FROM wages
+    )
+    SELECT minimum, maximum, average, stddev FROM stats
+'''
+
+WAGE_STATS_WITH_HISTOGRAM_SQL = '''
+    WITH settings AS (
+        SELECT %s::int AS num_bins
+    ), wages AS (
+        SELECT wage::float8 AS wage, wage AS exact_wage
+        FROM ({values_sql}) AS filtered (wage)
+    ), stats AS (
+        SELECT MIN(exact_wage) AS minimum,
+               MAX(exact_wage) AS maximum,
+               AVG(exact_wage) AS average,
+               STDDEV_POP(exact_wage) AS stddev,
+               MIN(wage) AS lo,
+               MAX(wage) AS hi
+        FROM wages
+    ), bounds AS (
+        -- The same range as _get_histogram_range().
+        SELECT CASE WHEN lo = hi THEN lo - 0.5::float8 ELSE lo END AS mn,
+               CASE WHEN lo = hi THEN hi + 0.5::float8 ELSE hi END AS mx
+        FROM stats
+    ), guesses AS (
+        -- A first guess of each wage's (zero-based) bin, computed the
+        -- same way as in _count_bins_python().
+        SELECT wage, mn, num_bins,
+               (mx - mn) / num_bins AS bin_width,
+               LEAST(GREATEST(
+                   FLOOR((wage - mn) * (num_bins / (mx - mn)))::int, 0
+               ), num_bins - 1) AS guess
+        FROM wages, bounds, settings
+    ), buckets AS (
+        -- Nudge each guess by one bin where floating point rounding put
+        -- it on the wrong side of an edge, comparing against the same
+        -- `mn + bin_width * i` edges that get_histogram() uses.
+        SELECT CASE
+                   WHEN guess > 0 AND wage < mn + bin_width * guess
+                       THEN guess - 1
+                   WHEN guess < num_bins - 1 AND
+                        wage >= mn + bin_width * (guess + 1)
+                       THEN guess + 1
+                   ELSE guess
+               END AS bucket,
+               COUNT(*) AS count
+        FROM guesses
+        GROUP BY bucket
+    )
+    SELECT minimum, maximum, average, stddev, lo, hi, bucket, count
+    FROM stats LEFT JOIN buckets ON TRUE
+'''
+
+
+def get_wage_stats(queryset, wage_field, num_bins=None):
+    '''
+    Compute the minimum, maximum, average and population standard
+    deviation of `wage_field` over the given queryset in a single
+    database round trip.
+
+    If `num_bins` is given, a histogram of the wages (with the same
+    shape and edge semantics as get_histogram()) is computed in the same
+    query and included under the `wage_histogram` key.
+    '''
+
+    if num_bins is not None and num_bins <= 0:
+        raise ValueError('num_bins must be greater than 0')
+
+    values_sql, params = queryset.order_by().values_list(wage_field)\
+        .query.sql_with_params()
+    params = list(params)
+
+    if num_bins is None:
+        sql = WAGE_STATS_SQL.format(values_sql=values_sql)
+    else:
+        sql = WAGE_STATS_WITH_HISTOGRAM_SQL.format(values_sql=values_sql)
+        params = [num_bins] + params
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    minimum, maximum, average, stddev = rows[0][:4]
+    stats = {
+        'minimum': minimum,
+        'maximum': maximum,
+        'average': average,
+        'stddev': stddev,
+    }
+
+    if num_bins is not None:
+        lo, hi = rows[0][4:6]
+        mn, mx = _get_histogram_range(lo, hi)
+        bins = _make_bins(mn, mx, num_bins)
+        for row in rows:
+            bucket, count = row[6:8]
+            if bucket is not None:
+                bins[bucket]['count'] = count
+        stats['wage_histogram'] = bins
+
+    return stats
+
+
+def iter_values_list(queryset, fields, chunk_size=2000):
+    '''
+    Yields tuples of the given fields for every row of the queryset,
+    like `queryset.values_list(*fields).iterator()`, but using a
+    server-side cursor so that only `chunk_size` rows are ever held in
+    memory at once.
+
+    A server-side cursor only lives as long as the transaction it was
+    opened in, so the rows are read inside a transaction (or a savepoint
+    of the caller's) on the queryset's database, which stays open until
+    the generator is exhausted or closed. Callers mustn't commit or roll
+    back that database's transaction while they're still iterating.
+    '''
+
+    using = queryset.db
+    db = connections[using]
+    sql, params = queryset.values_list(*fields).query\
+        .get_compiler(using).as_sql()
+
+    with transaction.atomic(using=using):
+        # Django's cursor() doesn't support named cursors, so we open one
+        # on the underlying psycopg2 connection and wrap it ourselves, to
+        # get the same error handling and query logging.
+        with db.wrap_database_errors:
+            raw_cursor = db.connection.cursor(
+                name='iter_values_list_{}'.format(uuid.uuid4().hex)
+            )
+        raw_cursor.itersize = chunk_size
+        if db.queries_logged:
+            cursor = db.make_debug_cursor(raw_cursor)
+        else:
+            cursor = CursorWrapper(raw_cursor, db)
+        try:
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
@@ -1,16 +1,42 @@
-from django.http import HttpResponse
-from django.db.models import Avg, Max, Min, Count, Q, StdDev
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Q
 from decimal import Decimal
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.pagination import ContractPagination
+from api.autocomplete import autocomplete_engine
+from api.cache import (result_cache, normalize_query_params,
+                       CONTRACTS_QUERY_PARAMS)
+from api.pagination import ContractPagination, ContractCursorPagination
 from api.serializers import ContractSerializer
-from api.utils import get_histogram
-from contracts.models import Contract, EDUCATION_CHOICES
+from api.utils import get_wage_stats, iter_values_list
+from contracts.models import (Contract, LaborCategoryCount,
+                              EDUCATION_CHOICES)
 
 import csv
+import io
+
+# CSV exports larger than this many bytes won't be cached.
+MAX_CACHED_CSV_SIZE = 1024 * 1024
+
+# The number of rows fetched from the database, and written to the
+# client, at a time when streaming CSV exports.
+CSV_CHUNK_SIZE = 2000
+
+# The Contract fields in each row of CSV exports, in column order.
+CSV_FIELDS = (
+    'idv_piid', 'business_size', 'schedule', 'contractor_site',
+    'contract_start', 'contract_end', 'sin', 'vendor_name',
+    'labor_category', 'education_level', 'min_years_experience',
+    'current_price', 'next_year_price', 'second_year_price',
+)
+
+EDUCATION_LEVELS = dict(EDUCATION_CHOICES)
+
+# The data explorer only ever shows this many autocomplete suggestions.
+MAX_AUTOCOMPLETE_RESULTS = 20
 
 
 def get_contracts_queryset(request_params, wage_field):
@@ -146,29 +172,59 @@ class GetRates(APIView):
 
         wage_field = self.get_wage_field(
             request.query_params.get('contract-year'))
+
+        # The pagination links are absolute URLs, so the URL we're being
+        # accessed at needs to be part of the cache key.
+        cache_key = result_cache.make_key('rates', [
+            request.build_absolute_uri(request.path),
+            settings.PAGINATION,
+            normalize_query_params(
+                request.query_params,
+                CONTRACTS_QUERY_PARAMS + ('page', 'histogram', 'cursor',
+                                          'skip_stats'),
+                wage_field=wage_field
+            ),
+        ])
+        data = result_cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
         contracts_all = self.get_queryset(request.query_params, wage_field)
 
-        stats = contracts_all.aggregate(
-            Min(wage_field), Max(wage_field),
-            Avg(wage_field), StdDev(wage_field))
-
-        page_stats = {
-            'minimum': stats[wage_field + '__min'],
-            'maximum': stats[wage_field + '__max'],
-            'average': quantize(stats[wage_field + '__avg']),
-            'first_standard_deviation': quantize(
-                stats[wage_field + '__stddev']
-            )
-        }
+        if ContractCursorPagination.is_requested(request):
+            pagination_class = ContractCursorPagination
+            skip_stats = pagination_class.should_skip_stats(request)
+        else:
+            pagination_class = ContractPagination
+            skip_stats = False
 
         if bins and bins.isnumeric():
-            values = contracts_all.values_list(wage_field, flat=True)
-            page_stats['wage_histogram'] = get_histogram(values, int(bins))
+            num_bins = int(bins)
+        else:
+            num_bins = None
 
-        pagination = ContractPagination(page_stats)
+        page_stats = {}
+
+        if not skip_stats:
+            stats = get_wage_stats(contracts_all, wage_field,
+                                   num_bins=num_bins)
+
+            page_stats = {
+                'minimum': stats['minimum'],
+                'maximum': stats['maximum'],
+                'average': quantize(stats['average']),
+                'first_standard_deviation': quantize(stats['stddev'])
+            }
+
+            if num_bins is not None:
+                page_stats['wage_histogram'] = stats['wage_histogram']
+
+        pagination = pagination_class(page_stats)
         results = pagination.paginate_queryset(contracts_all, request)
         serializer = ContractSerializer(results, many=True)
-        return pagination.get_paginated_response(serializer.data)
+        response = pagination.get_paginated_response(serializer.data)
+        result_cache.set(cache_key, response.data)
+        return response
 
     def get_wage_field(self, year):
         wage_fields = ['current_price', 'next_year_price', 'second_year_price']
@@ -187,6 +243,9 @@ class GetRatesCSV(APIView):
         """
         Returns a CSV of matched records and selected search and filter options
 
+        Unless the export has been cached, it is streamed to the client
+        as rows are fetched from the database.
+
         Query Params:
             q (str): keywords to search by
             min_experience (int): filter by minimum years of experience
@@ -196,6 +255,16 @@ class GetRatesCSV(APIView):
         """
 
         wage_field = 'current_price'
+
+        cache_key = result_cache.make_key('rates_csv', normalize_query_params(
+            request.GET,
+            CONTRACTS_QUERY_PARAMS,
+            wage_field=wage_field
+        ))
+        content = result_cache.get(cache_key)
+        if content is not None:
+            return self.make_response(content)
+
         contracts_all = get_contracts_queryset(request.GET, wage_field)
 
         q = request.query_params.get('q', 'None')
@@ -214,30 +283,90 @@ class GetRatesCSV(APIView):
         if business_size_set:
             business_size = business_size_set
 
-        response = HttpResponse(content_type="text/csv")
+        header_rows = (
+            ("Search Query", "Minimum Education Level",
+             "Minimum Years Experience", "Worksite",
+             "Business Size", "", "", "", "", "", "", "", "", ""),
+            (q, min_education, min_experience, site,
+             business_size, "", "", "", "", "", "", "", "", ""),
+            ("Contract #", "Business Size", "Schedule", "Site",
+             "Begin Date", "End Date", "SIN", "Vendor Name",
+             "Labor Category", "education Level",
+             "Minimum Years Experience",
+             "Current Year Labor Price", "Next Year Labor Price",
+             "Second Year Labor Price"),
+        )
+
+        response = StreamingHttpResponse(
+            self.generate_csv(header_rows, contracts_all, cache_key),
+            content_type="text/csv"
+        )
+        self.set_content_disposition(response)
+        return response
+
+    def generate_csv(self, header_rows, contracts, cache_key):
+        '''
+        Yields chunks of the CSV export, starting with the header rows
+        and then fetching CSV_CHUNK_SIZE rows at a time from the
+        database. If the whole export turns out to be small enough, it
+        is also cached under the given key.
+        '''
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        chunks = []
+        size = 0
+
+        def take_chunk():
+            nonlocal chunks, size
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if chunks is not None:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_CACHED_CSV_SIZE:
+                    chunks = None
+            return chunk
+
+        # Send the header rows before running the query, so the download
+        # starts straight away.
+        writer.writerows(header_rows)
+        yield take_chunk()
+
+        rows = iter_values_list(contracts, CSV_FIELDS,
+                                chunk_size=CSV_CHUNK_SIZE)
+        for i, row in enumerate(rows, 1):
+            writer.writerow(self.format_row(row))
+            if i % CSV_CHUNK_SIZE == 0:
+                yield take_chunk()
+
+        yield take_chunk()
+
+        if chunks is not None:
+            content = ''.join(chunks).encode('utf-8')
+            if len(content) <= MAX_CACHED_CSV_SIZE:
+                result_cache.set(cache_key, content)
+
+    @staticmethod
+    def format_row(row):
+        '''
+        Converts a tuple of CSV_FIELDS values into a row of the CSV
+        export.
+        '''
+
+        row = list(row)
+        row[1] = Contract.readable_business_size(row[1])
+        row[9] = EDUCATION_LEVELS.get(row[9], row[9])
+        return row
+
+    def set_content_disposition(self, response):
         response['Content-Disposition'] = ('attachment; '
                                            'filename="pricing_results.csv"')
-        writer = csv.writer(response)
-        writer.writerow(("Search Query", "Minimum Education Level",
-                         "Minimum Years Experience", "Worksite",
-                         "Business Size", "", "", "", "", "", "", "", "", ""))
-        writer.writerow((q, min_education, min_experience, site,
-                         business_size, "", "", "", "", "", "", "", "", ""))
-        writer.writerow(("Contract #", "Business Size", "Schedule", "Site",
-                         "Begin Date", "End Date", "SIN", "Vendor Name",
-                         "Labor Category", "education Level",
-                         "Minimum Years Experience",
-                         "Current Year Labor Price", "Next Year Labor Price",
-                         "Second Year Labor Price"))
-
-        for c in contracts_all:
-            writer.writerow((c.idv_piid, c.get_readable_business_size(),
-                             c.schedule, c.contractor_site, c.contract_start,
-                             c.contract_end, c.sin, c.vendor_name,
-                             c.labor_category, c.get_education_level_display(),
-                             c.min_years_experience, c.current_price,
-                             c.next_year_price, c.second_year_price))
 
+    def make_response(self, content):
+        response = HttpResponse(content, content_type="text/csv")
+        self.set_content_disposition(response)
         return response
 
 
@@ -254,13 +383,25 @@ class GetAutocomplete(APIView):
         q = request.query_params.get('q', False)
         query_type = request.query_params.get('query_type', 'match_all')
 
-        if q:
-            if query_type == 'match_phrase':
-                data = Contract.objects.filter(labor_category__icontains=q)
-            else:
-                data = Contract.objects.multi_phrase_search(q)
-            data = data.values('labor_category').annotate(
-                count=Count('labor_category')).order_by('-count')
+        if q and settings.API_AUTOCOMPLETE_IN_MEMORY:
+            return Response(autocomplete_engine.search(
+                q, query_type, limit=MAX_AUTOCOMPLETE_RESULTS))
+        elif q:
+            cache_key = result_cache.make_key('search', normalize_query_params(
+                request.query_params,
+                ('q', 'query_type')
+            ))
+            data = result_cache.get(cache_key)
+            if data is None:
+                if query_type == 'match_phrase':
+                    data = LaborCategoryCount.objects.filter(
+                        labor_category__icontains=q)
+                else:
+                    data = LaborCategoryCount.objects.multi_phrase_search(q)
+                data = list(data.values('labor_category', 'count')
+                            .order_by('-count', 'labor_category')
+                            [:MAX_AUTOCOMPLETE_RESULTS])
+                result_cache.set(cache_key, data)
             return Response(data)
         else:
             return Response([])
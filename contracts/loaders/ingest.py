@@ -0,0 +1,143 @@
+import logging
+
+from django.db import connection
+from djorm_pgfulltext.fields import VectorField
+
+from contracts.models import Contract
+
+logger = logging.getLogger(__name__)
+
+# The ways that insert_contracts() can write contracts to the database.
+BACKENDS = ('orm', 'copy')
+
+DEFAULT_BACKEND = 'orm'
+
+
+def quote_copy_value(value):
+    '''
+    Formats a value for a CSV-format COPY, in which unquoted empty values
+    are NULL.
+
+    >>> quote_copy_value(None)
+    ''
+    >>> quote_copy_value('')
+    '""'
+    >>> quote_copy_value('say "hi"')
+    '"say ""hi"""'
+    >>> quote_copy_value(5)
+    '"5"'
+    '''
+
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CopyReader(object):
+    '''
+    A read-only file-like object over an iterator of strings, so that they
+    can be streamed to COPY without being joined together in memory.
+    '''
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.lines)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    readline = read
+
+
+def get_copy_fields(model=Contract):
+    '''
+    Returns the fields of a model that are written by COPY, i.e. all but
+    the primary key (which comes from its sequence) and search vectors
+    (which are maintained by triggers).
+    '''
+
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and not isinstance(field, VectorField)
+    ]
+
+
+def copy_contracts(cursor, table, contracts, model=Contract, fields=None):
+    '''
+    Writes the given (unsaved) model instances into a table with COPY,
+    returning the number of rows written. None items are skipped.
+
+    Only the fields returned by get_copy_fields() are written, unless
+    others are given.
+    '''
+
+    if fields is None:
+        fields = get_copy_fields(model)
+    count = 0
+
+    def iter_lines():
+        nonlocal count
+        for contract in contracts:
+            if contract is None:
+                continue
+            count += 1
+            yield ','.join(
+                quote_copy_value(field.get_db_prep_save(
+                    getattr(contract, field.attname), connection))
+                for field in fields
+            ) + '\n'
+
+    cursor.copy_expert(
+        'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            table,
+            ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        ),
+        CopyReader(iter_lines())
+    )
+    return count
+
+
+def reserve_ids(count, model=Contract):
+    '''
+    Returns `count` new primary keys from a model's sequence, so that
+    instances can be given their ids before being bulk created.
+    '''
+
+    if not count:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count]
+        )
+        return [id for (id,) in cursor.fetchall()]
+
+
+def insert_contracts(contracts, backend=DEFAULT_BACKEND):
+    '''
+    Inserts the given (unsaved) contracts, either with bulk_create()
+    ('orm') or by streaming them to COPY ('copy'), returning the number
+    of contracts inserted.
+
+    This doesn't bump the DataVersion; callers should do that once
+    they're done changing contract data.
+    '''
+
+    if backend == 'copy':
+        with connection.cursor() as cursor:
+            return copy_contracts(cursor, Contract._meta.db_table,
+                                  contracts)
+    elif backend == 'orm':
+        contracts = [c for c in contracts if c is not None]
+        Contract.objects.bulk_create(contracts)
+        return len(contracts)
+    raise ValueError('unknown backend: {}'.format(backend))
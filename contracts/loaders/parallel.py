@@ -0,0 +1,144 @@
+import csv
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def find_row_start(data, pos, quotes=0):
+    '''
+    Returns the offset of the first CSV row in data that starts after pos,
+    along with the number of quote characters before it. quotes is the
+    number of quote characters before pos; a newline only ends a row if
+    an even number of quotes precede it.
+
+    >>> find_row_start(b'a,b\\nc,d\\n', 0)
+    (4, 0)
+    >>> find_row_start(b'a,"b\\nc"\\nd\\n', 0)
+    (8, 2)
+    >>> find_row_start(b'a,b', 0)
+    (3, 0)
+    '''
+
+    while True:
+        newline = data.find(b'\n', pos)
+        if newline == -1:
+            return len(data), quotes + data.count(b'"', pos)
+        quotes += data.count(b'"', pos, newline)
+        pos = newline + 1
+        if quotes % 2 == 0:
+            return pos, quotes
+
+
+def count_rows(data, start, end):
+    '''
+    Returns the number of CSV rows ended by a newline in data[start:end],
+    where start is the offset of the start of a row. Newlines inside
+    quoted fields don't end a row.
+
+    >>> count_rows(b'a,b\\nc,d\\n', 0, 8)
+    2
+    >>> count_rows(b'a,"b\\nc"\\nd,""""\\n', 0, 15)
+    2
+    '''
+
+    # Every other run of text between quote characters is inside a
+    # quoted field (an escaped quote just adds an empty run).
+    quoted = data[start:end].split(b'"')[1::2]
+    return data.count(b'\n', start, end) - \
+        sum(run.count(b'\n') for run in quoted)
+
+
+def find_shards(data, num_shards, header_rows=0):
+    '''
+    Splits the rows of CSV data (after any header rows) into at most
+    num_shards (start, end, first_row) ranges of roughly equal size,
+    where start and end are byte offsets and first_row is the number of
+    the range's first row in the file (counting header rows, from 1).
+
+    >>> data = b'h\\n1\\n"2\\n2"\\n3\\n4\\n'
+    >>> shards = find_shards(data, 3, header_rows=1)
+    >>> shards
+    [(2, 10, 2), (10, 12, 4), (12, 14, 5)]
+    >>> [data[start:end] for start, end, first_row in shards]
+    [b'1\\n"2\\n2"\\n', b'3\\n', b'4\\n']
+    '''
+
+    pos = quotes = 0
+    for _ in range(header_rows):
+        pos, quotes = find_row_start(data, pos, quotes)
+
+    body_start = pos
+    shard_size = max(1, (len(data) - body_start) // num_shards)
+
+    shards = []
+    row = header_rows + 1
+    while pos < len(data):
+        target = max(pos, body_start + shard_size * (len(shards) + 1) - 1)
+        if len(shards) == num_shards - 1:
+            end = len(data)
+        else:
+            quotes += data.count(b'"', pos, target)
+            end, quotes = find_row_start(data, target, quotes)
+        shards.append((pos, end, row))
+        row += count_rows(data, pos, end)
+        pos = end
+    return shards
+
+
+def parse_shard(loader_class, filename, start, end, first_row,
+                strict=False, **options):
+    '''
+    Converts the CSV rows in a byte range of a file into contracts with
+    loader_class.parse_rows(), returning them along with the number of
+    rows that were converted and skipped. first_row is the number of the
+    range's first row in the file, so errors can say which row they're in.
+
+    This runs in a worker process, so it mustn't use the database.
+    '''
+
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    # Match the universal newlines mode that the loaders open files with.
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    return loader_class.parse_rows(csv.reader(io.StringIO(text)),
+                                   strict=strict, start=first_row,
+                                   **options)
+
+
+def parse_in_parallel(loader_class, filename, workers, strict=False,
+                      **options):
+    '''
+    Converts the rows of a CSV file into contracts, like the loader's own
+    parsing does, but by splitting the file into one shard per worker
+    and parsing them in separate processes. Contracts are returned in
+    the same order as their rows.
+
+    Any extra keyword arguments are passed on to loader_class.parse_rows().
+    '''
+
+    with open(filename, 'rb') as f:
+        shards = find_shards(f.read(), workers,
+                             header_rows=loader_class.header_rows)
+
+    contracts = []
+    count = skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(parse_shard, loader_class, filename, start, end,
+                            first_row, strict, **options)
+            for start, end, first_row in shards
+        ]
+        for future in futures:
+            shard_contracts, shard_count, shard_skipped = future.result()
+            contracts.extend(shard_contracts)
+            count += shard_count
+            skipped += shard_skipped
+
+    logger.info('rows fetched: {}'.format(count))
+    logger.info('rows skipped: {}'.format(skipped))
+
+    return contracts
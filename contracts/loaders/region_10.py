@@ -4,6 +4,7 @@ import logging
 from datetime import datetime
 from django.core.exceptions import ValidationError
 
+from contracts.loaders.parallel import parse_in_parallel
 from contracts.models import Contract
 
 FEDERAL_MIN_CONTRACT_RATE = 10.10
@@ -14,7 +15,17 @@ logger = logging.getLogger(__name__)
 class Region10Loader(object):
     header_rows = 1
 
-    def load_file(self, filename, upload_source=None, strict=False):
+    def load_file(self, filename, upload_source=None, strict=False,
+                  workers=1):
+        if workers > 1:
+            contracts = parse_in_parallel(type(self), filename, workers,
+                                          strict=strict)
+            if upload_source:
+                for contract in contracts:
+                    if contract is not None:
+                        contract.upload_source = upload_source
+            return contracts
+
         with open(filename, 'rU') as f:
             return list(
                 self.parse(f, upload_source=upload_source, strict=strict)
@@ -26,21 +37,42 @@ class Region10Loader(object):
         for _ in range(self.header_rows):
             next(reader)
 
+        contracts, count, skipped = self.parse_rows(
+            reader, upload_source=upload_source, strict=strict,
+            start=self.header_rows + 1)
+
+        logger.info('rows fetched: {}'.format(count))
+        logger.info('rows skipped: {}'.format(skipped))
+
+        return contracts
+
+    @classmethod
+    def parse_rows(cls, rows, upload_source=None, strict=False,
+                   start=None):
+        '''
+        Converts rows into contracts, returning them along with the
+        number of rows that were converted and skipped. `start` is the
+        number of the first row in its file, if known, for error messages.
+        '''
+
+        contracts = []
         count = skipped = 0
 
-        for row in reader:
+        for number, row in enumerate(rows, start or 1):
             try:
-                yield self.make_contract(row, upload_source=upload_source)
+                contracts.append(
+                    cls.make_contract(row, upload_source=upload_source))
                 count += 1
             except (ValueError, ValidationError) as e:
                 if strict:
-                    logger.error('error parsing {}'.format(row))
+                    logger.error('error parsing {} {}'.format(
+                        'row' if start is None else 'row {}'.format(number),
+                        row))
                     raise
                 else:
                     skipped += 1
 
-        logger.info('rows fetched: {}'.format(count))
-        logger.info('rows skipped: {}'.format(skipped))
+        return contracts, count, skipped
 
     @classmethod
     def make_contract(cls, line, upload_source=None):
@@ -58,6 +90,9 @@ class Region10Loader(object):
             contract.education_level = contract.get_education_code(
                 line[6]
             )
+            contract.education_rank = contract.get_education_rank(
+                contract.education_level
+            )
             contract.schedule = line[12]
             contract.business_size = line[8]
             current_contract_year = int(float(line[14]))
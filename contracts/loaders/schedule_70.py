@@ -1,13 +1,17 @@
 import csv
 import logging
 
-from django.core.management import call_command
 from django.core.exceptions import ValidationError
 from datetime import date
 from django.db import transaction
 
 from contracts.loaders.region_10 import FEDERAL_MIN_CONTRACT_RATE
-from contracts.models import Contract
+from contracts.loaders.ingest import insert_contracts, DEFAULT_BACKEND
+from contracts.loaders.parallel import parse_in_parallel
+from contracts.loaders.staging import replace_contracts
+from contracts.loaders.upsert import get_content_hash, upsert_contracts
+from contracts.loaders.validation import BatchValidator
+from contracts.models import Contract, DataVersion
 
 logger = logging.getLogger(__name__)
 
@@ -16,42 +20,98 @@ class Schedule70Loader(object):
     model = Contract
     schedule_name = 'IT Schedule 70'
     header_rows = 1
+    validator = BatchValidator(model, exclude=['piid'])
 
-    def load(self, filename, replace=True, strict=False):
+    def load(self, filename, replace=True, strict=False, staging=False,
+             backend=DEFAULT_BACKEND, workers=1, full_clean=False,
+             upsert=False):
         logger.info('begin load_s70 task')
 
         logger.info('reading data')
-        contracts = list(self.parse_file(filename, strict=strict))
+        contracts = list(self.parse_file(filename, strict=strict,
+                                         workers=workers,
+                                         full_clean=full_clean))
 
         logger.info('inserting data')
-        self.insert(contracts, replace=replace)
+        result = self.insert(contracts, replace=replace, staging=staging,
+                             backend=backend, upsert=upsert)
 
         logger.info('end load_s70 task')
 
-    def parse_file(self, filename, strict=False):
+        return result
+
+    def parse_file(self, filename, strict=False, workers=1,
+                   full_clean=False):
+        if workers > 1:
+            yield from parse_in_parallel(type(self), filename, workers,
+                                         strict=strict,
+                                         full_clean=full_clean)
+            return
+
         with open(filename, 'rU') as f:
             reader = csv.reader(f)
 
             for _ in range(self.header_rows):
                 next(reader)
 
-            count = skipped = 0
-            for row in reader:
-                try:
-                    yield self.make_contract(row)
-                    count += 1
-                except (ValueError, ValidationError) as e:
-                    if strict:
-                        logger.error('error parsing {}'.format(row))
-                        raise
-                    else:
-                        skipped += 1
+            contracts, count, skipped = self.parse_rows(
+                reader, strict=strict, full_clean=full_clean,
+                start=self.header_rows + 1
+            )
 
             logger.info('rows fetched: {}'.format(count))
             logger.info('rows skipped: {}'.format(skipped))
 
+            yield from contracts
+
     @classmethod
-    def make_contract(cls, row):
+    def parse_rows(cls, rows, strict=False, full_clean=False, start=None):
+        '''
+        Converts rows into contracts, returning them along with the
+        number of rows that were converted and skipped. `start` is the
+        number of the first row in its file, if known, for error messages.
+
+        Unless full_clean is true, contracts are validated together by
+        cls.validator once they've all been made, rather than having
+        full_clean() called on each one.
+        '''
+
+        contracts = []
+        parsed_rows = []
+        skipped = 0
+        for number, row in enumerate(rows, start or 1):
+            try:
+                contracts.append(cls.make_contract(row, full_clean))
+                parsed_rows.append((number, row))
+            except (ValueError, ValidationError) as e:
+                if strict:
+                    logger.error('error parsing {} {}'.format(
+                        'row' if start is None else 'row {}'.format(number),
+                        row))
+                    raise
+                else:
+                    skipped += 1
+
+        if not full_clean:
+            errors = cls.validator.validate(contracts)
+            for index in sorted(errors):
+                number, row = parsed_rows[index]
+                message = 'invalid {} {}: {}'.format(
+                    'row' if start is None else 'row {}'.format(number),
+                    row, '; '.join(errors[index].messages))
+                if strict:
+                    logger.error(message)
+                    raise errors[index]
+                logger.warning(message)
+            if errors:
+                contracts = [contract for index, contract
+                             in enumerate(contracts) if index not in errors]
+                skipped += len(errors)
+
+        return contracts, len(contracts), skipped
+
+    @classmethod
+    def make_contract(cls, row, full_clean=True):
         schedule = row[9]
         if schedule != cls.schedule_name:
             raise ValueError('skipping schedule: {}'.format(schedule))
@@ -63,6 +123,8 @@ class Schedule70Loader(object):
         price = cls.model.normalize_rate(price)
         display_price = price if price >= FEDERAL_MIN_CONTRACT_RATE else None
 
+        education_level = cls.model.get_education_code(row[2])
+
         contract = cls.model(
             idv_piid=row[6],
             contract_start=cls.parse_date(row[12]),
@@ -70,7 +132,8 @@ class Schedule70Loader(object):
             contract_year=cls.int_or_fallback(row[11], 1),
             vendor_name=row[7],
             labor_category=row[1].strip().replace('\n', ' '),
-            education_level=cls.model.get_education_code(row[2]),
+            education_level=education_level,
+            education_rank=cls.model.get_education_rank(education_level),
             min_years_experience=cls.int_or_fallback(row[3]),
             hourly_rate_year1=price,
             hourly_rate_year2=None,
@@ -86,7 +149,10 @@ class Schedule70Loader(object):
             sin=row[0]
         )
 
-        contract.full_clean(exclude=['piid'])
+        if full_clean:
+            contract.full_clean(exclude=['piid'])
+
+        contract.content_hash = get_content_hash(contract)
 
         return contract
 
@@ -106,19 +172,34 @@ class Schedule70Loader(object):
         return date(year, month, day)
 
     @classmethod
-    def insert(cls, contracts, replace=True, update_search_field=True):
+    def insert(cls, contracts, replace=True, staging=False,
+               backend=DEFAULT_BACKEND, upsert=False):
+        if upsert:
+            logger.info('updating existing contracts that changed')
+            counts = upsert_contracts(
+                contracts,
+                cls.model._base_manager.filter(schedule=cls.schedule_name),
+                backend=backend
+            )
+            for name, count in zip(counts._fields, counts):
+                logger.info('contracts {}: {}'.format(name, count))
+            return counts
+
+        if replace and staging:
+            logger.info('replacing existing contracts via staging table')
+            replace_contracts(
+                contracts,
+                keep=cls.model._base_manager.exclude(
+                    schedule=cls.schedule_name)
+            )
+            return
+
         with transaction.atomic():
             if replace:
                 logger.info('erasing existing contracts')
                 cls.model.objects.filter(schedule=cls.schedule_name).delete()
 
             logger.info('inserting new contracts')
-            cls.model.objects.bulk_create(contracts)
-
-        if update_search_field:
-            logger.info('updating search field')
-            call_command(
-                'update_search_field',
-                cls.model._meta.app_label,
-                cls.model._meta.model_name
-            )
+            insert_contracts(contracts, backend=backend)
+
+        DataVersion.bump()
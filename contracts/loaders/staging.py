@@ -0,0 +1,214 @@
+import logging
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+
+from contracts.loaders.ingest import copy_contracts
+from contracts.models import Contract, DataVersion
+
+logger = logging.getLogger(__name__)
+
+# The schema that contracts are loaded into before being swapped in. Using
+# a separate schema means the staging table's indexes and constraints can
+# have the same names as the live ones.
+STAGING_SCHEMA = 'contracts_staging'
+
+
+def retarget(sql, table, new_table):
+    '''
+    Changes the table that a CREATE INDEX or CREATE TRIGGER statement
+    applies to.
+
+    >>> retarget('CREATE INDEX i ON public.foo USING btree (a)',
+    ...          'foo', 'staging.foo')
+    'CREATE INDEX i ON staging.foo USING btree (a)'
+    '''
+
+    return re.sub(
+        r' ON (ONLY )?(\S+\.)?{} '.format(re.escape(table)),
+        lambda match: ' ON {}{} '.format(match.group(1) or '', new_table),
+        sql,
+        count=1
+    )
+
+
+def get_table_ddl(cursor, table, new_table):
+    '''
+    Returns the SQL statements needed to give new_table the same
+    constraints and indexes as the given table, and the ones needed to
+    give it the same triggers.
+    '''
+
+    statements = []
+
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c')",
+        [table]
+    )
+    constraints = cursor.fetchall()
+    for name, definition in constraints:
+        statements.append('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(
+            new_table, connection.ops.quote_name(name), definition))
+
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s",
+        [table]
+    )
+    constraint_names = set(name for name, _ in constraints)
+    for name, definition in cursor.fetchall():
+        # Indexes backing constraints are created with the constraint.
+        if name not in constraint_names:
+            statements.append(retarget(definition, table, new_table))
+
+    cursor.execute(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger "
+        "WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+        [table]
+    )
+    triggers = [retarget(definition, table, new_table)
+                for (definition,) in cursor.fetchall()]
+
+    return statements, triggers
+
+
+def check_references(model):
+    '''
+    Raises ImproperlyConfigured unless every foreign key to the model is
+    SET_NULL on delete, which is the only behavior that swap_tables()
+    knows how to reproduce for rows referring to instances that won't be
+    in the staging table.
+    '''
+
+    for rel in model._meta.related_objects:
+        if rel.on_delete is not models.SET_NULL:
+            raise ImproperlyConfigured(
+                'Loading {} via a staging table requires every foreign '
+                'key to it to be SET_NULL on delete, but {} is not.'.format(
+                    model._meta.verbose_name_plural, rel.field))
+
+
+def set_null_references(cursor, model, staging_table):
+    '''
+    Does what deleting them would do to rows referring to model instances
+    that won't be in the staging table, returning the foreign key
+    constraints that refer to the model's table. check_references()
+    should have been called on the model first.
+    '''
+
+    for rel in model._meta.related_objects:
+        cursor.execute(
+            'UPDATE {table} SET {column} = NULL WHERE {column} IS NOT NULL '
+            'AND NOT EXISTS (SELECT 1 FROM {staging_table} '
+            'WHERE id = {table}.{column})'.format(
+                table=rel.related_model._meta.db_table,
+                column=rel.field.column,
+                staging_table=staging_table,
+            )
+        )
+
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname, "
+        "pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE confrelid = %s::regclass AND contype = 'f'",
+        [model._meta.db_table]
+    )
+    return cursor.fetchall()
+
+
+def swap_tables(cursor, model, staging_table):
+    '''
+    Replaces a model's table with the staging table.
+    '''
+
+    table = model._meta.db_table
+    references = set_null_references(cursor, model, staging_table)
+
+    cursor.execute('SELECT current_schema(), pg_get_serial_sequence(%s, %s)',
+                   [table, model._meta.pk.column])
+    schema, sequence = cursor.fetchone()
+
+    for referring_table, name, _ in references:
+        cursor.execute('ALTER TABLE {} DROP CONSTRAINT {}'.format(
+            referring_table, connection.ops.quote_name(name)))
+    # The sequence is shared by both tables, and mustn't be dropped with
+    # the old one.
+    cursor.execute('ALTER SEQUENCE {} OWNED BY NONE'.format(sequence))
+    cursor.execute('DROP TABLE {}'.format(table))
+    cursor.execute('ALTER TABLE {} SET SCHEMA {}'.format(
+        staging_table, schema))
+    cursor.execute('ALTER SEQUENCE {} OWNED BY {}.{}'.format(
+        sequence, table, model._meta.pk.column))
+    for referring_table, name, definition in references:
+        cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(
+            referring_table, connection.ops.quote_name(name), definition))
+
+
+def replace_contracts(contracts, keep=None):
+    '''
+    Replaces the contracts table with a new one holding the given
+    (unsaved) contracts, plus the existing contracts in the `keep`
+    queryset, if any. Returns the number of new contracts.
+
+    The new table is loaded with COPY and then indexed, so there's no
+    churn in the live table. Other writers are blocked until the new
+    table is swapped in, but readers are only blocked for the swap.
+
+    If this is called inside a transaction, deferred constraints are
+    checked immediately from then on until the transaction ends.
+    '''
+
+    check_references(Contract)
+
+    table = Contract._meta.db_table
+    staging_table = '{}.{}'.format(STAGING_SCHEMA, table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Tables can't be altered while foreign key checks deferred by
+        # earlier writes in an enclosing transaction are pending, so run
+        # them now. This lasts for the rest of the transaction.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        # Changes made after we start copying would be lost in the swap.
+        cursor.execute(
+            'LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE'.format(table))
+
+        statements, triggers = get_table_ddl(cursor, table, staging_table)
+
+        logger.info('creating staging table')
+        cursor.execute('CREATE SCHEMA IF NOT EXISTS {}'.format(
+            STAGING_SCHEMA))
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(staging_table))
+        cursor.execute('CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS)'.format(
+            staging_table, table))
+
+        if keep is not None:
+            logger.info('copying existing contracts to staging table')
+            sql, params = keep.order_by().values('id').query\
+                .sql_with_params()
+            cursor.execute(
+                'INSERT INTO {} SELECT * FROM {} WHERE id IN ({})'.format(
+                    staging_table, table, sql),
+                params
+            )
+
+        # The search index trigger fills in the vectors as rows are copied.
+        for trigger in triggers:
+            cursor.execute(trigger)
+
+        logger.info('copying new contracts to staging table')
+        count = copy_contracts(cursor, staging_table, contracts)
+
+        logger.info('indexing staging table')
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute('ANALYZE {}'.format(staging_table))
+
+        logger.info('swapping in staging table')
+        swap_tables(cursor, Contract, staging_table)
+
+        DataVersion.bump()
+
+    return count
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+from collections import namedtuple
+
+from django.db import connection, models, transaction
+
+from contracts.loaders.ingest import (
+    copy_contracts, get_copy_fields, insert_contracts, DEFAULT_BACKEND
+)
+from contracts.models import Contract, DataVersion
+
+logger = logging.getLogger(__name__)
+
+# The fields that identify "the same" contract across reloads of a
+# schedule's data.
+NATURAL_KEY = ('idv_piid', 'labor_category', 'sin', 'vendor_name')
+
+UpsertCounts = namedtuple(
+    'UpsertCounts', ['inserted', 'updated', 'deleted', 'unchanged'])
+
+
+def get_hashed_fields(model=Contract):
+    return [field for field in get_copy_fields(model)
+            if field.name != 'content_hash']
+
+
+def get_content_hash(contract):
+    '''
+    Returns a hash of the values of a contract's loaded fields, which
+    changes whenever any of them would be saved differently.
+    '''
+
+    values = []
+    for field in get_hashed_fields(type(contract)):
+        value = getattr(contract, field.attname)
+        if value is not None:
+            value = field.to_python(value)
+            if isinstance(field, models.DecimalField):
+                value = '{:.{}f}'.format(value, field.decimal_places)
+            else:
+                value = str(value)
+        values.append(value)
+    return hashlib.md5(repr(values).encode('utf-8')).hexdigest()
+
+
+def get_natural_key(contract):
+    return tuple(getattr(contract, name) for name in NATURAL_KEY)
+
+
+def diff_contracts(contracts, existing):
+    '''
+    Compares (unsaved) contracts with (id, content_hash, *natural_key)
+    tuples for the existing ones, returning the contracts to insert,
+    the contracts to update (with their ids set), the ids of contracts
+    to delete and the number of contracts that are unchanged.
+
+    Contracts are matched by natural key, preferring existing contracts
+    with the same content hash, since keys aren't necessarily unique.
+    '''
+
+    existing_by_key = {}
+    for id, content_hash, *key in existing:
+        existing_by_key.setdefault(tuple(key), []).append(
+            (id, content_hash))
+
+    unmatched = []
+    unchanged = 0
+    for contract in contracts:
+        candidates = existing_by_key.get(get_natural_key(contract), [])
+        for i, (id, content_hash) in enumerate(candidates):
+            if content_hash == contract.content_hash:
+                del candidates[i]
+                unchanged += 1
+                break
+        else:
+            unmatched.append(contract)
+
+    to_insert = []
+    to_update = []
+    for contract in unmatched:
+        candidates = existing_by_key.get(get_natural_key(contract))
+        if candidates:
+            contract.id = candidates.pop(0)[0]
+            to_update.append(contract)
+        else:
+            to_insert.append(contract)
+
+    to_delete = [id for candidates in existing_by_key.values()
+                 for id, _ in candidates]
+
+    return to_insert, to_update, to_delete, unchanged
+
+
+def update_contracts(cursor, contracts):
+    '''
+    Overwrites the loaded fields of existing contracts with those of
+    the given instances (which have their ids set), except for their
+    natural keys, which must already match.
+    '''
+
+    table = Contract._meta.db_table
+    temp_table = '{}_upsert'.format(table)
+    fields = [field for field in get_copy_fields()
+              if field.name not in NATURAL_KEY]
+    copied_fields = [Contract._meta.pk] + fields
+
+    cursor.execute('DROP TABLE IF EXISTS {}'.format(temp_table))
+    # Only the copied columns are created, and CREATE TABLE AS doesn't
+    # carry over any NOT NULL constraints, so the columns that aren't
+    # copied (like the natural key) can't make the copy fail.
+    cursor.execute(
+        'CREATE TEMPORARY TABLE {temp_table} ON COMMIT DROP AS '
+        'SELECT {columns} FROM {table} WITH NO DATA'.format(
+            temp_table=temp_table,
+            table=table,
+            columns=', '.join(connection.ops.quote_name(field.column)
+                              for field in copied_fields),
+        )
+    )
+    copy_contracts(cursor, temp_table, contracts, fields=copied_fields)
+    # labor_category is part of the natural key, so this doesn't fire the
+    # search index trigger.
+    cursor.execute(
+        'UPDATE {table} SET {assignments} FROM {temp_table} '
+        'WHERE {table}.id = {temp_table}.id'.format(
+            table=table,
+            temp_table=temp_table,
+            assignments=', '.join(
+                '{0} = {1}.{0}'.format(
+                    connection.ops.quote_name(field.column), temp_table)
+                for field in fields
+            ),
+        )
+    )
+
+
+def upsert_contracts(contracts, queryset, backend=DEFAULT_BACKEND):
+    '''
+    Makes the contracts in queryset (e.g. all those on a schedule) match
+    the given (unsaved) contracts, by inserting new ones, updating
+    changed ones and deleting vanished ones, and returns the number of
+    contracts in each case as an UpsertCounts.
+
+    Unchanged contracts aren't written at all, and the DataVersion is
+    only bumped if something changed.
+    '''
+
+    contracts = [c for c in contracts if c is not None]
+    for contract in contracts:
+        contract.content_hash = get_content_hash(contract)
+
+    with transaction.atomic():
+        existing = queryset.select_for_update().values_list(
+            'id', 'content_hash', *NATURAL_KEY)
+        to_insert, to_update, to_delete, unchanged = diff_contracts(
+            contracts, existing)
+
+        if to_update:
+            logger.info('updating {} changed contracts'.format(
+                len(to_update)))
+            with connection.cursor() as cursor:
+                update_contracts(cursor, to_update)
+
+        if to_delete:
+            logger.info('deleting {} vanished contracts'.format(
+                len(to_delete)))
+            Contract._base_manager.filter(id__in=to_delete).delete()
+
+        if to_insert:
+            logger.info('inserting {} new contracts'.format(len(to_insert)))
+            insert_contracts(to_insert, backend=backend)
+
+        if to_insert or to_update or to_delete:
+            DataVersion.bump()
+
+    return UpsertCounts(
+        inserted=len(to_insert),
+        updated=len(to_update),
+        deleted=len(to_delete),
+        unchanged=unchanged,
+    )
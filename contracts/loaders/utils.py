@@ -0,0 +1,18 @@
+from itertools import islice
+
+
+def iter_batches(iterable, batch_size):
+    '''
+    Splits an iterable into lists of at most batch_size items, without
+    consuming more of it than is needed for the current batch.
+
+    >>> list(iter_batches(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    '''
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
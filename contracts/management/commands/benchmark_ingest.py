@@ -0,0 +1,68 @@
+import time
+from optparse import make_option
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from contracts.loaders.ingest import insert_contracts, BACKENDS
+from contracts.loaders.region_10 import Region10Loader
+from contracts.loaders.schedule_70 import Schedule70Loader
+
+
+class Command(BaseCommand):
+    help = '''\
+    Benchmarks inserting the sample contract data in contracts/docs
+    with each ingest backend. Nothing is saved.
+    '''
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--r10-filename',
+            default='contracts/docs/hourly_prices_sample.csv',
+            help='Region 10 input filename (.csv)'
+        ),
+        make_option(
+            '--s70-filename',
+            default='contracts/docs/s70/s70_data.csv',
+            help='IT Schedule 70 input filename (.csv)'
+        ),
+        make_option(
+            '--scale',
+            type='int',
+            default=10,
+            help='number of times to insert each file\'s contracts'
+        ),
+        make_option(
+            '--repeat',
+            type='int',
+            default=3,
+            help='number of timing runs per case'
+        ),
+    )
+
+    def time_insert(self, contracts, backend):
+        with transaction.atomic():
+            start = time.perf_counter()
+            insert_contracts(contracts, backend=backend)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    def handle(self, *args, **options):
+        inputs = [
+            ('Region 10', list(Region10Loader().load_file(
+                options['r10_filename']))),
+            ('IT Schedule 70', list(Schedule70Loader().parse_file(
+                options['s70_filename']))),
+        ]
+
+        for name, contracts in inputs:
+            contracts = contracts * options['scale']
+            self.stdout.write('{} ({:,} contracts):'.format(
+                name, len(contracts)))
+            for backend in BACKENDS:
+                seconds = min(self.time_insert(contracts, backend)
+                              for _ in range(options['repeat']))
+                self.stdout.write('  {:<5} {:>8.3f}s {:>10,.0f} rows/s'
+                                  .format(backend, seconds,
+                                          len(contracts) / seconds))
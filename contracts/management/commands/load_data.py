@@ -3,10 +3,13 @@ import logging
 
 from django.core.management import BaseCommand
 from optparse import make_option
-from django.core.management import call_command
 
-from contracts.models import Contract, BulkUploadContractSource
+from contracts.models import (Contract, BulkUploadContractSource,
+                              DataVersion)
+from contracts.loaders.ingest import (insert_contracts, BACKENDS,
+                                      DEFAULT_BACKEND)
 from contracts.loaders.region_10 import Region10Loader
+from contracts.loaders.staging import replace_contracts
 
 
 class Command(BaseCommand):
@@ -19,6 +22,27 @@ class Command(BaseCommand):
             default=default_filename,
             help='input filename (.csv, default {})'.format(default_filename)
         ),
+        make_option(
+            '--staging',
+            action='store_true',
+            default=False,
+            help='Replace data by loading it into a staging table and '
+                 'swapping that in.'
+        ),
+        make_option(
+            '--backend',
+            type='choice',
+            choices=BACKENDS,
+            default=DEFAULT_BACKEND,
+            help='How to insert contracts: {} (default {}).'.format(
+                ' or '.join(BACKENDS), DEFAULT_BACKEND)
+        ),
+        make_option(
+            '--workers',
+            type='int',
+            default=1,
+            help='Number of processes to parse the input file with.'
+        ),
     )
 
     def handle(self, *args, **options):
@@ -26,8 +50,9 @@ class Command(BaseCommand):
 
         log.info("Begin load_data task")
 
-        log.info("Deleting existing contract records")
-        Contract.objects.all().delete()
+        if not options['staging']:
+            log.info("Deleting existing contract records")
+            Contract.objects.all().delete()
 
         filename = options['filename']
         if not filename or not os.path.exists(filename):
@@ -46,14 +71,16 @@ class Command(BaseCommand):
         f.close()
 
         contracts = Region10Loader().load_file(
-            filename, upload_source=upload_source
+            filename, upload_source=upload_source, workers=options['workers']
         )
 
-        log.info("Inserting records")
-        Contract.objects.bulk_create(contracts)
+        if options['staging']:
+            log.info("Replacing records via staging table")
+            replace_contracts(contracts)
+        else:
+            log.info("Inserting records")
+            insert_contracts(contracts, backend=options['backend'])
 
-        log.info("Updating search index")
-        call_command('update_search_field',
-                     Contract._meta.app_label, Contract._meta.model_name)
+            DataVersion.bump()
 
         log.info("End load_data task")
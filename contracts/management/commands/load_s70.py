@@ -4,6 +4,7 @@ import os
 from django.core.management import BaseCommand
 from optparse import make_option
 
+from contracts.loaders.ingest import BACKENDS, DEFAULT_BACKEND
 from contracts.loaders.schedule_70 import Schedule70Loader
 
 logger = logging.getLogger(__name__)
@@ -52,6 +53,41 @@ class Command(BaseCommand):
             default=False,
             help='Abort if any input data fails validation.'
         ),
+        make_option(
+            '--staging',
+            action='store_true',
+            default=False,
+            help='Replace data by loading it into a staging table and '
+                 'swapping that in.'
+        ),
+        make_option(
+            '--backend',
+            type='choice',
+            choices=BACKENDS,
+            default=DEFAULT_BACKEND,
+            help='How to insert contracts: {} (default {}).'.format(
+                ' or '.join(BACKENDS), DEFAULT_BACKEND)
+        ),
+        make_option(
+            '--workers',
+            type='int',
+            default=1,
+            help='Number of processes to parse the input file with.'
+        ),
+        make_option(
+            '--upsert',
+            action='store_true',
+            default=False,
+            help='Only insert new contracts, update changed ones and '
+                 'delete vanished ones, rather than replacing them all.'
+        ),
+        make_option(
+            '--full-clean',
+            action='store_true',
+            default=False,
+            help='Validate each contract with full_clean() instead of '
+                 'validating them in batches.'
+        ),
     )
 
     def handle(self, *args, **options):
@@ -59,8 +95,18 @@ class Command(BaseCommand):
         if not filename or not os.path.exists(filename):
             raise ValueError('invalid filename')
 
-        Schedule70Loader().load(
+        counts = Schedule70Loader().load(
             filename,
             replace=options['replace'],
-            strict=options['strict']
+            strict=options['strict'],
+            staging=options['staging'],
+            backend=options['backend'],
+            workers=options['workers'],
+            full_clean=options['full_clean'],
+            upsert=options['upsert']
         )
+
+        if options['upsert']:
+            self.stdout.write(
+                'Inserted {}, updated {}, deleted {}, unchanged {}.'.format(
+                    *counts))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0017_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='education_rank',
+            field=models.IntegerField(default=-1, db_index=True),
+        ),
+        # backfill the ranks of existing contracts; these must match
+        # contracts.models.EDUCATION_RANKS
+        migrations.RunSQL(
+            " UPDATE contracts_contract SET education_rank = "
+            " CASE education_level "
+            "   WHEN 'HS' THEN 1 "
+            "   WHEN 'AA' THEN 2 "
+            "   WHEN 'BA' THEN 3 "
+            "   WHEN 'MA' THEN 4 "
+            "   WHEN 'PHD' THEN 5 "
+            "   ELSE -1 "
+            " END; ",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Django's postgres backend compiles case-insensitive lookups to
+# UPPER("column"::text), e.g. schedule__iexact becomes
+# UPPER("schedule"::text) = UPPER(%s), so the expression indexes below
+# must use exactly that expression for the planner to pick them up.
+
+INDEXES = [
+    # schedule__iexact
+    ('contracts_contract_schedule_upper',
+     'UPPER("schedule"::text)'),
+    # labor_category__iexact (query_type=match_exact)
+    ('contracts_contract_labor_category_upper',
+     'UPPER("labor_category"::text)'),
+    # business_size__istartswith, i.e. UPPER(...) LIKE 'S%'
+    ('contracts_contract_business_size_upper_prefix',
+     'UPPER("business_size"::text) text_pattern_ops'),
+]
+
+TRIGRAM_INDEXES = [
+    # contractor_site__icontains
+    ('contracts_contract_contractor_site_upper_trgm',
+     'UPPER("contractor_site"::text) gin_trgm_ops'),
+    # labor_category__icontains (query_type=match_phrase)
+    ('contracts_contract_labor_category_upper_trgm',
+     'UPPER("labor_category"::text) gin_trgm_ops'),
+]
+
+# Contract.objects always filters on current_price > 0, so the sort
+# columns used by the API (plus the id tie-breaker used by cursor
+# pagination) are indexed only over those rows.
+PARTIAL_INDEXES = [
+    ('contracts_contract_current_price_id_partial',
+     '"current_price", "id"'),
+    ('contracts_contract_next_year_price_id_partial',
+     '"next_year_price", "id"'),
+    ('contracts_contract_second_year_price_id_partial',
+     '"second_year_price", "id"'),
+    ('contracts_contract_education_rank_id_partial',
+     '"education_rank", "id"'),
+]
+
+
+def create_index(name, columns, using='btree', where=None):
+    sql = 'CREATE INDEX {} ON contracts_contract USING {} ({})'.format(
+        name, using, columns
+    )
+    if where:
+        sql += ' WHERE {}'.format(where)
+    return migrations.RunSQL(
+        sql + ';',
+        reverse_sql='DROP INDEX IF EXISTS {};'.format(name)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0018_contract_education_rank'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ] + [
+        create_index(name, columns)
+        for name, columns in INDEXES
+    ] + [
+        create_index(name, columns, using='gin')
+        for name, columns in TRIGRAM_INDEXES
+    ] + [
+        create_index(name, columns, where='"current_price" > 0')
+        for name, columns in PARTIAL_INDEXES
+    ]
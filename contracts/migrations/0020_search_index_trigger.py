@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0019_api_filter_indexes'),
+    ]
+
+    operations = [
+        # keep search_index up to date in the same statement that writes
+        # the row, including rows inserted via bulk_create(); the
+        # configuration and fields must match Contract.objects
+        migrations.RunSQL(
+            ' CREATE TRIGGER contracts_contract_search_index_update '
+            ' BEFORE INSERT OR UPDATE OF labor_category, search_index '
+            ' ON contracts_contract FOR EACH ROW EXECUTE PROCEDURE '
+            " tsvector_update_trigger(search_index, 'pg_catalog.english', "
+            ' labor_category); ',
+            reverse_sql=' DROP TRIGGER IF EXISTS '
+                        ' contracts_contract_search_index_update '
+                        ' ON contracts_contract; '
+        ),
+        # fill in any rows that were never indexed; the trigger takes
+        # care of computing the vector
+        migrations.RunSQL(
+            ' UPDATE contracts_contract SET search_index = NULL '
+            ' WHERE search_index IS NULL; ',
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
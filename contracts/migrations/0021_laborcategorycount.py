@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import djorm_pgfulltext.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0020_search_index_trigger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LaborCategoryCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('labor_category', models.TextField(unique=True)),
+                ('count', models.IntegerField(db_index=True)),
+                ('search_index', djorm_pgfulltext.fields.VectorField(
+                    serialize=False, default='', null=True, editable=False,
+                    db_index=True)),
+            ],
+        ),
+    ]
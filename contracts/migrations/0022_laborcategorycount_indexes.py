@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # This can't be part of 0021, since the index that VectorField asks
+    # for is only created at the end of that migration.
+
+    dependencies = [
+        ('contracts', '0021_laborcategorycount'),
+    ]
+
+    operations = [
+        # replace the btree index that VectorField asks for with a GIN
+        # one, as was done for Contract.search_index
+        migrations.RunSQL(
+            ' DO $$ DECLARE idx text; BEGIN '
+            '   FOR idx IN SELECT indexname FROM pg_indexes '
+            "   WHERE tablename = 'contracts_laborcategorycount' "
+            "   AND indexdef LIKE '%(search_index)%' LOOP "
+            "     EXECUTE 'DROP INDEX ' || quote_ident(idx); "
+            '   END LOOP; '
+            ' END $$; ',
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            ' CREATE INDEX contracts_laborcategorycount_search_index '
+            ' ON contracts_laborcategorycount USING gin(search_index); ',
+            reverse_sql=' DROP INDEX IF EXISTS '
+                        ' contracts_laborcategorycount_search_index; '
+        ),
+        # labor_category__icontains (query_type=match_phrase)
+        migrations.RunSQL(
+            ' CREATE INDEX contracts_laborcategorycount_upper_trgm '
+            ' ON contracts_laborcategorycount '
+            ' USING gin(UPPER("labor_category"::text) gin_trgm_ops); ',
+            reverse_sql=' DROP INDEX IF EXISTS '
+                        ' contracts_laborcategorycount_upper_trgm; '
+        ),
+        migrations.RunSQL(
+            ' CREATE TRIGGER contracts_laborcategorycount_search_index_update '
+            ' BEFORE INSERT OR UPDATE OF labor_category, search_index '
+            ' ON contracts_laborcategorycount FOR EACH ROW EXECUTE PROCEDURE '
+            " tsvector_update_trigger(search_index, 'pg_catalog.english', "
+            ' labor_category); ',
+            reverse_sql=' DROP TRIGGER IF EXISTS '
+                        ' contracts_laborcategorycount_search_index_update '
+                        ' ON contracts_laborcategorycount; '
+        ),
+    ]
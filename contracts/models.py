@@ -1,5 +1,7 @@
 import re
-from django.db import models
+import uuid
+from django.db import connection, models, transaction
+from django.db.models import Count
 from django.contrib.auth.models import User
 from djorm_pgfulltext.models import SearchManager, SearchQuerySet
 from djorm_pgfulltext.fields import VectorField
@@ -12,6 +14,20 @@ EDUCATION_CHOICES = (
     ('PHD', 'Ph.D.'),
 )
 
+# The value of Contract.education_rank for each education level, used
+# to sort contracts by education. Contracts with no (or an unknown)
+# education level have a rank of NO_EDUCATION_RANK.
+EDUCATION_RANKS = dict(
+    (code, rank) for rank, (code, _) in enumerate(EDUCATION_CHOICES, 1)
+)
+
+NO_EDUCATION_RANK = -1
+
+EDUCATION_SORT_FIELDS = {
+    'education_level': 'education_rank',
+    '-education_level': '-education_rank',
+}
+
 
 def convert_to_tsquery(query):
     """
@@ -62,57 +78,100 @@ def convert_to_tsquery_union(queries):
     return " | ".join(queries)
 
 
-class CurrentContractManager(SearchManager):
-    # need to subclass the SearchManager we were using for postgres full text
-    # search instead of default
+class PhraseSearchQuerySet(SearchQuerySet):
+
+    def multi_phrase_search(self, queries):
+        if isinstance(queries, str):
+            queries = [queries]
+        return self.search(convert_to_tsquery_union(queries), raw=True)
+
+
+class PhraseSearchManager(SearchManager):
 
     def multi_phrase_search(self, *args, **kwargs):
         return self.get_queryset().multi_phrase_search(*args, **kwargs)
 
+    def get_queryset(self):
+        return PhraseSearchQuerySet(self.model, using=self._db)
+
+
+class CurrentContractManager(PhraseSearchManager):
+    # need to subclass the SearchManager we were using for postgres full text
+    # search instead of default
+
     def get_queryset(self):
         return ContractsQuerySet(self.model, using=self._db)\
             .filter(current_price__gt=0)\
             .exclude(current_price__isnull=True)
 
 
-class ContractsQuerySet(SearchQuerySet):
-
-    def multi_phrase_search(self, queries):
-        if isinstance(queries, str):
-            queries = [queries]
-        return self.search(convert_to_tsquery_union(queries), raw=True)
+class ContractsQuerySet(PhraseSearchQuerySet):
 
     def order_by(self, *args, **kwargs):
-        edu_sort_sql = """
-            case
-                when education_level = 'HS' then 1
-                when education_level = 'AA' then 2
-                when education_level = 'BA' then 3
-                when education_level = 'MA' then 4
-                when education_level = 'PHD' then 5
-                else -1
-            end
-        """
-
-        edu_index = None
-
-        sort_params = list(args)
-
-        if 'education_level' in sort_params:
-            edu_index = sort_params.index('education_level')
-        elif '-education_level' in sort_params:
-            edu_index = sort_params.index('-education_level')
-
-        if edu_index is not None:
-            sort_params[edu_index] = 'edu_sort' if not args[
-                edu_index].startswith('-') else '-edu_sort'
-            queryset = super(ContractsQuerySet, self)\
-                .extra(select={'edu_sort': edu_sort_sql}, order_by=sort_params)
-        else:
-            queryset = super(ContractsQuerySet, self)\
-                .order_by(*args, **kwargs)
+        # Education levels are sorted by rank (e.g. High School before
+        # Bachelors) rather than alphabetically by code.
+        sort_params = [EDUCATION_SORT_FIELDS.get(arg, arg) for arg in args]
+
+        return super(ContractsQuerySet, self)\
+            .order_by(*sort_params, **kwargs)
 
-        return queryset
+
+class DataVersion(models.Model):
+    '''
+    Singleton model holding an opaque token that changes whenever
+    Contract data is written, so that anything derived from Contract
+    data (e.g. cached API results) can tell when it has gone stale.
+
+    The token is random rather than a counter so that a version created
+    in a transaction which was later rolled back is never reused.
+    '''
+
+    SINGLETON_ID = 1
+
+    token = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def get_current(cls):
+        '''
+        Returns the current data version token.
+        '''
+
+        token = cls.objects.filter(pk=cls.SINGLETON_ID)\
+            .values_list('token', flat=True).first()
+        return token or ''
+
+    @classmethod
+    def bump(cls, labor_categories=None):
+        '''
+        Marks Contract data as changed, returning the new token. This
+        should be called once by every code path that writes Contract
+        data (e.g. the loaders, bulk uploads and price list approval),
+        after it has finished writing. Contract.save() and
+        Contract.delete() don't call it, so that writing many contracts
+        doesn't churn the version once per row.
+
+        This also rebuilds LaborCategoryCount, in the caller's transaction
+        if there is one, so the new counts are committed along with the
+        data they came from. Until then, readers see the previous counts.
+
+        Rebuilding every count groups the whole contracts table, and
+        other writers wait for it, since they need the version's row
+        lock. Code paths that only write a few contracts should pass the
+        labor_categories of the contracts they wrote (or deleted), so
+        that only those counts are recomputed.
+        '''
+
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            # Updating the version locks its row, so concurrent writers
+            # rebuild the counts one at a time.
+            cls.objects.update_or_create(
+                pk=cls.SINGLETON_ID,
+                defaults={'token': token}
+            )
+            LaborCategoryCount.rebuild(labor_categories)
+        return token
 
 
 class BulkUploadContractSource(models.Model):
@@ -147,6 +206,10 @@ class Contract(models.Model):
     education_level = models.CharField(
         db_index=True, choices=EDUCATION_CHOICES, max_length=5, null=True,
         blank=True)
+    # Denormalized from education_level by get_education_rank(), so
+    # sorting by education can use an index.
+    education_rank = models.IntegerField(
+        db_index=True, default=NO_EDUCATION_RANK)
     min_years_experience = models.IntegerField(db_index=True)
     hourly_rate_year1 = models.DecimalField(max_digits=10, decimal_places=2)
     hourly_rate_year2 = models.DecimalField(
@@ -170,6 +233,9 @@ class Contract(models.Model):
     business_size = models.CharField(
         db_index=True, max_length=128, null=True, blank=True)
     sin = models.TextField(null=True, blank=True)
+    # A hash of the other loaded fields, set by loaders that support
+    # reloading only the contracts that changed (see loaders/upsert.py).
+    content_hash = models.CharField(max_length=32, blank=True)
 
     search_index = VectorField()
 
@@ -181,16 +247,25 @@ class Contract(models.Model):
     )
 
     # use a manager that filters by current contracts with a valid
-    # current_price
+    # current_price. search_index itself is maintained by a database
+    # trigger (see migration 0020), so it's never updated from Python.
     objects = CurrentContractManager(
         fields=('labor_category',),
         config='pg_catalog.english',
         search_field='search_index',
-        auto_update_search_field=True
+        auto_update_search_field=False
     )
 
+    def save(self, *args, **kwargs):
+        self.education_rank = self.get_education_rank(self.education_level)
+        super().save(*args, **kwargs)
+
     def get_readable_business_size(self):
-        if 's' in self.business_size.lower():
+        return self.readable_business_size(self.business_size)
+
+    @staticmethod
+    def readable_business_size(business_size):
+        if 's' in (business_size or '').lower():
             return 'small business'
         else:
             return 'other than small business'
@@ -203,6 +278,64 @@ class Contract(models.Model):
 
         return None
 
+    @staticmethod
+    def get_education_rank(education_level):
+        return EDUCATION_RANKS.get(education_level, NO_EDUCATION_RANK)
+
     @staticmethod
     def normalize_rate(rate):
         return float(rate.replace(',', '').replace('$', ''))
+
+
+class LaborCategoryCount(models.Model):
+    '''
+    The distinct labor categories of current contracts (i.e. those in
+    Contract.objects), along with the number of contracts in each.
+
+    This is rebuilt from Contract data by DataVersion.bump() whenever
+    Contract data is written, so that autocompleting labor categories
+    doesn't have to group the whole contracts table on every keystroke.
+    '''
+
+    labor_category = models.TextField(unique=True)
+    count = models.IntegerField(db_index=True)
+
+    # Maintained by a database trigger, like Contract.search_index.
+    search_index = VectorField()
+
+    objects = PhraseSearchManager(
+        fields=('labor_category',),
+        config='pg_catalog.english',
+        search_field='search_index',
+        auto_update_search_field=False
+    )
+
+    @classmethod
+    def rebuild(cls, labor_categories=None):
+        '''
+        Replaces all labor category counts with ones computed from the
+        current Contract data, or if labor_categories is given, just the
+        counts of those labor categories.
+        '''
+
+        counts = cls.objects.all()
+        contracts = Contract.objects.order_by()
+        if labor_categories is not None:
+            labor_categories = list(labor_categories)
+            if not labor_categories:
+                return
+            counts = counts.filter(labor_category__in=labor_categories)
+            contracts = contracts.filter(
+                labor_category__in=labor_categories)
+
+        sql, params = contracts.values('labor_category')\
+            .annotate(count=Count('id'))\
+            .query.sql_with_params()
+        table = cls._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            counts.delete()
+            cursor.execute(
+                'INSERT INTO {} (labor_category, count) {}'.format(
+                    table, sql),
+                params
+            )
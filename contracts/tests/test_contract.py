@@ -2,7 +2,8 @@ from django.test import TestCase
 from contracts.mommy_recipes import get_contract_recipe
 from itertools import cycle
 
-from ..models import Contract, convert_to_tsquery
+from ..models import (Contract, DataVersion, LaborCategoryCount,
+                      convert_to_tsquery)
 
 
 class ContractTestCase(TestCase):
@@ -21,6 +22,33 @@ class ContractTestCase(TestCase):
         self.assertEqual(c.get_education_code('Bachelors'), 'BA')
         self.assertIsNone(c.get_education_code('Nursing'), None)
 
+    def test_get_education_rank(self):
+        self.assertEqual(Contract.get_education_rank('HS'), 1)
+        self.assertEqual(Contract.get_education_rank('PHD'), 5)
+        self.assertEqual(Contract.get_education_rank(None), -1)
+
+    def test_save_sets_education_rank(self):
+        c = get_contract_recipe().make(education_level='MA')
+        self.assertEqual(c.education_rank, 4)
+        c.education_level = None
+        c.save()
+        c.refresh_from_db()
+        self.assertEqual(c.education_rank, -1)
+
+    def test_order_by_education_level_uses_rank(self):
+        get_contract_recipe().make(
+            _quantity=4, education_level=cycle(['PHD', 'AA', None, 'BA']))
+        self.assertEqual(
+            [c.education_level
+             for c in Contract.objects.order_by('education_level')],
+            [None, 'AA', 'BA', 'PHD']
+        )
+        self.assertEqual(
+            [c.education_level
+             for c in Contract.objects.order_by('-education_level')],
+            ['PHD', 'BA', 'AA', None]
+        )
+
     def test_normalize_rate(self):
         c = get_contract_recipe().make()
         self.assertEqual(c.normalize_rate('$1,000.00,'), 1000.0)
@@ -105,3 +133,92 @@ class ContractSearchTestCase(TestCase):
             u'Interpretation Services Class 1: Spanish',
             u'Interpretation Services Class 2: French, German, Italian'
         ])
+
+    def test_search_index_is_set_by_bulk_create(self):
+        Contract.objects.bulk_create([
+            get_contract_recipe().prepare(labor_category='Archivist')
+        ])
+        results = Contract.objects.multi_phrase_search(['archivist'])
+        self.assertCategoriesEqual(results, [u'Archivist'])
+
+    def test_search_index_is_updated_with_labor_category(self):
+        contract = self.contracts[0]
+        contract.labor_category = 'Archivist'
+        contract.save()
+        results = Contract.objects.multi_phrase_search(['archivist'])
+        self.assertCategoriesEqual(results, [u'Archivist'])
+        results = Contract.objects.multi_phrase_search(['sign language'])
+        self.assertCategoriesEqual(results, [
+            u'Foreign Language Staff Interpreter (Spanish sign language)',
+        ])
+
+
+class DataVersionTestCase(TestCase):
+
+    def test_get_current_defaults_to_empty(self):
+        self.assertEqual(DataVersion.get_current(), '')
+
+    def test_bump_changes_version(self):
+        token = DataVersion.bump()
+        self.assertEqual(DataVersion.get_current(), token)
+        self.assertNotEqual(DataVersion.bump(), token)
+
+    def test_saving_and_deleting_contracts_does_not_bump_version(self):
+        before = DataVersion.get_current()
+        contract = get_contract_recipe().make()
+        contract.delete()
+        self.assertEqual(DataVersion.get_current(), before)
+
+
+class LaborCategoryCountTestCase(TestCase):
+
+    def get_counts(self):
+        return list(LaborCategoryCount.objects.order_by('labor_category')
+                    .values_list('labor_category', 'count'))
+
+    def test_bump_rebuilds_counts_of_current_contracts(self):
+        get_contract_recipe().make(
+            _quantity=3, labor_category=cycle(['Tester', 'Manager']))
+        get_contract_recipe().make(labor_category='Tester',
+                                   current_price=None)
+        DataVersion.bump()
+        self.assertEqual(self.get_counts(), [('Manager', 1), ('Tester', 2)])
+
+    def test_counts_are_not_rebuilt_until_bump(self):
+        get_contract_recipe().make(labor_category='Tester')
+        DataVersion.bump()
+        get_contract_recipe().make(labor_category='Tester')
+        self.assertEqual(self.get_counts(), [('Tester', 1)])
+        DataVersion.bump()
+        self.assertEqual(self.get_counts(), [('Tester', 2)])
+
+    def test_bump_can_rebuild_only_some_counts(self):
+        tester, manager = get_contract_recipe().make(
+            _quantity=2, labor_category=cycle(['Tester', 'Manager']))
+        DataVersion.bump()
+        get_contract_recipe().make(labor_category='Tester')
+        get_contract_recipe().make(labor_category='Manager')
+        get_contract_recipe().make(labor_category='Engineer')
+        tester.delete()
+
+        DataVersion.bump(labor_categories=['Tester', 'Engineer'])
+
+        self.assertEqual(self.get_counts(), [
+            ('Engineer', 1), ('Manager', 1), ('Tester', 1)])
+        DataVersion.bump(labor_categories=[])
+        self.assertEqual(self.get_counts(), [
+            ('Engineer', 1), ('Manager', 1), ('Tester', 1)])
+
+    def test_bump_removes_counts_of_vanished_labor_categories(self):
+        contract = get_contract_recipe().make(labor_category='Tester')
+        DataVersion.bump()
+        contract.delete()
+        DataVersion.bump(labor_categories=['Tester'])
+        self.assertEqual(self.get_counts(), [])
+
+    def test_multi_phrase_search(self):
+        get_contract_recipe().make(
+            _quantity=2, labor_category=cycle(['Tester', 'Manager']))
+        DataVersion.bump()
+        results = LaborCategoryCount.objects.multi_phrase_search('test')
+        self.assertEqual([r.labor_category for r in results], ['Tester'])
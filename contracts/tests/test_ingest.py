@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from contracts.loaders.ingest import insert_contracts
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import Contract
+
+FIELDS = ('labor_category', 'schedule', 'min_years_experience',
+          'hourly_rate_year1', 'current_price', 'next_year_price',
+          'education_level', 'education_rank', 'sin', 'contract_start')
+
+
+class InsertContractsTestCase(TestCase):
+
+    def prepare(self):
+        return get_contract_recipe().prepare(
+            _quantity=3, sin='', education_level='BA', education_rank=3)
+
+    def get_values(self):
+        return list(Contract.objects.order_by('piid').values(*FIELDS))
+
+    def test_backends_insert_the_same_values(self):
+        contracts = self.prepare()
+
+        self.assertEqual(insert_contracts(contracts, backend='orm'), 3)
+        orm_values = self.get_values()
+        Contract.objects.all().delete()
+
+        self.assertEqual(insert_contracts(contracts, backend='copy'), 3)
+        self.assertEqual(self.get_values(), orm_values)
+
+    def test_skips_none(self):
+        for backend in ('orm', 'copy'):
+            self.assertEqual(
+                insert_contracts([None] + self.prepare(), backend=backend),
+                3
+            )
+
+    def test_copy_sets_search_index(self):
+        contract = get_contract_recipe().prepare(labor_category='Archivist')
+        insert_contracts([contract], backend='copy')
+        results = Contract.objects.multi_phrase_search('archivist')
+        self.assertEqual([c.labor_category for c in results], ['Archivist'])
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            insert_contracts([], backend='carrier pigeon')
@@ -1,13 +1,17 @@
+import csv
 import os
+import tempfile
 
 from collections import OrderedDict
 from datetime import date
+from django.core.exceptions import ValidationError
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 
+from contracts.loaders.parallel import find_shards, parse_shard
 from contracts.loaders.region_10 import FEDERAL_MIN_CONTRACT_RATE
 from contracts.loaders.schedule_70 import Schedule70Loader
-from contracts.models import Contract
+from contracts.models import Contract, DataVersion
 from contracts.mommy_recipes import get_contract_recipe
 
 
@@ -39,6 +43,55 @@ class LoadS70TestCase(TestCase):
         self.load(self.sample_filename)
         self.assertEquals(Contract.objects.count(), 20)
 
+    def test_loads_sample_with_copy_backend(self):
+        self.load(self.sample_filename, backend='copy')
+        self.assertEquals(Contract.objects.count(), 20)
+
+    def test_loads_sample_with_workers(self):
+        self.load(self.sample_filename, workers=2)
+        self.assertEquals(Contract.objects.count(), 20)
+
+    def test_loads_bad_sample_with_workers(self):
+        self.load(self.bad_filename, workers=3)
+        self.assertEquals(Contract.objects.count(), 18)
+
+    def test_strict_mode_fails_with_workers(self):
+        self.assertRaises(
+            ValueError,
+            self.load,
+            self.bad_filename,
+            strict=True,
+            workers=2
+        )
+
+    def test_loads_sample_with_full_clean(self):
+        self.load(self.sample_filename, full_clean=True)
+        self.assertEquals(Contract.objects.count(), 20)
+
+    def test_upsert_only_changes_what_changed(self):
+        self.load(self.sample_filename)
+        ids = set(Contract.objects.values_list('id', flat=True))
+        before = DataVersion.get_current()
+
+        self.load(self.sample_filename, upsert=True)
+
+        self.assertEquals(
+            set(Contract.objects.values_list('id', flat=True)), ids)
+        self.assertEquals(DataVersion.get_current(), before)
+
+    def test_upsert_reports_counts(self):
+        counts = Schedule70Loader().load(
+            os.path.join(os.path.dirname(__file__), self.sample_filename),
+            upsert=True
+        )
+        self.assertEquals(counts.inserted, 20)
+        self.assertEquals(counts.unchanged, 0)
+
+    def test_bumps_data_version(self):
+        before = DataVersion.get_current()
+        self.load(self.sample_filename)
+        self.assertNotEqual(DataVersion.get_current(), before)
+
     def test_loads_bad_sample_and_warns(self):
         self.load(self.bad_filename)
         self.assertEquals(Contract.objects.count(), 18)
@@ -116,6 +169,11 @@ class LoadS70TestCase(TestCase):
         contract = Schedule70Loader.make_contract(row_messy_category)
         self.assertEquals(contract.labor_category, 'Messy Category')
 
+    def test_sets_education_rank(self):
+        c = Schedule70Loader.make_contract(self.make_row())
+        self.assertEqual(c.education_level, 'BA')
+        self.assertEqual(c.education_rank, 3)
+
     def test_sets_hourly1_and_current_price(self):
         price = 999.99
         c = Schedule70Loader.make_contract(self.make_row(price=str(price)))
@@ -127,3 +185,64 @@ class LoadS70TestCase(TestCase):
         c = Schedule70Loader.make_contract(self.make_row(price=str(price)))
         self.assertEquals(c.hourly_rate_year1, price)
         self.assertIsNone(c.current_price)
+
+    def test_make_contract_skips_full_clean(self):
+        row = self.make_row(company_name='x' * 129)
+        self.assertRaises(
+            ValidationError,
+            Schedule70Loader.make_contract,
+            row
+        )
+        Schedule70Loader.make_contract(row, full_clean=False)
+
+    def test_parse_rows_skips_invalid_rows(self):
+        rows = [self.make_row(), self.make_row(company_name='x' * 129),
+                self.make_row(price='')]
+        contracts, count, skipped = Schedule70Loader.parse_rows(rows)
+        self.assertEqual(count, 1)
+        self.assertEqual(skipped, 2)
+        self.assertEqual(contracts[0].vendor_name, '18F')
+
+    def test_parse_rows_strict_mode_fails_on_invalid_rows(self):
+        rows = [self.make_row(), self.make_row(company_name='x' * 129)]
+        with self.assertRaises(ValidationError) as cm:
+            Schedule70Loader.parse_rows(rows, strict=True, start=2)
+        self.assertIn('vendor_name', cm.exception.message_dict)
+
+    def test_parallel_parse_errors_have_row_numbers(self):
+        rows = [self.make_row(labor_category='Tester\nII'), self.make_row(),
+                self.make_row(), self.make_row(price='BAD_PRICE_DATA')]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            writer = csv.writer(f)
+            writer.writerow(['header'])
+            writer.writerows(rows)
+            f.flush()
+
+            with open(f.name, 'rb') as data:
+                shards = find_shards(data.read(), 2, header_rows=1)
+            start, end, first_row = shards[-1]
+
+            with self.assertLogs('contracts.loaders.schedule_70') as cm:
+                with self.assertRaises(ValueError):
+                    parse_shard(Schedule70Loader, f.name, start, end,
+                                first_row, strict=True)
+        self.assertIn('error parsing row 5 ', cm.output[0])
+
+
+class LoadS70StagingTestCase(TransactionTestCase):
+    # Swapping in the staging table alters tables, which can't be done
+    # inside a TestCase's transaction once rows have been written in it.
+    sample_filename = LoadS70TestCase.sample_filename
+    load = LoadS70TestCase.load
+    make_initial_data = LoadS70TestCase.make_initial_data
+
+    def test_staging_replaces_only_schedule(self):
+        self.make_initial_data(3)
+        other = get_contract_recipe().make(schedule='MOBIS')
+        self.load(self.sample_filename, staging=True)
+        self.assertEquals(
+            Contract.objects.filter(
+                schedule=Schedule70Loader.schedule_name).count(),
+            20
+        )
+        self.assertTrue(Contract.objects.filter(pk=other.pk).exists())
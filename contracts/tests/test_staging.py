@@ -0,0 +1,95 @@
+from unittest.mock import Mock, patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.test import TransactionTestCase
+from model_mommy import mommy
+
+from contracts.loaders.staging import replace_contracts
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import Contract, DataVersion
+from data_capture.models import SubmittedPriceListRow
+
+
+class ReplaceContractsTestCase(TransactionTestCase):
+
+    def prepare(self, **kwargs):
+        return get_contract_recipe().prepare(**kwargs)
+
+    def test_replaces_all_contracts(self):
+        get_contract_recipe().make(_quantity=3)
+        count = replace_contracts([
+            self.prepare(labor_category='Tester'),
+            self.prepare(labor_category='Manager'),
+        ])
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            sorted(Contract.objects.values_list('labor_category', flat=True)),
+            ['Manager', 'Tester']
+        )
+
+    def test_keeps_contracts(self):
+        kept = get_contract_recipe().make(schedule='MOBIS')
+        get_contract_recipe().make(schedule='PES')
+        replace_contracts(
+            [self.prepare(schedule='PES', labor_category='Tester')],
+            keep=Contract._base_manager.exclude(schedule='PES')
+        )
+        self.assertEqual(Contract.objects.get(schedule='MOBIS').id, kept.id)
+        self.assertEqual(
+            Contract.objects.get(schedule='PES').labor_category, 'Tester')
+
+    def test_copies_nulls_and_empty_strings(self):
+        replace_contracts([self.prepare(sin='', education_level=None,
+                                        contract_end=None)])
+        contract = Contract.objects.get()
+        self.assertEqual(contract.sin, '')
+        self.assertIsNone(contract.education_level)
+        self.assertIsNone(contract.contract_end)
+
+    def test_sets_search_index(self):
+        replace_contracts([self.prepare(labor_category='Archivist')])
+        results = Contract.objects.multi_phrase_search('archivist')
+        self.assertEqual([c.labor_category for c in results], ['Archivist'])
+
+    def test_new_table_keeps_indexes_and_sequence(self):
+        replace_contracts([self.prepare()])
+        existing = Contract.objects.get()
+        contract = get_contract_recipe().make()
+        self.assertGreater(contract.id, existing.id)
+        self.assertEqual(Contract.objects.count(), 2)
+
+    def test_nulls_references_to_removed_contracts(self):
+        kept, removed = get_contract_recipe().make(
+            _quantity=2, schedule='MOBIS')
+        kept_row = mommy.make(SubmittedPriceListRow, contract_model=kept)
+        removed_row = mommy.make(SubmittedPriceListRow,
+                                 contract_model=removed)
+        replace_contracts([], keep=Contract._base_manager.filter(id=kept.id))
+        kept_row.refresh_from_db()
+        removed_row.refresh_from_db()
+        self.assertEqual(kept_row.contract_model_id, kept.id)
+        self.assertIsNone(removed_row.contract_model_id)
+
+    def test_works_after_writes_in_enclosing_transaction(self):
+        with transaction.atomic():
+            contract = get_contract_recipe().make()
+            row = mommy.make(SubmittedPriceListRow, contract_model=contract)
+            replace_contracts([self.prepare()])
+        row.refresh_from_db()
+        self.assertIsNone(row.contract_model_id)
+        self.assertEqual(Contract.objects.count(), 1)
+
+    def test_bumps_data_version(self):
+        before = DataVersion.get_current()
+        replace_contracts([self.prepare()])
+        self.assertNotEqual(DataVersion.get_current(), before)
+
+    def test_requires_references_to_be_set_null(self):
+        get_contract_recipe().make()
+        rel = Mock(on_delete=models.CASCADE, field='foo.Bar.contract')
+        with patch.object(Contract._meta, 'related_objects', [rel]):
+            with self.assertRaisesRegexp(ImproperlyConfigured,
+                                         r'foo\.Bar\.contract'):
+                replace_contracts([self.prepare()])
+        self.assertEqual(Contract.objects.count(), 1)
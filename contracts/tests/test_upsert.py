@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from contracts.loaders.upsert import (
+    get_content_hash, upsert_contracts, UpsertCounts
+)
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import Contract, DataVersion
+
+
+class UpsertContractsTestCase(TestCase):
+
+    def prepare(self, **kwargs):
+        kwargs.setdefault('schedule', 'PES')
+        kwargs.setdefault('labor_category', 'Tester')
+        kwargs.setdefault('vendor_name', 'Vendor')
+        kwargs.setdefault('idv_piid', 'GS-123')
+        kwargs.setdefault('sin', '132-51')
+        kwargs.setdefault('piid', 'GS-123-P1')
+        return get_contract_recipe().prepare(**kwargs)
+
+    def upsert(self, contracts):
+        return upsert_contracts(
+            contracts, Contract._base_manager.filter(schedule='PES'))
+
+    def test_content_hash_normalizes_values(self):
+        self.assertEqual(
+            get_content_hash(self.prepare(hourly_rate_year1=125.44)),
+            get_content_hash(self.prepare(hourly_rate_year1=Decimal(
+                '125.44')))
+        )
+        self.assertNotEqual(
+            get_content_hash(self.prepare(hourly_rate_year1=125.44)),
+            get_content_hash(self.prepare(hourly_rate_year1=125.45))
+        )
+
+    def test_inserts_new_contracts(self):
+        counts = self.upsert([self.prepare(labor_category='A'),
+                              self.prepare(labor_category='B')])
+        self.assertEqual(counts, UpsertCounts(2, 0, 0, 0))
+        self.assertEqual(Contract.objects.count(), 2)
+        self.assertTrue(all(c.content_hash for c in Contract.objects.all()))
+
+    def test_leaves_unchanged_contracts_alone(self):
+        self.upsert([self.prepare(labor_category='A')])
+        existing = Contract.objects.get()
+        before = DataVersion.get_current()
+
+        counts = self.upsert([self.prepare(labor_category='A')])
+
+        self.assertEqual(counts, UpsertCounts(0, 0, 0, 1))
+        self.assertEqual(Contract.objects.get().id, existing.id)
+        self.assertEqual(DataVersion.get_current(), before)
+
+    def test_updates_changed_contracts(self):
+        self.upsert([self.prepare(current_price=50)])
+        existing = Contract.objects.get()
+
+        counts = self.upsert([self.prepare(current_price=60)])
+
+        self.assertEqual(counts, UpsertCounts(0, 1, 0, 0))
+        contract = Contract.objects.get()
+        self.assertEqual(contract.id, existing.id)
+        self.assertEqual(contract.current_price, 60)
+        self.assertNotEqual(contract.content_hash, existing.content_hash)
+
+    def test_updates_contracts_without_hashes(self):
+        get_contract_recipe().make(
+            schedule='PES', labor_category='Tester', vendor_name='Vendor',
+            idv_piid='GS-123', sin='132-51')
+        counts = self.upsert([self.prepare()])
+        self.assertEqual(counts, UpsertCounts(0, 1, 0, 0))
+
+    def test_deletes_vanished_contracts(self):
+        self.upsert([self.prepare(labor_category='A'),
+                     self.prepare(labor_category='B')])
+        counts = self.upsert([self.prepare(labor_category='A')])
+        self.assertEqual(counts, UpsertCounts(0, 0, 1, 1))
+        self.assertEqual(
+            list(Contract.objects.values_list('labor_category', flat=True)),
+            ['A']
+        )
+
+    def test_only_changes_queryset(self):
+        other = get_contract_recipe().make(schedule='MOBIS')
+        self.upsert([self.prepare()])
+        self.assertTrue(Contract.objects.filter(pk=other.pk).exists())
+
+    def test_matches_duplicate_keys_by_hash(self):
+        self.upsert([self.prepare(current_price=50),
+                     self.prepare(current_price=60)])
+        ids = dict(Contract.objects.values_list('current_price', 'id'))
+
+        counts = self.upsert([self.prepare(current_price=60),
+                              self.prepare(current_price=70)])
+
+        self.assertEqual(counts, UpsertCounts(0, 1, 0, 1))
+        self.assertEqual(
+            dict(Contract.objects.values_list('current_price', 'id')),
+            {60: ids[60], 70: ids[50]}
+        )
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from contracts.loaders.validation import BatchValidator
+from contracts.mommy_recipes import get_contract_recipe
+from contracts.models import Contract
+
+
+class BatchValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.validator = BatchValidator(Contract, exclude=['piid'])
+
+    def validate(self, **kwargs):
+        valid = get_contract_recipe().prepare()
+        invalid = get_contract_recipe().prepare(**kwargs)
+        return self.validator.validate([valid, invalid])
+
+    def assertInvalidField(self, field, **kwargs):
+        errors = self.validate(**kwargs)
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(list(errors[1].message_dict), [field])
+
+    def test_valid_contracts_have_no_errors(self):
+        contracts = get_contract_recipe().prepare(_quantity=3)
+        self.assertEqual(self.validator.validate(contracts), {})
+
+    def test_required_fields(self):
+        self.assertInvalidField('vendor_name', vendor_name='')
+        self.assertInvalidField('min_years_experience',
+                                min_years_experience=None)
+
+    def test_blank_fields(self):
+        errors = self.validate(sin=None, contract_end=None,
+                               education_level='')
+        self.assertEqual(errors, {})
+
+    def test_excluded_fields(self):
+        self.assertEqual(self.validate(piid=''), {})
+
+    def test_max_length(self):
+        self.assertInvalidField('vendor_name', vendor_name='x' * 129)
+        self.assertEqual(self.validate(vendor_name='x' * 128), {})
+
+    def test_choices(self):
+        self.assertInvalidField('education_level', education_level='XYZ')
+
+    def test_decimal_digits(self):
+        self.assertInvalidField('hourly_rate_year1',
+                                hourly_rate_year1=100000000.0)
+        self.assertInvalidField('current_price',
+                                current_price=Decimal('99999999.999'))
+        self.assertEqual(self.validate(hourly_rate_year1=99999999.99), {})
+
+    def test_integer_range(self):
+        self.assertInvalidField('contract_year', contract_year=2 ** 31)
+
+    def test_reports_every_error(self):
+        errors = self.validate(vendor_name='', education_level='XYZ')
+        self.assertEqual(sorted(errors[1].message_dict),
+                         ['education_level', 'vendor_name'])
+
+    def test_matches_full_clean(self):
+        contract = get_contract_recipe().prepare(vendor_name='x' * 129)
+        errors = self.validator.validate([contract])
+        with self.assertRaises(ValidationError) as cm:
+            contract.full_clean(exclude=['piid'])
+        self.assertEqual(errors[0].message_dict, cm.exception.message_dict)
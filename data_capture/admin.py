@@ -1,14 +1,18 @@
+import django_rq
+from django.conf.urls import url
 from django.contrib import admin
 from django.db import models
 from django import forms
 from django.core.urlresolvers import reverse
+from django.http import Http404
+from django.shortcuts import render
 from django.utils.safestring import mark_safe
 from django.utils.html import format_html
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
 
-from . import email
+from . import jobs
 from .schedules import registry
 from .models import SubmittedPriceList, SubmittedPriceListRow
 
@@ -77,39 +81,45 @@ class SubmittedPriceListRowInline(admin.TabularInline):
         return self.readonly_fields
 
 
-def approve(modeladmin, request, queryset):
-    unapproved = queryset.filter(is_approved=False)
-    count = unapproved.count()
-    for price_list in unapproved:
-        price_list.approve()
-        email.price_list_approved(price_list)
+def enqueue_price_list_job(request, queryset, job, message):
+    ids = list(queryset.values_list('id', flat=True))
+    if not ids:
+        messages.add_message(request, messages.INFO, message.format(0))
+        return
 
+    enqueued_job = job.delay(ids)
     messages.add_message(
         request,
         messages.INFO,
-        '{} price list(s) have been approved and added to CALC.'.format(
-            count
+        format_html(
+            '{} <a href="{}">Check progress</a>.',
+            message.format(len(ids)),
+            reverse('admin:data_capture_submittedpricelist_job_status',
+                    args=(enqueued_job.id,))
         )
     )
 
 
+def approve(modeladmin, request, queryset):
+    enqueue_price_list_job(
+        request,
+        queryset.filter(is_approved=False),
+        jobs.approve_price_lists,
+        '{} price list(s) will be approved and added to CALC.'
+    )
+
+
 approve.short_description = (
     'Approve selected price lists (add their data to CALC)'
 )
 
 
 def unapprove(modeladmin, request, queryset):
-    approved = queryset.filter(is_approved=True)
-    count = approved.count()
-    for price_list in approved:
-        price_list.unapprove()
-        email.price_list_unapproved(price_list)
-    messages.add_message(
+    enqueue_price_list_job(
         request,
-        messages.INFO,
-        '{} price list(s) have been unapproved and removed from CALC.'.format(
-            count
-        )
+        queryset.filter(is_approved=True),
+        jobs.unapprove_price_lists,
+        '{} price list(s) will be unapproved and removed from CALC.'
     )
 
 
@@ -198,6 +208,36 @@ class SubmittedPriceListAdmin(UndeletableModelAdmin):
 
     schedule_title.short_description = 'Schedule'
 
+    def get_urls(self):
+        return [
+            url(r'^jobs/(?P<job_id>[\w-]+)/$',
+                self.admin_site.admin_view(self.job_status),
+                name='data_capture_submittedpricelist_job_status'),
+        ] + super().get_urls()
+
+    def job_status(self, request, job_id):
+        '''
+        Shows the progress of a job started by the approve or unapprove
+        actions.
+        '''
+
+        job = django_rq.get_queue().fetch_job(job_id)
+        if job is None:
+            raise Http404()
+        progress = jobs.get_progress(job_id)
+
+        return render(
+            request,
+            'admin/data_capture/submittedpricelist/job_status.html', {
+                'title': 'Price list job progress',
+                'opts': self.model._meta,
+                'job': job,
+                'status': job.get_status(),
+                'done': progress.get('done', 0),
+                'total': progress.get('total'),
+                'is_over': job.is_finished or job.is_failed,
+            })
+
     def has_add_permission(self, request):
         return False
 
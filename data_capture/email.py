@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.template.loader import render_to_string
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -14,47 +14,67 @@ class EmailResult():
         self.context = context or {}
 
 
-def price_list_approved(price_list):
-    ctx = {
-        'price_list': price_list
-    }
+def price_list_approved_message(price_list):
     if not price_list.is_approved:
         raise AssertionError('price_list.is_approved must be True')
 
-    result = send_mail(
+    return EmailMessage(
         subject='CALC Price List Approved',
-        message=render_to_string(
+        body=render_to_string(
             'data_capture/email/price_list_approved.txt',
-            ctx),
+            {'price_list': price_list}),
         from_email=settings.SYSTEM_EMAIL_ADDRESS,
-        recipient_list=[price_list.submitter.email]
+        to=[price_list.submitter.email]
     )
+
+
+def price_list_approved(price_list):
+    ctx = {
+        'price_list': price_list
+    }
+    result = price_list_approved_message(price_list).send()
     return EmailResult(
         was_successful=result is 1,
         context=ctx
     )
 
 
-def price_list_unapproved(price_list):
-    ctx = {
-        'price_list': price_list
-    }
+def price_list_unapproved_message(price_list):
     if price_list.is_approved:
         raise AssertionError('price_list.is_approved must be False')
-    result = send_mail(
+
+    return EmailMessage(
         subject='CALC Price List Unapproved',
-        message=render_to_string(
+        body=render_to_string(
             'data_capture/email/price_list_unapproved.txt',
-            ctx),
+            {'price_list': price_list}),
         from_email=settings.SYSTEM_EMAIL_ADDRESS,
-        recipient_list=[price_list.submitter.email]
+        to=[price_list.submitter.email]
     )
+
+
+def price_list_unapproved(price_list):
+    ctx = {
+        'price_list': price_list
+    }
+    result = price_list_unapproved_message(price_list).send()
     return EmailResult(
         was_successful=result is 1,
         context=ctx
     )
 
 
+def send_messages(messages, connection=None):
+    '''
+    Sends the given EmailMessages over a single connection, returning the
+    number of messages sent.
+    '''
+
+    if not messages:
+        return 0
+    return (connection or get_connection()).send_messages(messages)
+
+
 def bulk_upload_succeeded(upload_source, num_contracts, num_bad_rows):
     ctx = {
         'upload_source': upload_source,
@@ -44,6 +44,24 @@ class Step2Form(forms.ModelForm):
         ]
 
 
+def glean_upload(schedule, f):
+    '''
+    Interprets an uploaded file as a price list for the given schedule
+    class name (or whichever schedule makes the most sense of it),
+    raising a ValidationError if nothing can be gleaned from it.
+    '''
+
+    gleaned_data = registry.smart_load_from_upload(schedule, f)
+
+    if gleaned_data.is_empty():
+        raise forms.ValidationError(
+            "The file you uploaded doesn't have any data we can "
+            "glean from it."
+        )
+
+    return gleaned_data
+
+
 class Step3Form(forms.Form):
     # TODO: We should figure out a way of getting rid of this field, since
     # we're not actually asking the user for it anymore.
@@ -54,20 +72,21 @@ class Step3Form(forms.Form):
 
     file = forms.FileField(widget=UploadWidget())
 
+    def __init__(self, *args, glean=True, **kwargs):
+        '''
+        If glean is False, the uploaded file isn't parsed when the form
+        is cleaned, e.g. because it will be parsed in the background.
+        '''
+
+        super().__init__(*args, **kwargs)
+        self.glean = glean
+
     def clean(self):
         cleaned_data = super().clean()
         schedule = cleaned_data.get('schedule')
         file = cleaned_data.get('file')
 
-        if schedule and file:
-            gleaned_data = registry.smart_load_from_upload(schedule, file)
-
-            if gleaned_data.is_empty():
-                raise forms.ValidationError(
-                    "The file you uploaded doesn't have any data we can "
-                    "glean from it."
-                )
-
-            cleaned_data['gleaned_data'] = gleaned_data
+        if schedule and file and self.glean:
+            cleaned_data['gleaned_data'] = glean_upload(schedule, file)
 
         return cleaned_data
@@ -1,21 +1,43 @@
 import logging
 import traceback
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.core.mail import get_connection
 from django.db import transaction
+import django_rq
 from django_rq import job
+from rq import get_current_job
 
 from . import email
+from .forms.price_list import glean_upload
+from .models import PriceListDraft, PriceListUpload, SubmittedPriceList
 from .r10_spreadsheet_converter import Region10SpreadsheetConverter
+from contracts.loaders.ingest import insert_contracts, DEFAULT_BACKEND
 from contracts.loaders.region_10 import Region10Loader
-from contracts.models import Contract, BulkUploadContractSource
+from contracts.loaders.utils import iter_batches
+from contracts.models import (Contract, BulkUploadContractSource,
+                              DataVersion)
 
 
 contracts_logger = logging.getLogger('contracts')
 
 
+# The number of rows converted into contracts and saved at a time, which
+# bounds the number of Contract instances held in memory.
+BULK_UPLOAD_BATCH_SIZE = 1000
+
+# The number of price lists approved or unapproved (and emailed about)
+# at a time by approve_price_lists() and unapprove_price_lists().
+PRICE_LIST_BATCH_SIZE = 50
+
+# The number of seconds that a job's progress is kept for.
+JOB_PROGRESS_TTL = 60 * 60 * 24
+
+
 @transaction.atomic
-def _process_bulk_upload(upload_source):
+def _process_bulk_upload(upload_source, batch_size=BULK_UPLOAD_BATCH_SIZE,
+                         backend=DEFAULT_BACKEND):
     file = ContentFile(upload_source.original_file)
     converter = Region10SpreadsheetConverter(file)
 
@@ -27,37 +49,41 @@ def _process_bulk_upload(upload_source):
         upload_source__procurement_center=BulkUploadContractSource.REGION_10
     ).delete()
 
-    contracts = []
-    bad_rows = []
-
-    contracts_logger.info("Generating new contract objects.")
+    num_contracts = 0
+    num_bad_rows = 0
 
-    for row in converter.convert_next():
-        try:
-            c = Region10Loader.make_contract(row, upload_source=upload_source)
-            contracts.append(c)
-        except (ValueError, ValidationError) as e:
-            bad_rows.append(row)
+    contracts_logger.info("Generating and saving new contract objects.")
 
-    contracts_logger.info("Saving new contract objects.")
+    # Since this all happens in one transaction, readers will keep
+    # seeing the old contracts until every batch has been saved.
+    for rows in iter_batches(converter.convert_next(), batch_size):
+        contracts = []
+        for row in rows:
+            try:
+                contracts.append(Region10Loader.make_contract(
+                    row, upload_source=upload_source))
+            except (ValueError, ValidationError):
+                num_bad_rows += 1
 
-    # Save new contracts
-    Contract.objects.bulk_create(contracts)
+        num_contracts += insert_contracts(contracts, backend=backend)
 
-    contracts_logger.info("Updating full-text search indexes.")
+        contracts_logger.info(
+            "Saved %d contract objects so far (%d bad rows)." % (
+                num_contracts, num_bad_rows)
+        )
 
-    # Update search field on Contract models
-    Contract._fts_manager.update_search_field()
+    DataVersion.bump()
 
     # Update the upload_source
     upload_source.has_been_loaded = True
     upload_source.save()
 
-    return len(contracts), len(bad_rows)
+    return num_contracts, num_bad_rows
 
 
 @job
-def process_bulk_upload_and_send_email(upload_source_id):
+def process_bulk_upload_and_send_email(upload_source_id,
+                                       backend=DEFAULT_BACKEND):
     contracts_logger.info(
         "Starting bulk upload processing (pk=%d)." % upload_source_id
     )
@@ -66,7 +92,8 @@ def process_bulk_upload_and_send_email(upload_source_id):
     )
 
     try:
-        num_contracts, num_bad_rows = _process_bulk_upload(upload_source)
+        num_contracts, num_bad_rows = _process_bulk_upload(
+            upload_source, backend=backend)
         email.bulk_upload_succeeded(upload_source, num_contracts, num_bad_rows)
     except:
         contracts_logger.exception(
@@ -79,3 +106,118 @@ def process_bulk_upload_and_send_email(upload_source_id):
     contracts_logger.info(
         "Ending bulk upload processing (pk=%d)." % upload_source_id
     )
+
+
+def _get_progress_key(job_id):
+    return 'data_capture:job_progress:{}'.format(job_id)
+
+
+def _record_progress(done, total):
+    '''
+    Stores how far along the current job is, so that it can be shown
+    while the job is running. Does nothing outside a job.
+
+    This isn't stored in the job's meta because the worker overwrites
+    that with its own copy when the job finishes.
+    '''
+
+    # rq only finds its Redis connection on its own if use_connection()
+    # has been called, which SimpleWorker-based runners don't do.
+    current_job = get_current_job(connection=django_rq.get_connection())
+    if current_job is not None:
+        key = _get_progress_key(current_job.id)
+        current_job.connection.hmset(key, {'done': done, 'total': total})
+        current_job.connection.expire(key, JOB_PROGRESS_TTL)
+
+
+def get_progress(job_id):
+    '''
+    Returns a dict with the number of items the given job has processed
+    ('done') out of its 'total', or an empty dict if it hasn't started.
+    '''
+
+    progress = django_rq.get_connection().hgetall(_get_progress_key(job_id))
+    return dict((key.decode('utf-8'), int(value))
+                for key, value in progress.items())
+
+
+def _process_price_lists(price_list_ids, approve,
+                         batch_size=PRICE_LIST_BATCH_SIZE):
+    if approve:
+        update_all = SubmittedPriceList.approve_all
+        make_message = email.price_list_approved_message
+    else:
+        update_all = SubmittedPriceList.unapprove_all
+        make_message = email.price_list_unapproved_message
+
+    price_lists = list(SubmittedPriceList.objects.filter(
+        id__in=price_list_ids,
+        is_approved=not approve
+    ).select_related('submitter').order_by('id'))
+
+    total = len(price_lists)
+    done = 0
+    _record_progress(done=done, total=total)
+
+    # Every notification is sent over the same connection, rather than
+    # opening one per email.
+    connection = get_connection()
+    connection.open()
+    try:
+        for batch in iter_batches(price_lists, batch_size):
+            update_all(batch)
+            email.send_messages([make_message(price_list)
+                                 for price_list in batch],
+                                connection=connection)
+            done += len(batch)
+            _record_progress(done=done, total=total)
+            contracts_logger.info(
+                "%s %d of %d price lists." % (
+                    'Approved' if approve else 'Unapproved', done, total)
+            )
+    finally:
+        connection.close()
+
+    return done
+
+
+@job
+def approve_price_lists(price_list_ids):
+    return _process_price_lists(price_list_ids, approve=True)
+
+
+@job
+def unapprove_price_lists(price_list_ids):
+    return _process_price_lists(price_list_ids, approve=False)
+
+
+def save_price_list_upload(f):
+    '''
+    Saves an uploaded price list as a PriceListUpload for
+    glean_price_list() to interpret, returning its id.
+    '''
+
+    return PriceListUpload.create(f).id
+
+
+@job
+def glean_price_list(schedule, upload_id, submitter_id):
+    '''
+    Interprets a price list saved by save_price_list_upload() for the
+    given schedule class name in the background, returning a dict with
+    either the id of the PriceListDraft it was saved to ('draft_id') or a
+    list of validation 'errors'. The saved upload is deleted afterwards.
+    '''
+
+    upload = PriceListUpload.objects.get(id=upload_id)
+    try:
+        gleaned_data = glean_upload(schedule, upload.open())
+    except ValidationError as e:
+        return {'errors': e.messages}
+    finally:
+        upload.delete()
+    draft = PriceListDraft.create(
+        gleaned_data,
+        submitter=User.objects.get(id=submitter_id)
+    )
+    return {'draft_id': draft.id}
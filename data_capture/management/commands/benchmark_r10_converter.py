@@ -0,0 +1,73 @@
+import os
+import time
+from unittest import mock
+
+import djclick as click
+import xlrd
+from django.core.files.base import ContentFile
+
+from data_capture.r10_spreadsheet_converter import (
+    Region10SpreadsheetConverter
+)
+
+
+R10_XLSX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'static', 'data_capture', 'r10_export_sample.xlsx'
+)
+
+
+class UncachedRegion10SpreadsheetConverter(Region10SpreadsheetConverter):
+    '''
+    A converter which parses the workbook every time it's needed, as
+    Region10SpreadsheetConverter used to, kept around for comparison.
+    '''
+
+    def get_book(self):
+        self._book = None
+        return super().get_book()
+
+
+def run_bulk_upload_steps(converter_class, contents):
+    '''
+    Runs a converter through everything a bulk upload does with it,
+    returning the number of rows converted.
+    '''
+
+    converter = converter_class(ContentFile(contents))
+    if not converter.is_valid_file():
+        raise click.ClickException('not a valid Region 10 spreadsheet')
+    converter.get_metadata()
+    return len(converter.convert_file())
+
+
+@click.command()
+@click.option('--filename', default=R10_XLSX_PATH,
+              help='Region 10 spreadsheet to convert')
+@click.option('--repeat', default=3, help='number of timing runs per case')
+def command(filename, repeat):
+    '''
+    Benchmark how many times, and for how long, the Region 10 workbook is
+    parsed with and without caching the parsed workbook.
+    '''
+
+    with open(filename, 'rb') as f:
+        contents = f.read()
+
+    cases = [
+        ('uncached', UncachedRegion10SpreadsheetConverter),
+        ('cached', Region10SpreadsheetConverter),
+    ]
+
+    for name, converter_class in cases:
+        with mock.patch.object(xlrd, 'open_workbook',
+                               wraps=xlrd.open_workbook) as open_workbook:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                num_rows = run_bulk_upload_steps(converter_class, contents)
+                times.append(time.perf_counter() - start)
+
+        click.echo('{:<10} {} rows, {} parses per upload, {:.4f}s'.format(
+            name, num_rows, open_workbook.call_count // repeat, min(times)
+        ))
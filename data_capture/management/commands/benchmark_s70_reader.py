@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+import zipfile
+from unittest import mock
+
+import djclick as click
+import xlrd
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from data_capture.schedules import s70
+
+
+S70_XLSX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'static', 'data_capture', 's70_example.xlsx'
+)
+
+# The worksheet in S70_XLSX_PATH that's filled with synthetic products.
+PRODUCTS_SHEET_PATH = 'xl/worksheets/sheet2.xml'
+
+PRODUCTS_COLUMNS = 'ABCDEFGHIJ'
+
+
+def legacy_open_labor_categories_sheet(f, sheet_name):
+    '''
+    Opens the labor categories sheet by parsing the whole workbook, as
+    glean_labor_categories_from_file() used to, kept around for
+    comparison.
+    '''
+
+    return xlrd.open_workbook(file_contents=f.read()).sheet_by_name(
+        sheet_name)
+
+
+def write_products_sheet(f, uncompressed_bytes):
+    f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/'
+            'spreadsheetml/2006/main"><sheetData>')
+    written = rownum = 0
+    while written < uncompressed_bytes:
+        rownum += 1
+        row = '<row r="{}">{}</row>'.format(rownum, ''.join(
+            '<c r="{}{}" t="inlineStr"><is><t>{}</t></is></c>'.format(
+                column, rownum, uuid.uuid4().hex)
+            for column in PRODUCTS_COLUMNS
+        ))
+        f.write(row)
+        written += len(row)
+    f.write('</sheetData></worksheet>')
+
+
+def make_synthetic_workbook(filename, size_mb):
+    '''
+    Writes a copy of the example Schedule 70 price list whose products
+    sheet is filled with random data, so that the workbook is roughly
+    size_mb megabytes.
+    '''
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        products_filename = os.path.join(tempdir, 'products.xml')
+        with open(products_filename, 'w') as f:
+            # The sheet's XML compresses to about 30% of its size.
+            write_products_sheet(f, size_mb * 1024 * 1024 * 10 // 3)
+
+        with zipfile.ZipFile(S70_XLSX_PATH) as example, \
+                zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as book:
+            for info in example.infolist():
+                if info.filename == PRODUCTS_SHEET_PATH:
+                    book.write(products_filename, info.filename)
+                else:
+                    book.writestr(info, example.read(info.filename))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def time_glean(contents):
+    '''
+    Returns the number of labor categories gleaned from a workbook, how
+    long it took in seconds, and the peak memory allocated in bytes.
+    '''
+
+    f = SimpleUploadedFile('price_list.xlsx', contents)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        rows = s70.glean_labor_categories_from_file(f)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(rows), elapsed, peak
+
+
+@click.command()
+@click.option('--size-mb', default=50,
+              help='approximate size of the synthetic workbook')
+@click.option('--filename', default=None,
+              help='benchmark this workbook instead of a synthetic one')
+@click.option('--skip-legacy', is_flag=True,
+              help="don't benchmark parsing the whole workbook with xlrd")
+def command(size_mb, filename, skip_legacy):
+    '''
+    Benchmark how long it takes, and how much memory it takes, to read
+    the labor categories from a large Schedule 70 price list, with and
+    without streaming the workbook.
+    '''
+
+    if filename is None:
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as f:
+            click.echo('Generating a synthetic {}MB workbook...'.format(
+                size_mb))
+            make_synthetic_workbook(f.name, size_mb)
+            contents = f.read()
+    else:
+        with open(filename, 'rb') as f:
+            contents = f.read()
+
+    click.echo('Workbook is {:.1f}MB.'.format(len(contents) / 1024 / 1024))
+
+    cases = [('streaming', s70.open_labor_categories_sheet)]
+    if not skip_legacy:
+        cases.append(('xlrd', legacy_open_labor_categories_sheet))
+
+    for name, open_sheet in cases:
+        with mock.patch.object(s70, 'open_labor_categories_sheet',
+                               open_sheet):
+            num_rows, seconds, peak = time_glean(contents)
+        click.echo('{:<10} {} rows, {:.3f}s, {:.1f}MB peak memory'.format(
+            name, num_rows, seconds, peak / 1024 / 1024))
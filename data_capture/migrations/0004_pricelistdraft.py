@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('data_capture', '0003_auto_20160826_1930'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceListDraft',
+            fields=[
+                ('id', models.AutoField(serialize=False, verbose_name='ID', primary_key=True, auto_created=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('schedule', models.CharField(help_text='The class name of the schedule the data was gleaned as.', max_length=128)),
+                ('compressed_gleaned_data', models.BinaryField(help_text='The zlib-compressed, JSON-serialized gleaned data.')),
+                ('valid_row_count', models.PositiveIntegerField()),
+                ('invalid_row_count', models.PositiveIntegerField()),
+                ('table_html', models.TextField(blank=True)),
+                ('error_table_html', models.TextField(blank=True)),
+                ('submitter', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_capture', '0004_pricelistdraft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceListUpload',
+            fields=[
+                ('id', models.AutoField(serialize=False, verbose_name='ID', primary_key=True, auto_created=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('original_file', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -1,7 +1,15 @@
-from django.db import models
+import json
+import zlib
+from datetime import timedelta
+
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.utils import timezone
 
-from contracts.models import Contract, EDUCATION_CHOICES
+from contracts.loaders.ingest import reserve_ids
+from contracts.loaders.validation import BatchValidator
+from contracts.models import Contract, DataVersion, EDUCATION_CHOICES
 
 
 class SubmittedPriceList(models.Model):
@@ -68,47 +76,166 @@ class SubmittedPriceList(models.Model):
             return 'S'
         return 'O'
 
+    def make_contract(self, row, schedule_title=None):
+        return Contract(
+            idv_piid=self.contract_number,
+            contract_start=self.contract_start,
+            contract_end=self.contract_end,
+            contract_year=self.contract_year,
+            vendor_name=self.vendor_name,
+            labor_category=row.labor_category,
+            education_level=row.education_level,
+            education_rank=Contract.get_education_rank(
+                row.education_level),
+            min_years_experience=row.min_years_experience,
+            hourly_rate_year1=row.hourly_rate_year1,
+            hourly_rate_year2=None,
+            hourly_rate_year3=None,
+            hourly_rate_year4=None,
+            hourly_rate_year5=None,
+            current_price=row.hourly_rate_year1,
+            next_year_price=None,
+            second_year_price=None,
+            contractor_site=self.contractor_site,
+            schedule=schedule_title or self.get_schedule_title(),
+            business_size=self.get_business_size_string(),
+            sin=row.sin,
+        )
+
     def approve(self):
-        self.is_approved = True
-        for row in self.rows.filter(is_muted=False):
-            if row.contract_model is not None:
+        '''
+        Approves this price list with approve_all(), and then saves it,
+        so that any other unsaved changes to it are kept and post_save
+        is sent, as for any other save.
+        '''
+
+        with transaction.atomic():
+            self.approve_all([self])
+            self.save()
+
+    @classmethod
+    def approve_all(cls, price_lists):
+        '''
+        Approves the given price lists, adding a Contract for each of
+        their unmuted rows.
+
+        The price lists are marked approved with a single UPDATE rather
+        than being saved, so other unsaved changes to them aren't
+        written and post_save isn't sent; use approve() for that.
+
+        This takes a fixed number of queries however many price lists
+        and rows there are: contracts are validated together, given ids
+        from their sequence and bulk created, and then linked to their
+        rows with a single UPDATE. Their search vectors are filled in
+        by a database trigger as they're inserted.
+        '''
+
+        price_lists = list(price_lists)
+        by_id = dict((price_list.id, price_list) for price_list in price_lists)
+        schedule_titles = {}
+
+        rows = list(SubmittedPriceListRow.objects.filter(
+            price_list__in=price_lists,
+            is_muted=False
+        ).order_by('id'))
+
+        contracts = []
+        for row in rows:
+            if row.contract_model_id is not None:
                 raise AssertionError()
-            contract = Contract(
-                idv_piid=self.contract_number,
-                contract_start=self.contract_start,
-                contract_end=self.contract_end,
-                contract_year=self.contract_year,
-                vendor_name=self.vendor_name,
-                labor_category=row.labor_category,
-                education_level=row.education_level,
-                min_years_experience=row.min_years_experience,
-                hourly_rate_year1=row.hourly_rate_year1,
-                hourly_rate_year2=None,
-                hourly_rate_year3=None,
-                hourly_rate_year4=None,
-                hourly_rate_year5=None,
-                current_price=row.hourly_rate_year1,
-                next_year_price=None,
-                second_year_price=None,
-                contractor_site=self.contractor_site,
-                schedule=self.get_schedule_title(),
-                business_size=self.get_business_size_string(),
-                sin=row.sin,
-            )
-            contract.full_clean(exclude=['piid'])
-            contract.save()
-            row.contract_model = contract
-            row.save()
-
-        self.save()
+            price_list = by_id[row.price_list_id]
+            if price_list.schedule not in schedule_titles:
+                schedule_titles[price_list.schedule] = \
+                    price_list.get_schedule_title()
+            contracts.append(price_list.make_contract(
+                row, schedule_titles[price_list.schedule]))
+
+        errors = BatchValidator(Contract, exclude=['piid']).validate(
+            contracts)
+        if errors:
+            raise errors[min(errors)]
+
+        with transaction.atomic():
+            for contract, id in zip(contracts, reserve_ids(len(contracts))):
+                contract.id = id
+            Contract.objects.bulk_create(contracts)
+
+            if rows:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'UPDATE {table} SET contract_model_id = '
+                        'links.contract_id FROM (VALUES {values}) '
+                        'AS links (row_id, contract_id) '
+                        'WHERE {table}.id = links.row_id'.format(
+                            table=SubmittedPriceListRow._meta.db_table,
+                            values=', '.join(['(%s, %s)'] * len(rows)),
+                        ),
+                        [value for row, contract in zip(rows, contracts)
+                         for value in (row.id, contract.id)]
+                    )
+                for row, contract in zip(rows, contracts):
+                    row.contract_model = contract
+
+            now = timezone.now()
+            cls.objects.filter(id__in=by_id).update(
+                is_approved=True, updated_at=now)
+            for price_list in price_lists:
+                price_list.is_approved = True
+                price_list.updated_at = now
+
+            DataVersion.bump(labor_categories=set(
+                contract.labor_category for contract in contracts))
 
     def unapprove(self):
-        self.is_approved = False
+        '''
+        Unapproves this price list with unapprove_all(), and then saves
+        it, like approve().
+        '''
+
+        with transaction.atomic():
+            self.unapprove_all([self])
+            self.save()
 
-        for row in self.rows.filter(is_muted=False):
-            row.contract_model.delete()
+    @classmethod
+    def unapprove_all(cls, price_lists):
+        '''
+        Unapproves the given price lists, deleting the Contracts that
+        were added for their rows with a single DELETE and unlinking
+        the rows with a single UPDATE. Rows that have no Contract are
+        left alone.
+        '''
+
+        price_lists = list(price_lists)
+        linked_rows = SubmittedPriceListRow.objects.filter(
+            price_list__in=price_lists,
+            contract_model__isnull=False
+        )
 
-        self.save()
+        with transaction.atomic():
+            sql, params = linked_rows.values('contract_model_id').query\
+                .sql_with_params()
+            with connection.cursor() as cursor:
+                # The rows' foreign key constraint is deferred, so they
+                # can be unlinked after their contracts are gone.
+                cursor.execute(
+                    'DELETE FROM {} WHERE id IN ({}) '
+                    'RETURNING labor_category'.format(
+                        Contract._meta.db_table, sql),
+                    params
+                )
+                labor_categories = set(
+                    labor_category for (labor_category,) in cursor)
+            linked_rows.update(contract_model=None)
+
+            now = timezone.now()
+            cls.objects.filter(
+                id__in=[price_list.id for price_list in price_lists]
+            ).update(is_approved=False, updated_at=now)
+            for price_list in price_lists:
+                price_list.is_approved = False
+                price_list.updated_at = now
+
+            DataVersion.bump(labor_categories=labor_categories)
 
 
 class SubmittedPriceListRow(models.Model):
@@ -153,3 +280,121 @@ class SubmittedPriceListRow(models.Model):
         # 'SubmittedPriceListRow object' in Django admin.
 
         return 'Submitted price list row'
+
+
+class PriceListDraft(models.Model):
+    '''
+    The data gleaned from a price list during the price list upload
+    process, until it's submitted. Only the draft's id is kept in the
+    user's session.
+
+    The gleaned data is stored compressed, along with the results of
+    validating it (its row counts and rendered tables), so that it
+    doesn't need to be revalidated every time it's shown to the user.
+    '''
+
+    # Drafts that are older than this are deleted whenever a new draft
+    # is created, since their upload process has almost certainly been
+    # abandoned.
+    MAX_AGE = timedelta(days=2)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    submitter = models.ForeignKey(User)
+    schedule = models.CharField(
+        max_length=128,
+        help_text='The class name of the schedule the data was gleaned as.'
+    )
+    compressed_gleaned_data = models.BinaryField(
+        help_text='The zlib-compressed, JSON-serialized gleaned data.'
+    )
+    valid_row_count = models.PositiveIntegerField()
+    invalid_row_count = models.PositiveIntegerField()
+    table_html = models.TextField(blank=True)
+    error_table_html = models.TextField(blank=True)
+
+    @classmethod
+    def create(cls, gleaned_data, submitter):
+        '''
+        Saves a new draft of the given BasePriceList subclass instance,
+        deleting any old, abandoned drafts.
+        '''
+
+        # We're importing here to avoid a circular import.
+        from .schedules import registry
+
+        schedule, serialized = registry.serialize(gleaned_data)
+
+        cls.objects.filter(
+            created_at__lt=timezone.now() - cls.MAX_AGE).delete()
+
+        return cls.objects.create(
+            submitter=submitter,
+            schedule=schedule,
+            compressed_gleaned_data=zlib.compress(
+                json.dumps(serialized).encode('utf-8')),
+            valid_row_count=len(gleaned_data.valid_rows),
+            invalid_row_count=len(gleaned_data.invalid_rows),
+            table_html=(gleaned_data.to_table()
+                        if gleaned_data.valid_rows else ''),
+            error_table_html=(gleaned_data.to_error_table()
+                              if gleaned_data.invalid_rows else ''),
+        )
+
+    def get_serialized_gleaned_data(self):
+        '''
+        Returns the gleaned data as returned by registry.serialize().
+        '''
+
+        return [self.schedule, json.loads(zlib.decompress(
+            bytes(self.compressed_gleaned_data)).decode('utf-8'))]
+
+    def get_gleaned_data(self):
+        '''
+        Returns the gleaned data as a (revalidated) instance of its
+        BasePriceList subclass.
+        '''
+
+        from .schedules import registry
+
+        return registry.deserialize(self.get_serialized_gleaned_data())
+
+    def get_schedule_title(self):
+        from .schedules.registry import get_class
+
+        return get_class(self.schedule).title
+
+
+class PriceListUpload(models.Model):
+    '''
+    A price list file uploaded during the price list upload process,
+    kept until a background job has interpreted it. Like the original
+    file of a BulkUploadContractSource, it's stored in the database so
+    that the job can read it from whichever machine it runs on.
+    '''
+
+    # Uploads that are older than this are deleted whenever a new one is
+    # saved, since no job is going to interpret them.
+    MAX_AGE = timedelta(days=2)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    filename = models.CharField(max_length=255)
+    original_file = models.BinaryField()
+
+    @classmethod
+    def create(cls, f):
+        '''
+        Saves a new upload of the given Django UploadedFile, deleting
+        any old, abandoned uploads.
+        '''
+
+        cls.objects.filter(
+            created_at__lt=timezone.now() - cls.MAX_AGE).delete()
+
+        return cls.objects.create(filename=f.name, original_file=f.read())
+
+    def open(self):
+        '''
+        Returns the uploaded file as a Django File.
+        '''
+
+        return ContentFile(bytes(self.original_file), name=self.filename)
@@ -14,6 +14,7 @@ class Region10SpreadsheetConverter():
 
     def __init__(self, xls_file):
         self.xls_file = xls_file
+        self._book = None
 
     # Dict of R10 Excel sheet headings to the expected col index of CSV rows
     # loaded by the existing R10 data loader
@@ -51,13 +52,28 @@ class Region10SpreadsheetConverter():
 
         return True
 
+    def get_book(self):
+        '''
+        Returns the workbook for the related xls_file, parsing it the
+        first time it's needed
+        '''
+        if self._book is None:
+            contents = self.xls_file.read()
+            self.xls_file.seek(0)
+            # on_demand means only the sheets we ask for are loaded (this
+            # only applies to XLS files; XLSX files are always fully read)
+            self._book = xlrd.open_workbook(file_contents=contents,
+                                            on_demand=True)
+        return self._book
+
+    def get_sheet(self):
+        return self.get_book().sheet_by_index(self.sheet_index)
+
     def get_metadata(self):
         '''
         Returns a dict containing metadata about the related xls_file
         '''
-        book = xlrd.open_workbook(file_contents=self.xls_file.read())
-        sheet = book.sheet_by_index(self.sheet_index)
-        self.xls_file.seek(0)
+        sheet = self.get_sheet()
         return {
             'num_rows': sheet.nrows - 1  # subtract 1 for the header row
         }
@@ -70,7 +86,7 @@ class Region10SpreadsheetConverter():
         '''
         heading_indices = self.get_heading_indices_map()
 
-        book = xlrd.open_workbook(file_contents=self.xls_file.read())
+        book = self.get_book()
 
         datemode = book.datemode  # necessary for Excel date parsing
 
@@ -100,8 +116,6 @@ class Region10SpreadsheetConverter():
 
             yield row
 
-        self.xls_file.seek(0)
-
     def convert_file(self):
         '''
         Converts the input Region 10 XLS/X spreadsheet to a list
@@ -114,9 +128,7 @@ class Region10SpreadsheetConverter():
         Given a sheet, returns a mapping of R10 Excel sheet headings
         to the column indices associated with those fields in that sheet
         '''
-        book = xlrd.open_workbook(file_contents=self.xls_file.read())
-        sheet = book.sheet_by_index(self.sheet_index)
-        headings = sheet.row(0)
+        headings = self.get_sheet().row(0)
 
         idx_map = {}
         for i, cell in enumerate(headings):
@@ -133,5 +145,4 @@ class Region10SpreadsheetConverter():
                 raise ValueError(
                     'Missing columns: {}'.format(', '.join(missing_headers)))
 
-        self.xls_file.seek(0)
         return idx_map
@@ -1,3 +1,185 @@
+import csv
+import logging
+import xlrd
+from collections import namedtuple
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.forms.utils import ErrorList
+from django.utils.functional import cached_property
+
+from ..xlsx_reader import XlsxWorkbook, XLSX_SIGNATURE
+
+
+logger = logging.getLogger(__name__)
+
+# The first bytes of every .xls file, which is an OLE2 compound document.
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0'
+
+# The most bytes of an uploaded workbook that are read, so that a huge
+# (or malicious) workbook can't tie up the web request reading it. For
+# .xlsx files, this applies to the uncompressed data that's read.
+MAX_WORKBOOK_BYTES = 200 * 1024 * 1024
+
+
+def open_xls_workbook(f, max_bytes=MAX_WORKBOOK_BYTES):
+    '''
+    Opens an uploaded .xls file with xlrd, without parsing any of its
+    sheets until they're asked for. xlrd can't stream .xls files, so a
+    ValidationError is raised rather than read more than max_bytes.
+    '''
+
+    contents = f.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise ValidationError('The workbook is too large to read.')
+    return xlrd.open_workbook(file_contents=contents, on_demand=True)
+
+
+class SniffedUpload:
+    '''
+    Cheap-to-find facts about an uploaded file, for the sniff() methods
+    of price list classes to base their guesses on. Each fact is only
+    worked out once, no matter how many price list classes ask for it,
+    and the file is always left at its beginning.
+    '''
+
+    # The number of bytes at the start of the file that are inspected.
+    HEAD_SIZE = 4096
+
+    def __init__(self, f):
+        self.f = f
+
+    @cached_property
+    def head(self):
+        self.f.seek(0)
+        head = self.f.read(self.HEAD_SIZE)
+        self.f.seek(0)
+        return head
+
+    @cached_property
+    def xls_workbook(self):
+        '''
+        The file opened with open_xls_workbook(), if it's an .xls file
+        that can be read, or None otherwise. Price list classes can use
+        this rather than parsing the file all over again.
+        '''
+
+        if not self.head.startswith(XLS_SIGNATURE):
+            return None
+        try:
+            return open_xls_workbook(self.f, max_bytes=MAX_WORKBOOK_BYTES)
+        except Exception as e:
+            logger.info('Failed to open %s as an .xls file: %s' % (
+                self.f.name, e))
+        finally:
+            self.f.seek(0)
+        return None
+
+    @cached_property
+    def sheet_names(self):
+        '''
+        The names of the sheets in the file, if it's an Excel workbook,
+        or an empty list otherwise.
+        '''
+
+        if self.xls_workbook is not None:
+            return self.xls_workbook.sheet_names()
+        if not self.head.startswith(XLSX_SIGNATURE):
+            return []
+        try:
+            # Listing the sheets doesn't count against the byte budget.
+            return XlsxWorkbook(self.f, max_bytes=0).sheet_names()
+        except Exception as e:
+            logger.info('Failed to read sheet names from %s: %s' % (
+                self.f.name, e))
+        finally:
+            self.f.seek(0)
+        return []
+
+    @cached_property
+    def csv_header(self):
+        '''
+        The column names in the first line of the file, if it looks like
+        a CSV file, or an empty list otherwise.
+        '''
+
+        if self.sheet_names or b'\0' in self.head:
+            return []
+        text = self.head.decode('utf-8', errors='ignore')
+        first_line = text.splitlines()[0] if text else ''
+        return [name.strip() for name in next(csv.reader(
+            StringIO(first_line)), [])]
+
+
+# The raw value and errors of one field of a ValidatedRow, which is all
+# our price list table templates need from a Form's BoundField.
+RowField = namedtuple('RowField', ['value', 'errors'])
+
+
+class ValidatedRow:
+    '''
+    A row of a price list that has been checked by a RowValidator.
+
+    Like a bound Form, it has a dict of cleaned_data and a dict mapping
+    field names to lists of errors, and row[name] gives the field's raw
+    value and its errors, so templates can render it like a Form.
+    '''
+
+    def __init__(self, data, cleaned_data, errors):
+        self.data = data
+        self.cleaned_data = cleaned_data
+        self.errors = errors
+
+    def __getitem__(self, name):
+        return RowField(self.data.get(name),
+                        ErrorList(self.errors.get(name, [])))
+
+    def is_valid(self):
+        return not self.errors
+
+
+class RowValidator:
+    '''
+    Validates all the rows of a price list against the fields of a row
+    Form class, a column at a time.
+
+    This is equivalent to, but much faster than, instantiating the Form
+    for each row and calling is_valid(), since each field is only set up
+    once rather than once per row.
+
+    Like Forms, subclasses can define clean_<fieldname>() methods to
+    further check a field's value; they're given the cleaned value and
+    should return it or raise a ValidationError.
+    '''
+
+    # The Form class whose fields each row is validated against.
+    form_class = None
+
+    def validate(self, rows):
+        '''
+        Given a list of dicts mapping field names to raw values, returns
+        a list of corresponding ValidatedRow objects.
+        '''
+
+        cleaned_data = [{} for row in rows]
+        errors = [{} for row in rows]
+
+        for name, field in self.form_class.base_fields.items():
+            clean_value = getattr(self, 'clean_%s' % name, None)
+            for i, row in enumerate(rows):
+                try:
+                    value = field.clean(row.get(name))
+                    if clean_value is not None:
+                        value = clean_value(value)
+                except ValidationError as e:
+                    errors[i][name] = e.messages
+                else:
+                    cleaned_data[i][name] = value
+
+        return [ValidatedRow(row, row_cleaned_data, row_errors)
+                for row, row_cleaned_data, row_errors
+                in zip(rows, cleaned_data, errors)]
+
+
 class BasePriceList:
     '''
     Abstract base class for price lists being imported into CALC.
@@ -8,12 +190,12 @@ class BasePriceList:
     title = 'Unknown Schedule'
 
     def __init__(self):
-        # This is a list of Django Form objects representing
-        # valid rows in the price list.
+        # This is a list of Django Form objects (or ValidatedRow
+        # objects) representing valid rows in the price list.
         self.valid_rows = []
 
-        # This is a list of Django Form objects representing
-        # invalid rows in the price list.
+        # This is a list of Django Form objects (or ValidatedRow
+        # objects) representing invalid rows in the price list.
         self.invalid_rows = []
 
     def is_empty(self):
@@ -64,6 +246,21 @@ class BasePriceList:
 
         raise NotImplementedError()
 
+    @classmethod
+    def sniff(cls, sniffed_upload):
+        '''
+        Given a SniffedUpload, quickly guess how likely it is to be a
+        price list of this class, without reading all of it. Returns a
+        number between 0 (definitely not) and 1 (almost certainly).
+
+        By default, this returns a small score, so that a class which
+        doesn't override it is still tried as a last resort when no other
+        class recognizes the file. Subclasses that can tell should return
+        0 for files they can't interpret.
+        '''
+
+        return 0.01
+
     @classmethod
     def load_from_upload(cls, f):
         '''
@@ -77,3 +274,14 @@ class BasePriceList:
         '''
 
         raise NotImplementedError()
+
+    @classmethod
+    def load_from_sniffed_upload(cls, sniffed_upload):
+        '''
+        Like load_from_upload(), but given a SniffedUpload, so that
+        subclasses can reuse anything it has already worked out about the
+        file instead of reading the file again.
+        '''
+
+        sniffed_upload.f.seek(0)
+        return cls.load_from_upload(sniffed_upload.f)
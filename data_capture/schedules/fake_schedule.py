@@ -82,6 +82,13 @@ class FakeSchedulePriceList(BasePriceList):
     def deserialize(cls, rows):
         return cls(rows)
 
+    @classmethod
+    def sniff(cls, sniffed_upload):
+        # Guess based on how many of our columns are in the CSV header.
+        columns = FakeScheduleRow.base_fields
+        found = columns.keys() & set(sniffed_upload.csv_header)
+        return len(found) / len(columns)
+
     @classmethod
     def load_from_upload(cls, f):
         try:
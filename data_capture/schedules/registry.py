@@ -2,6 +2,8 @@ from django.conf import settings
 from django.forms import ValidationError
 from django.utils.module_loading import import_string
 
+from .base import SniffedUpload
+
 
 def _classname(cls):
     return '%s.%s' % (cls.__module__, cls.__name__)
@@ -45,36 +47,38 @@ def smart_load_from_upload(classname, f):
     interpreting it as a price list for the given schedule class name.
 
     If interpreting it under the preferred schedule results in either
-    a ValidationError or no valid rows, attempts will be made to
-    re-interpret the file under different schedules. The first found
-    that yields better interpretations of the data will be returned.
+    a ValidationError or no valid rows, the other schedules are asked
+    to sniff() the file, and the one most confident that it can make
+    sense of the file is used to re-interpret it. If that yields valid
+    rows, its interpretation is returned.
 
-    If no better matches are found, the original result or exception
+    If no better match is found, the original result or exception
     (from interpreting the data under the preferred price list) will
     be returned.
     '''
 
+    # Whatever's worked out about the file is shared by all the schedules
+    # that look at it, so e.g. an .xls file is only parsed once.
+    sniffed_upload = SniffedUpload(f)
     original_error = None
     pricelist = None
 
     try:
-        pricelist = load_from_upload(classname, f)
+        pricelist = CLASSES[classname].load_from_sniffed_upload(
+            sniffed_upload)
     except ValidationError as e:
         original_error = e
 
     if original_error or not pricelist.valid_rows:
-        # See if any of our other registered schedules can make better sense
-        # of it.
-        next_best_pricelist = None
-        for fallback, _ in CHOICES:
-            if fallback == classname:
-                continue
+        # See if any of our other registered schedules can make better
+        # sense of it, without fully re-interpreting it under each one.
+        fallback = _sniff(sniffed_upload, exclude=[classname])
+        if fallback is not None:
             try:
-                f.seek(0)
-                next_best_pricelist = load_from_upload(fallback, f)
+                next_best_pricelist = CLASSES[
+                    fallback].load_from_sniffed_upload(sniffed_upload)
                 if next_best_pricelist.valid_rows:
                     pricelist = next_best_pricelist
-                    break
             except ValidationError as e:
                 pass
 
@@ -84,6 +88,31 @@ def smart_load_from_upload(classname, f):
     return pricelist
 
 
+def sniff(f, exclude=()):
+    '''
+    Returns the class name of the schedule that's most confident it can
+    interpret the given Django UploadedFile, based on a quick look at
+    it, or None if none of them think they can.
+    '''
+
+    return _sniff(SniffedUpload(f), exclude)
+
+
+def _sniff(sniffed_upload, exclude=()):
+    best_classname = None
+    best_score = 0
+
+    for classname, _ in CHOICES:
+        if classname in exclude:
+            continue
+        score = CLASSES[classname].sniff(sniffed_upload)
+        if score > best_score:
+            best_classname = classname
+            best_score = score
+
+    return best_classname
+
+
 def serialize(pricelist):
     classname = _classname(pricelist.__class__)
 
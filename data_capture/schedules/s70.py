@@ -1,17 +1,32 @@
 import functools
 import logging
-import xlrd
 from django import forms
 from django.core.exceptions import ValidationError
 from django.template.loader import render_to_string
 
-from .base import BasePriceList
+from .base import (BasePriceList, RowValidator, open_xls_workbook,
+                   MAX_WORKBOOK_BYTES)
+from ..xlsx_reader import is_xlsx, XlsxWorkbook
 from contracts.models import EDUCATION_CHOICES
 from contracts.loaders.region_10 import FEDERAL_MIN_CONTRACT_RATE
 
 
 logger = logging.getLogger(__name__)
 
+# The most labor categories that are read from an uploaded price list,
+# so that a huge workbook can't tie up the web request reading it.
+MAX_LABOR_CATEGORY_ROWS = 5000
+
+LABOR_CATEGORIES_SHEET_NAME = '(3)Labor Categories'
+
+# The (zero-based) row and columns of the labor categories sheet that
+# glean_labor_categories_from_file() reads until it runs out of data.
+FIRST_LABOR_CATEGORY_ROW = 3
+
+SIN_COL = 0
+
+PRICE_INCLUDING_IFF_COL = 11
+
 
 def safe_cell_str_value(sheet, rownum, colnum, coercer=None):
     val = ''
@@ -30,40 +45,72 @@ def safe_cell_str_value(sheet, rownum, colnum, coercer=None):
     return str(val)
 
 
-def glean_labor_categories_from_file(f, sheet_name='(3)Labor Categories'):
-    # TODO: I'm not sure how big these uploaded files can get. While
-    # the labor categories price lists don't get that long, according to
-    # user research interviews, *product* price lists can get really long;
-    # and even though we're not interested in them, information about them
-    # is embedded in the workbook, so the file could potentially get large.
-    #
-    # Unfortunately, it doesn't *seem* like xlrd supports file streaming.
-    # Although it does support using memory-mapped files, so perhaps that's a
-    # possibility.
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def open_labor_categories_sheet(f, sheet_name, xls_workbook=None):
+    '''
+    Returns the sheet with the given name from an uploaded workbook,
+    reading as little of the workbook as possible: .xlsx files are read
+    a row at a time, stopping after the last labor category, and only
+    the requested sheet of .xls files is parsed.
+
+    If the file is an .xls file that has already been opened with
+    open_xls_workbook(), the opened book can be passed as xls_workbook.
+    '''
 
-    book = xlrd.open_workbook(file_contents=f.read())
+    if xls_workbook is None and is_xlsx(f):
+        book = XlsxWorkbook(f, max_bytes=MAX_WORKBOOK_BYTES)
+        if sheet_name not in book.sheet_names():
+            raise ValidationError(
+                'There is no sheet in the workbook called "%s".' % sheet_name
+            )
+        return book.read_rows(
+            sheet_name,
+            first_row=FIRST_LABOR_CATEGORY_ROW,
+            max_rows=MAX_LABOR_CATEGORY_ROWS,
+            until=lambda cells: (is_blank(cells.get(SIN_COL)) and
+                                 is_blank(cells.get(PRICE_INCLUDING_IFF_COL)))
+        )
+
+    book = xls_workbook
+    if book is None:
+        book = open_xls_workbook(f, max_bytes=MAX_WORKBOOK_BYTES)
 
     if sheet_name not in book.sheet_names():
         raise ValidationError(
             'There is no sheet in the workbook called "%s".' % sheet_name
         )
 
-    sheet = book.sheet_by_name(sheet_name)
+    return book.sheet_by_name(sheet_name)
 
-    rownum = 3
+
+def glean_labor_categories_from_file(f,
+                                     sheet_name=LABOR_CATEGORIES_SHEET_NAME,
+                                     xls_workbook=None):
+    sheet = open_labor_categories_sheet(f, sheet_name, xls_workbook)
+
+    rownum = FIRST_LABOR_CATEGORY_ROW
     cats = []
 
     while True:
         cval = functools.partial(safe_cell_str_value, sheet, rownum)
 
-        sin = cval(0)
-        price_including_iff = cval(11)
+        sin = cval(SIN_COL)
+        price_including_iff = cval(PRICE_INCLUDING_IFF_COL)
 
         # We basically just keep going until we run into a row that
         # doesn't have a SIN or price including IFF.
         if not sin.strip() and not price_including_iff.strip():
             break
 
+        if len(cats) == MAX_LABOR_CATEGORY_ROWS:
+            raise ValidationError(
+                'The "%s" sheet has more than %d rows.' % (
+                    sheet_name, MAX_LABOR_CATEGORY_ROWS)
+            )
+
         cat = {}
         cat['sin'] = sin
         cat['labor_category'] = cval(1)
@@ -85,6 +132,19 @@ def glean_labor_categories_from_file(f, sheet_name='(3)Labor Categories'):
     return cats
 
 
+EDUCATION_LEVELS = [name for code, name in EDUCATION_CHOICES]
+
+# Maps the name of each education level to its code.
+EDUCATION_CODES = dict((name, code) for code, name in EDUCATION_CHOICES)
+
+
+def validate_education_level(value):
+    if value not in EDUCATION_CODES:
+        raise ValidationError('This field must contain one of the '
+                              'following values: %s' % (
+                                  ', '.join(EDUCATION_LEVELS)))
+
+
 class Schedule70Row(forms.Form):
     sin = forms.CharField(label="SIN(s) proposed")
     labor_category = forms.CharField(
@@ -102,30 +162,16 @@ class Schedule70Row(forms.Form):
 
     def clean_education_level(self):
         value = self.cleaned_data['education_level']
-
-        values = [choice[1] for choice in EDUCATION_CHOICES]
-
-        if value not in values:
-            raise ValidationError('This field must contain one of the '
-                                  'following values: %s' % (', '.join(values)))
-
+        validate_education_level(value)
         return value
 
-    def contract_model_education_level(self):
-        # Note that due to the way we've cleaned education_level, this
-        # code is guaranteed to work.
-
-        return [
-            code for code, name in EDUCATION_CHOICES
-            if name == self.cleaned_data['education_level']
-        ][0]
 
-    def contract_model_hourly_rate_year1(self):
-        return self.cleaned_data['price_including_iff']
+class Schedule70RowValidator(RowValidator):
+    form_class = Schedule70Row
 
-    def contract_model_current_price(self):
-        price = self.contract_model_hourly_rate_year1()
-        return price if price >= FEDERAL_MIN_CONTRACT_RATE else None
+    def clean_education_level(self, value):
+        validate_education_level(value)
+        return value
 
 
 class Schedule70PriceList(BasePriceList):
@@ -137,21 +183,23 @@ class Schedule70PriceList(BasePriceList):
 
         self.rows = rows
 
-        for row in self.rows:
-            form = Schedule70Row(row)
-            if form.is_valid():
-                self.valid_rows.append(form)
+        for row in Schedule70RowValidator().validate(self.rows):
+            if row.is_valid():
+                self.valid_rows.append(row)
             else:
-                self.invalid_rows.append(form)
+                self.invalid_rows.append(row)
 
     def add_to_price_list(self, price_list):
         for row in self.valid_rows:
+            price = row.cleaned_data['price_including_iff']
             price_list.add_row(
                 labor_category=row.cleaned_data['labor_category'],
-                education_level=row.contract_model_education_level(),
+                education_level=EDUCATION_CODES[
+                    row.cleaned_data['education_level']],
                 min_years_experience=row.cleaned_data['min_years_experience'],
-                hourly_rate_year1=row.contract_model_hourly_rate_year1(),
-                current_price=row.contract_model_current_price(),
+                hourly_rate_year1=price,
+                current_price=(price if price >= FEDERAL_MIN_CONTRACT_RATE
+                               else None),
                 sin=row.cleaned_data['sin']
             )
 
@@ -171,9 +219,16 @@ class Schedule70PriceList(BasePriceList):
         return cls(rows)
 
     @classmethod
-    def load_from_upload(cls, f):
+    def sniff(cls, sniffed_upload):
+        if LABOR_CATEGORIES_SHEET_NAME in sniffed_upload.sheet_names:
+            return 1
+        return 0
+
+    @classmethod
+    def load_from_upload(cls, f, xls_workbook=None):
         try:
-            rows = glean_labor_categories_from_file(f)
+            rows = glean_labor_categories_from_file(
+                f, xls_workbook=xls_workbook)
             return Schedule70PriceList(rows)
         except ValidationError:
             raise
@@ -183,3 +238,10 @@ class Schedule70PriceList(BasePriceList):
             raise ValidationError(
                 "An error occurred when reading your Excel data."
             )
+
+    @classmethod
+    def load_from_sniffed_upload(cls, sniffed_upload):
+        # Don't parse an .xls file again if sniffing already opened it.
+        sniffed_upload.f.seek(0)
+        return cls.load_from_upload(sniffed_upload.f,
+                                    sniffed_upload.xls_workbook)
@@ -1,12 +1,14 @@
 import io
 import unittest.mock as mock
 from django.conf import settings
+from django.core import mail
 from django.core.management import call_command
 from django.contrib import messages
 from django.test import override_settings
 
-from .. import admin, models, email
+from .. import admin, jobs, models
 from .common import FAKE_SCHEDULE
+from .test_jobs import process_worker_jobs
 from .test_models import ModelTestCase
 
 
@@ -111,7 +113,7 @@ class ActionTests(AdminTestCase):
         mock.assert_called_once_with(
             "fake request",
             messages.INFO,
-            '0 price list(s) have been approved and added to CALC.'
+            '0 price list(s) will be approved and added to CALC.'
         )
 
     def test_unapprove_ignores_unapproved_price_lists(self, mock):
@@ -120,36 +122,54 @@ class ActionTests(AdminTestCase):
         mock.assert_called_once_with(
             "fake request",
             messages.INFO,
-            '0 price list(s) have been unapproved and removed from CALC.'
+            '0 price list(s) will be unapproved and removed from CALC.'
         )
 
     def test_approve_works(self, msg_mock):
-        with mock.patch.object(email, 'price_list_approved',
-                               wraps=email.price_list_approved) as em_monkey:
-            admin.approve(None, "fake request",
-                          models.SubmittedPriceList.objects.all())
-            msg_mock.assert_called_once_with(
-                "fake request",
-                messages.INFO,
-                '1 price list(s) have been approved and added to CALC.'
-            )
-            em_monkey.assert_called_once_with(self.price_list)
+        admin.approve(None, "fake request",
+                      models.SubmittedPriceList.objects.all())
+        self.assertEqual(msg_mock.call_count, 1)
+        self.assertIn(
+            '1 price list(s) will be approved and added to CALC.',
+            msg_mock.call_args[0][2]
+        )
+
+        process_worker_jobs()
 
         self.price_list.refresh_from_db()
         self.assertTrue(self.price_list.is_approved)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'CALC Price List Approved')
 
     def test_unapprove_works(self, msg_mock):
-        with mock.patch.object(email, 'price_list_unapproved',
-                               wraps=email.price_list_unapproved) as em_monkey:
-            self.price_list.approve()
-            admin.unapprove(None, "fake request",
-                            models.SubmittedPriceList.objects.all())
-            msg_mock.assert_called_once_with(
-                "fake request",
-                messages.INFO,
-                '1 price list(s) have been unapproved and removed from CALC.'
-            )
-            em_monkey.assert_called_once_with(self.price_list)
+        self.price_list.approve()
+        admin.unapprove(None, "fake request",
+                        models.SubmittedPriceList.objects.all())
+        self.assertEqual(msg_mock.call_count, 1)
+        self.assertIn(
+            '1 price list(s) will be unapproved and removed from CALC.',
+            msg_mock.call_args[0][2]
+        )
+
+        process_worker_jobs()
 
         self.price_list.refresh_from_db()
         self.assertFalse(self.price_list.is_approved)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject,
+                         'CALC Price List Unapproved')
+
+
+class JobStatusViewTests(DebugAdminTestCase):
+    def test_shows_job_progress(self):
+        job = jobs.approve_price_lists.delay([self.price_list.id])
+        process_worker_jobs()
+        res = self.client.get(
+            '/admin/data_capture/submittedpricelist/jobs/{}/'.format(job.id))
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, '1 of 1 price list(s) processed.')
+
+    def test_returns_404_for_unknown_jobs(self):
+        res = self.client.get(
+            '/admin/data_capture/submittedpricelist/jobs/nonexistent/')
+        self.assertEqual(res.status_code, 404)
@@ -40,6 +40,15 @@ class Step3FormTests(TestCase):
         self.assertEqual(form.cleaned_data['gleaned_data'].title,
                          FakeSchedulePriceList.title)
 
+    def test_clean_does_not_glean_when_told_not_to(self):
+        form = Step3Form({
+            'schedule': FAKE_SCHEDULE,
+        }, {
+            'file': uploaded_csv_file(b'i cannot be gleaned')
+        }, glean=False)
+        self.assertTrue(form.is_valid())
+        self.assertNotIn('gleaned_data', form.cleaned_data)
+
 
 class Region10BulkUploadFormTests(TestCase):
     def test_invalid_when_file_is_missing(self):
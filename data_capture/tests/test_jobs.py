@@ -1,11 +1,15 @@
-from unittest.mock import patch
+from unittest.mock import patch, Mock
 from django.core import mail
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rq import SimpleWorker
 import django_rq
 
-from .common import create_bulk_upload_contract_source
+from contracts.models import Contract
+from .common import (create_bulk_upload_contract_source, FAKE_SCHEDULE,
+                     uploaded_csv_file)
+from .test_models import ModelTestCase
 from .. import jobs
+from ..models import PriceListDraft, PriceListUpload, SubmittedPriceList
 
 
 def process_worker_jobs():
@@ -38,3 +42,88 @@ class ProcessBulkUploadTests(TestCase):
         jobs.process_bulk_upload_and_send_email(src.id)
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].recipients(), ['foo@example.org'])
+
+    def test_saves_contracts_in_batches(self):
+        src = create_bulk_upload_contract_source(user='foo@example.org')
+        bulk_create = Contract.objects.bulk_create
+        with patch.object(Contract.objects, 'bulk_create',
+                          wraps=bulk_create) as mock:
+            num_contracts, num_bad_rows = jobs._process_bulk_upload(
+                src, batch_size=2)
+        self.assertEqual(mock.call_count, 2)
+        self.assertEqual(num_contracts, 3)
+        self.assertEqual(num_bad_rows, 1)
+        self.assertEqual(Contract.objects.count(), 3)
+
+
+@override_settings(DATA_CAPTURE_SCHEDULES=[FAKE_SCHEDULE])
+class PriceListJobTests(ModelTestCase):
+    def create_price_lists(self, count, **kwargs):
+        price_lists = []
+        for i in range(count):
+            price_list = self.create_price_list(**kwargs)
+            price_list.save()
+            self.create_row(price_list=price_list).save()
+            price_lists.append(price_list)
+        return price_lists
+
+    def test_approve_price_lists_works(self):
+        price_lists = self.create_price_lists(3)
+        with patch.object(jobs, 'get_connection',
+                          wraps=jobs.get_connection) as get_connection:
+            self.assertEqual(jobs.approve_price_lists(
+                [p.id for p in price_lists]), 3)
+        get_connection.assert_called_once_with()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Contract.objects.count(), 3)
+        for price_list in price_lists:
+            price_list.refresh_from_db()
+            self.assertTrue(price_list.is_approved)
+
+    def test_unapprove_price_lists_works(self):
+        price_lists = self.create_price_lists(2)
+        SubmittedPriceList.approve_all(price_lists)
+        self.assertEqual(jobs.unapprove_price_lists(
+            [p.id for p in price_lists]), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(Contract.objects.count(), 0)
+
+    def test_skips_price_lists_already_processed(self):
+        price_list = self.create_price_lists(1, is_approved=True)[0]
+        self.assertEqual(jobs.approve_price_lists([price_list.id]), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_records_progress(self):
+        price_lists = self.create_price_lists(3)
+        fake_job = Mock(id='fake-job', connection=django_rq.get_connection())
+        with patch.object(jobs, 'get_current_job', return_value=fake_job):
+            jobs._process_price_lists([p.id for p in price_lists],
+                                      approve=True, batch_size=2)
+        self.assertEqual(jobs.get_progress('fake-job'),
+                         {'done': 3, 'total': 3})
+
+
+@override_settings(DATA_CAPTURE_SCHEDULES=[FAKE_SCHEDULE])
+class GleanPriceListTests(ModelTestCase):
+    def test_saves_draft(self):
+        upload_id = jobs.save_price_list_upload(uploaded_csv_file())
+        result = jobs.glean_price_list(FAKE_SCHEDULE, upload_id,
+                                       self.user.id)
+        draft = PriceListDraft.objects.get(id=result['draft_id'])
+        self.assertEqual(draft.submitter, self.user)
+        self.assertEqual(draft.valid_row_count, 1)
+        self.assertFalse(PriceListUpload.objects.exists())
+
+    def test_returns_errors(self):
+        upload_id = jobs.save_price_list_upload(
+            uploaded_csv_file(b'i cannot be gleaned'))
+        result = jobs.glean_price_list(FAKE_SCHEDULE, upload_id,
+                                       self.user.id)
+        self.assertFalse(PriceListUpload.objects.exists())
+        self.assertEqual(result, {
+            'errors': [
+                "The file you uploaded doesn't have any data we can "
+                "glean from it."
+            ]
+        })
+        self.assertFalse(PriceListDraft.objects.exists())
@@ -1,10 +1,17 @@
+import json
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models.signals import post_save
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from contracts.models import Contract
+from contracts.models import Contract, DataVersion, LaborCategoryCount
 from ..schedules import registry
 from ..schedules.fake_schedule import FakeSchedulePriceList
-from ..models import SubmittedPriceList, SubmittedPriceListRow
-from .common import BaseTestCase, FAKE_SCHEDULE
+from ..models import (PriceListDraft, PriceListUpload, SubmittedPriceList,
+                      SubmittedPriceListRow)
+from .common import BaseTestCase, FAKE_SCHEDULE, uploaded_csv_file
 
 
 class ModelTestCase(BaseTestCase):
@@ -87,6 +94,77 @@ class ModelsTests(ModelTestCase):
         self.assertEqual(contract.schedule, FakeSchedulePriceList.title)
         self.assertEqual(contract.labor_category, 'Software Engineer')
 
+    def test_approve_saves_the_price_list(self):
+        p = self.create_price_list()
+        p.save()
+        self.create_row(price_list=p).save()
+        p.vendor_name = 'MegaCorp'
+        saved = []
+        post_save.connect(lambda instance, **kwargs: saved.append(instance),
+                          sender=SubmittedPriceList, weak=False,
+                          dispatch_uid='test_approve_saves_the_price_list')
+        try:
+            p.approve()
+        finally:
+            post_save.disconnect(
+                sender=SubmittedPriceList,
+                dispatch_uid='test_approve_saves_the_price_list')
+
+        self.assertEqual(saved, [p])
+        p.refresh_from_db()
+        self.assertTrue(p.is_approved)
+        self.assertEqual(p.vendor_name, 'MegaCorp')
+        self.assertEqual(Contract.objects.get().vendor_name, 'MegaCorp')
+
+    def create_price_lists(self, count, rows_per_list=2):
+        price_lists = []
+        for i in range(count):
+            p = self.create_price_list(contract_number='GS-123-{}'.format(i))
+            p.save()
+            for j in range(rows_per_list):
+                self.create_row(labor_category='Engineer {}'.format(j),
+                                price_list=p).save()
+            self.create_row(price_list=p, is_muted=True).save()
+            price_lists.append(p)
+        return price_lists
+
+    def test_approve_all_works(self):
+        price_lists = self.create_price_lists(3)
+        SubmittedPriceList.approve_all(price_lists)
+
+        self.assertEqual(Contract.objects.all().count(), 6)
+        for p in price_lists:
+            self.assertTrue(p.is_approved)
+            p.refresh_from_db()
+            self.assertTrue(p.is_approved)
+            for row in p.rows.all():
+                if row.is_muted:
+                    self.assertIsNone(row.contract_model)
+                else:
+                    self.assertEqual(row.contract_model.idv_piid,
+                                     p.contract_number)
+                    self.assertEqual(row.contract_model.labor_category,
+                                     row.labor_category)
+
+    def test_approve_all_takes_constant_queries(self):
+        DataVersion.bump()
+        one_price_list = self.create_price_lists(1)
+        with CaptureQueriesContext(connection) as one:
+            SubmittedPriceList.approve_all(one_price_list)
+        many_price_lists = self.create_price_lists(5, rows_per_list=4)
+        with CaptureQueriesContext(connection) as many:
+            SubmittedPriceList.approve_all(many_price_lists)
+        self.assertEqual(len(one), len(many))
+
+    def test_approve_all_validates_contracts(self):
+        p = self.create_price_lists(1)[0]
+        self.create_row(price_list=p, education_level='XYZ').save()
+        with self.assertRaises(ValidationError):
+            SubmittedPriceList.approve_all([p])
+        self.assertEqual(Contract.objects.all().count(), 0)
+        p.refresh_from_db()
+        self.assertFalse(p.is_approved)
+
     def test_unapprove_works(self):
         p = self.create_price_list()
         p.save()
@@ -99,5 +177,138 @@ class ModelsTests(ModelTestCase):
         self.assertEqual(p.rows.all()[0].contract_model, None)
         self.assertEqual(Contract.objects.all().count(), 0)
 
+    def test_unapprove_all_works(self):
+        price_lists = self.create_price_lists(3)
+        other = self.create_price_lists(1)[0]
+        SubmittedPriceList.approve_all(price_lists + [other])
+        SubmittedPriceList.unapprove_all(price_lists)
+
+        self.assertEqual(Contract.objects.all().count(), 2)
+        for p in price_lists:
+            self.assertFalse(p.is_approved)
+            p.refresh_from_db()
+            self.assertFalse(p.is_approved)
+            self.assertFalse(p.rows.filter(contract_model__isnull=False)
+                             .exists())
+        other.refresh_from_db()
+        self.assertTrue(other.is_approved)
+
+    def test_approval_updates_labor_category_counts(self):
+        def get_counts():
+            return dict(LaborCategoryCount.objects.values_list(
+                'labor_category', 'count'))
+
+        p = self.create_price_list()
+        p.save()
+        self.create_row(price_list=p, labor_category='Tester').save()
+        p.approve()
+        self.assertEqual(get_counts(), {'Tester': 1})
+
+        p.unapprove()
+        self.assertEqual(get_counts(), {})
+
+    def test_unapprove_handles_rows_without_contracts(self):
+        p = self.create_price_lists(1)[0]
+        p.approve()
+        row = p.rows.filter(is_muted=False)[0]
+        row.contract_model.delete()
+        p.unapprove()
+
+        self.assertFalse(p.is_approved)
+        self.assertEqual(Contract.objects.all().count(), 0)
+
+    def test_unapprove_all_takes_constant_queries(self):
+        DataVersion.bump()
+        one_price_list = self.create_price_lists(1)
+        many_price_lists = self.create_price_lists(5, rows_per_list=4)
+        SubmittedPriceList.approve_all(one_price_list + many_price_lists)
+        with CaptureQueriesContext(connection) as one:
+            SubmittedPriceList.unapprove_all(one_price_list)
+        with CaptureQueriesContext(connection) as many:
+            SubmittedPriceList.unapprove_all(many_price_lists)
+        self.assertEqual(len(one), len(many))
+
     def test_row_stringify_works(self):
         self.assertEqual(str(self.create_row()), 'Submitted price list row')
+
+
+@override_settings(DATA_CAPTURE_SCHEDULES=[FAKE_SCHEDULE])
+class PriceListDraftTests(ModelTestCase):
+    rows = [{
+        'education': 'Bachelors',
+        'price': '15.00',
+        'service': 'Project Manager',
+        'sin': '132-40',
+        'years_experience': '7'
+    }, {
+        'education': 'Bachelors',
+        'price': 'lots',
+        'service': 'Project Manager',
+        'sin': '132-40',
+        'years_experience': '7'
+    }]
+
+    def create_draft(self):
+        return PriceListDraft.create(FakeSchedulePriceList(self.rows),
+                                     submitter=self.user)
+
+    def test_create_works(self):
+        draft = PriceListDraft.objects.get(id=self.create_draft().id)
+
+        self.assertEqual(draft.schedule, FAKE_SCHEDULE)
+        self.assertEqual(draft.get_schedule_title(),
+                         FakeSchedulePriceList.title)
+        self.assertEqual(draft.valid_row_count, 1)
+        self.assertEqual(draft.invalid_row_count, 1)
+        self.assertIn('15.00', draft.table_html)
+        self.assertIn('lots', draft.error_table_html)
+
+    def test_gleaned_data_round_trips(self):
+        draft = PriceListDraft.objects.get(id=self.create_draft().id)
+
+        self.assertEqual(draft.get_serialized_gleaned_data(),
+                         [FAKE_SCHEDULE, self.rows])
+        self.assertEqual(draft.get_gleaned_data().rows, self.rows)
+
+    def test_gleaned_data_is_compressed(self):
+        self.rows = self.rows * 100
+        draft = self.create_draft()
+
+        self.assertLess(len(draft.compressed_gleaned_data),
+                        len(json.dumps(self.rows)) / 10)
+
+    def test_create_deletes_abandoned_drafts(self):
+        old_draft = self.create_draft()
+        PriceListDraft.objects.filter(id=old_draft.id).update(
+            created_at=timezone.now() - PriceListDraft.MAX_AGE * 2)
+        recent_draft = self.create_draft()
+
+        self.create_draft()
+
+        self.assertFalse(
+            PriceListDraft.objects.filter(id=old_draft.id).exists())
+        self.assertTrue(
+            PriceListDraft.objects.filter(id=recent_draft.id).exists())
+
+
+class PriceListUploadTests(ModelTestCase):
+    def test_upload_round_trips(self):
+        upload = PriceListUpload.objects.get(
+            id=PriceListUpload.create(uploaded_csv_file(b'foo,bar')).id)
+
+        f = upload.open()
+        self.assertEqual(f.name, 'foo.csv')
+        self.assertEqual(f.read(), b'foo,bar')
+
+    def test_create_deletes_abandoned_uploads(self):
+        old_upload = PriceListUpload.create(uploaded_csv_file())
+        PriceListUpload.objects.filter(id=old_upload.id).update(
+            created_at=timezone.now() - PriceListUpload.MAX_AGE * 2)
+        recent_upload = PriceListUpload.create(uploaded_csv_file())
+
+        PriceListUpload.create(uploaded_csv_file())
+
+        self.assertFalse(
+            PriceListUpload.objects.filter(id=old_upload.id).exists())
+        self.assertTrue(
+            PriceListUpload.objects.filter(id=recent_upload.id).exists())
@@ -2,11 +2,18 @@ import io
 import json
 import unittest
 from django.core.management import call_command
+from django.test import override_settings
+import django_rq
 
-from ..models import SubmittedPriceList
+from unittest.mock import patch
+
+from ..models import PriceListDraft, PriceListUpload, SubmittedPriceList
 from ..schedules.fake_schedule import FakeSchedulePriceList
 from ..schedules import registry
-from .common import StepTestCase, FAKE_SCHEDULE, FAKE_SCHEDULE_EXAMPLE_PATH
+from .common import (StepTestCase, FAKE_SCHEDULE, FAKE_SCHEDULE_EXAMPLE_PATH,
+                     uploaded_csv_file)
+from .test_jobs import process_worker_jobs
+from ..views import price_list_upload
 
 
 class PriceListStepTestCase(StepTestCase):
@@ -16,11 +23,14 @@ class PriceListStepTestCase(StepTestCase):
     def set_fake_gleaned_data(self, rows):
         session = self.client.session
         pricelist = FakeSchedulePriceList(rows)
-        session['data_capture:price_list']['schedule'] = \
-            registry.get_classname(pricelist)
-        session['data_capture:price_list']['gleaned_data'] = \
-            registry.serialize(pricelist)
+        draft = PriceListDraft.create(pricelist, submitter=self.user)
+        session['data_capture:price_list']['draft_id'] = draft.id
         session.save()
+        return draft
+
+    def get_session_draft(self):
+        session_pl = self.client.session['data_capture:price_list']
+        return PriceListDraft.objects.get(id=session_pl['draft_id'])
 
     def delete_price_list_from_session(self):
         session = self.client.session
@@ -35,7 +45,8 @@ class PriceListStepTestCase(StepTestCase):
     def login(self, groups=None, **kwargs):
         if groups is None:
             groups = ['Contract Officers']
-        return super().login(groups=groups, **kwargs)
+        self.user = super().login(groups=groups, **kwargs)
+        return self.user
 
     def test_login_is_required(self):
         if not self.url:
@@ -216,8 +227,8 @@ class Step3Tests(PriceListStepTestCase):
             session_pl = self.client.session['data_capture:price_list']
             self.assertEqual(session_pl['step_1_POST']['schedule'],
                              FAKE_SCHEDULE)
-            gleaned_data = session_pl['gleaned_data']
-            gleaned_data = registry.deserialize(gleaned_data)
+            self.assertNotIn('gleaned_data', session_pl)
+            gleaned_data = self.get_session_draft().get_gleaned_data()
             assert isinstance(gleaned_data, FakeSchedulePriceList)
             self.assertEqual(gleaned_data.rows, [{
                 'education': 'Bachelors',
@@ -227,6 +238,17 @@ class Step3Tests(PriceListStepTestCase):
                 'years_experience': '7'
             }])
 
+    def test_valid_post_replaces_previous_draft(self):
+        self.login()
+        old_draft = self.set_fake_gleaned_data(self.rows)
+        with open(self.csvpath) as f:
+            self.client.post(self.url, {
+                'file': f
+            })
+        self.assertNotEqual(self.get_session_draft().id, old_draft.id)
+        self.assertFalse(
+            PriceListDraft.objects.filter(id=old_draft.id).exists())
+
     def test_valid_post_via_xhr_returns_json(self):
         self.login()
         with open(self.csvpath) as f:
@@ -279,6 +301,132 @@ class Step3Tests(PriceListStepTestCase):
             self.assertFalse(k.startswith('data_capture:'))
 
 
+@override_settings(DATA_CAPTURE_ASYNC_PARSING=True)
+class Step3AsyncTests(PriceListStepTestCase):
+    url = '/data-capture/step/3/status'
+
+    def setUp(self):
+        super().setUp()
+        session = self.client.session
+        session['data_capture:price_list'] = {
+            'step_1_POST': Step1Tests.valid_form,
+            'step_2_POST': Step2Tests.valid_form,
+        }
+        session.save()
+
+    def tearDown(self):
+        super().tearDown()
+        # Don't leave jobs that no worker got around to for other tests.
+        django_rq.get_queue().empty()
+
+    def ajax_get(self):
+        res = self.client.get(self.url,
+                              HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(res.status_code, 200)
+        return res, json.loads(res.content.decode('utf-8'))
+
+    def post_file(self, f):
+        res = self.client.post(Step3Tests.url, {'file': f},
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(res.status_code, 200)
+        return json.loads(res.content.decode('utf-8'))
+
+    def test_redirects_to_step_3_if_nothing_uploaded(self):
+        self.login()
+        res = self.client.get(self.url)
+        self.assertRedirects(res, Step3Tests.url)
+
+    def test_valid_post_via_xhr_returns_poll_url(self):
+        self.login()
+        with open(Step3Tests.csvpath) as f:
+            self.assertEqual(self.post_file(f), {'poll_url': self.url})
+        session_pl = self.client.session['data_capture:price_list']
+        self.assertNotIn('draft_id', session_pl)
+
+    def test_valid_post_redirects_to_status_page(self):
+        self.login()
+        with open(Step3Tests.csvpath) as f:
+            res = self.client.post(Step3Tests.url, {'file': f})
+        self.assertRedirects(res, self.url)
+
+    def test_status_page_refreshes_while_parsing(self):
+        self.login()
+        with open(Step3Tests.csvpath) as f:
+            self.post_file(f)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'http-equiv="refresh"')
+        res, json_data = self.ajax_get()
+        self.assertEqual(json_data, {'poll_url': self.url})
+
+    def test_redirects_to_step_4_when_parsed(self):
+        self.login()
+        with open(Step3Tests.csvpath) as f:
+            self.post_file(f)
+        process_worker_jobs()
+        res, json_data = self.ajax_get()
+        self.assertEqual(json_data, {
+            'redirect_url': '/data-capture/step/4'
+        })
+        session_pl = self.client.session['data_capture:price_list']
+        self.assertNotIn('glean_job_id', session_pl)
+        draft = self.get_session_draft()
+        self.assertEqual(draft.submitter, self.user)
+        self.assertEqual(draft.get_gleaned_data().rows, Step3Tests.rows)
+
+    def test_shows_errors_when_file_cannot_be_gleaned(self):
+        self.login()
+        self.post_file(uploaded_csv_file(b'i cannot be gleaned'))
+        process_worker_jobs()
+        res, json_data = self.ajax_get()
+        self.assertIn('form_html', json_data)
+        self.assertHasMessage(
+            res,
+            'error',
+            "The file you uploaded doesn't have any data we can "
+            "glean from it."
+        )
+        session_pl = self.client.session['data_capture:price_list']
+        self.assertNotIn('glean_job_id', session_pl)
+
+    def test_upload_is_saved_to_the_database_for_the_job(self):
+        self.login()
+        with open(Step3Tests.csvpath, 'rb') as f:
+            content = f.read()
+            f.seek(0)
+            self.post_file(f)
+        session_pl = self.client.session['data_capture:price_list']
+        upload = PriceListUpload.objects.get(
+            id=session_pl['glean_upload_id'])
+        self.assertEqual(bytes(upload.original_file), content)
+        job = django_rq.get_queue().fetch_job(session_pl['glean_job_id'])
+        self.assertIn(upload.id, job.args)
+
+        process_worker_jobs()
+        self.assertFalse(PriceListUpload.objects.exists())
+
+    @patch.object(price_list_upload, 'GLEAN_QUEUE_TIMEOUT', -1)
+    def test_gives_up_when_no_worker_starts_the_job(self):
+        self.login()
+        with open(Step3Tests.csvpath) as f:
+            self.post_file(f)
+        session_pl = self.client.session['data_capture:price_list']
+        job_id = session_pl['glean_job_id']
+
+        res, json_data = self.ajax_get()
+        self.assertIn('form_html', json_data)
+        self.assertHasMessage(
+            res,
+            'error',
+            'Sorry, we were unable to process your price list. '
+            'Please try again.'
+        )
+        self.assertNotIn(job_id, django_rq.get_queue().job_ids)
+        self.assertFalse(PriceListUpload.objects.exists())
+        session_pl = self.client.session['data_capture:price_list']
+        self.assertNotIn('glean_job_id', session_pl)
+
+
 class Step4Tests(PriceListStepTestCase):
     url = '/data-capture/step/4'
     rows = [{
@@ -320,6 +468,30 @@ class Step4Tests(PriceListStepTestCase):
         res = self.client.get(self.url)
         self.assertEqual(res.status_code, 200)
 
+    def test_get_does_not_revalidate_gleaned_data(self):
+        self.login()
+        session = self.client.session
+        session['data_capture:price_list'] = self.session_data
+        session.save()
+        self.set_fake_gleaned_data(self.rows)
+        with patch.object(registry, 'deserialize') as m:
+            res = self.client.get(self.url)
+        self.assertEqual(m.call_count, 0)
+        self.assertContains(res, '1 row ready to add to CALC')
+        self.assertContains(res, '1 row has errors')
+        self.assertContains(res, 'Oil change &amp; tune up')
+
+    def test_drafts_of_other_users_are_not_used(self):
+        self.login()
+        session = self.client.session
+        session['data_capture:price_list'] = self.session_data
+        session.save()
+        draft = self.set_fake_gleaned_data(self.rows)
+        draft.submitter = self.create_user(username='someone_else')
+        draft.save()
+        res = self.client.get(self.url)
+        self.assertRedirects(res, Step3Tests.url)
+
     def test_gleaned_data_with_valid_rows_is_required_on_POST(self):
         self.login()
         session = self.client.session
@@ -352,10 +524,11 @@ class Step4Tests(PriceListStepTestCase):
         session = self.client.session
         session['data_capture:price_list'] = self.session_data
         session.save()
-        self.set_fake_gleaned_data(self.rows)
+        draft = self.set_fake_gleaned_data(self.rows)
         res = self.client.post(self.url)
         assert 'data_capture:price_list' not in self.client.session
         self.assertRedirects(res, Step5Tests.url)
+        self.assertFalse(PriceListDraft.objects.filter(id=draft.id).exists())
 
     def test_cancel_clears_session_and_redirects(self):
         self.login()
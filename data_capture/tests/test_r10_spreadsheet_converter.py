@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from django.test import TestCase
 
 import xlrd
@@ -86,3 +87,18 @@ class TestRegion10SpreadsheetConverter(TestCase):
         parsed_rows = converter.convert_file()
         self.assertEqual(len(parsed_rows), 4)
         self.assertEqual(expected_results, parsed_rows)
+
+    def test_parses_workbook_once(self):
+        converter = Region10SpreadsheetConverter(xls_file=r10_file())
+        with patch.object(xlrd, 'open_workbook',
+                          wraps=xlrd.open_workbook) as mock:
+            self.assertTrue(converter.is_valid_file())
+            converter.get_metadata()
+            converter.convert_file()
+        self.assertEqual(mock.call_count, 1)
+
+    def test_leaves_file_at_start(self):
+        f = r10_file()
+        converter = Region10SpreadsheetConverter(xls_file=f)
+        converter.convert_file()
+        self.assertEqual(f.tell(), 0)
@@ -5,9 +5,10 @@ from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
 
-from .common import path, XLSX_CONTENT_TYPE
+from .common import path, uploaded_csv_file, XLSX_CONTENT_TYPE
 from .test_models import ModelTestCase
-from ..schedules import s70, registry
+from ..schedules import s70, registry, base
+from ..schedules.base import SniffedUpload
 from contracts.loaders.region_10 import FEDERAL_MIN_CONTRACT_RATE
 
 
@@ -89,6 +90,62 @@ class GleanLaborCategoriesTests(TestCase):
                 sheet_name='foo'
             )
 
+    @patch.object(s70, 'MAX_LABOR_CATEGORY_ROWS', 0)
+    def test_validation_error_raised_when_too_many_rows(self):
+        with self.assertRaisesRegexp(ValidationError, r'more than 0 rows'):
+            s70.glean_labor_categories_from_file(uploaded_xlsx_file())
+
+    @patch.object(s70, 'MAX_WORKBOOK_BYTES', 100)
+    def test_validation_error_raised_when_workbook_too_large(self):
+        with self.assertRaisesRegexp(ValidationError, r'too large'):
+            s70.glean_labor_categories_from_file(uploaded_xlsx_file())
+
+    @patch('xlrd.open_workbook')
+    def test_xls_files_only_load_the_labor_categories_sheet(self, m):
+        m.return_value.sheet_names.return_value = ['(3)Labor Categories']
+        m.return_value.sheet_by_name.return_value.cell_value.side_effect = \
+            IndexError()
+
+        self.assertEqual(s70.glean_labor_categories_from_file(
+            uploaded_xlsx_file(b'\xd0\xcf\x11\xe0 not really xls')), [])
+        m.assert_called_once_with(
+            file_contents=b'\xd0\xcf\x11\xe0 not really xls',
+            on_demand=True
+        )
+
+
+class SniffTests(TestCase):
+    def test_returns_1_for_s70_workbooks(self):
+        sniffed = SniffedUpload(uploaded_xlsx_file())
+        self.assertEqual(s70.Schedule70PriceList.sniff(sniffed), 1)
+
+    def test_returns_0_for_other_files(self):
+        sniffed = SniffedUpload(uploaded_csv_file())
+        self.assertEqual(s70.Schedule70PriceList.sniff(sniffed), 0)
+
+    @patch('xlrd.open_workbook')
+    def test_sniffed_xls_files_are_only_parsed_once(self, m):
+        m.return_value.sheet_names.return_value = ['(3)Labor Categories']
+        m.return_value.sheet_by_name.return_value.cell_value.side_effect = \
+            IndexError()
+        sniffed = SniffedUpload(
+            uploaded_xlsx_file(b'\xd0\xcf\x11\xe0 not really xls'))
+
+        self.assertEqual(s70.Schedule70PriceList.sniff(sniffed), 1)
+        p = s70.Schedule70PriceList.load_from_sniffed_upload(sniffed)
+
+        self.assertTrue(p.is_empty())
+        self.assertEqual(m.call_count, 1)
+
+    @patch.object(base, 'MAX_WORKBOOK_BYTES', 4)
+    @patch('xlrd.open_workbook')
+    def test_xls_files_too_large_to_read_are_not_sniffed(self, m):
+        sniffed = SniffedUpload(
+            uploaded_xlsx_file(b'\xd0\xcf\x11\xe0 not really xls'))
+
+        self.assertEqual(s70.Schedule70PriceList.sniff(sniffed), 0)
+        self.assertEqual(m.call_count, 0)
+
 
 class LoadFromUploadValidationErrorTests(TestCase):
     @patch.object(s70, 'glean_labor_categories_from_file')
@@ -140,6 +197,43 @@ class S70Tests(ModelTestCase):
         self.assertEqual(p.invalid_rows[0].errors['min_years_experience'],
                          ['This field is required.'])
 
+    def test_rows_can_be_rendered_like_forms(self):
+        p = s70.Schedule70PriceList(rows=[{'min_years_experience': 'foo'}])
+        field = p.invalid_rows[0]['min_years_experience']
+
+        self.assertEqual(field.value, 'foo')
+        self.assertEqual(field.errors, ['Enter a whole number.'])
+        self.assertEqual(p.invalid_rows[0]['sin'].errors,
+                         ['This field is required.'])
+
+    def test_rows_are_validated_like_forms(self):
+        valid_row = {
+            'sin': '132-51',
+            'labor_category': 'Engineer 1',
+            'education_level': 'Bachelors',
+            'min_years_experience': '2.0',
+            'price_including_iff': ' 115.99 ',
+        }
+        rows = [valid_row] + [
+            dict(valid_row, **{name: value})
+            for name, value in [
+                ('sin', ''),
+                ('education_level', 'Batchelorz'),
+                ('min_years_experience', '2.5'),
+                ('min_years_experience', None),
+                ('price_including_iff', 'NaN'),
+                ('price_including_iff', 'lots'),
+            ]
+        ]
+
+        validated_rows = s70.Schedule70RowValidator().validate(rows)
+
+        for row, validated_row in zip(rows, validated_rows):
+            form = s70.Schedule70Row(row)
+            self.assertEqual(validated_row.is_valid(), form.is_valid())
+            self.assertEqual(validated_row.errors, form.errors)
+            self.assertEqual(validated_row.cleaned_data, form.cleaned_data)
+
     def test_add_to_price_list_works(self):
         s = s70.Schedule70PriceList.load_from_upload(uploaded_xlsx_file())
 
@@ -1,10 +1,10 @@
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 from django.test import TestCase, override_settings
 from django.core.exceptions import ValidationError
 
 from ..schedules import registry
 from ..schedules.registry import smart_load_from_upload
-from ..schedules.base import BasePriceList
+from ..schedules.base import BasePriceList, SniffedUpload
 from ..schedules.fake_schedule import FakeSchedulePriceList
 from .common import FAKE_SCHEDULE, uploaded_csv_file
 
@@ -88,6 +88,46 @@ class SmartLoadFromUploadTests(RegistryTestCase):
         self.assertEqual(m.call_count, 0)
         self.assertTrue(isinstance(p, FakeSchedulePriceList))
 
+    @patch.object(FakeSchedulePriceList, 'load_from_upload')
+    def test_schedules_that_cannot_sniff_the_file_are_not_consulted(self, m):
+        with self.assertRaisesRegexp(ValidationError, 'Bar'):
+            smart_load_from_upload(FOO_SCHEDULE, uploaded_csv_file(b'nope'))
+        self.assertEqual(m.call_count, 0)
+
     def test_original_error_propagated_when_better_matches_not_found(self):
         with self.assertRaisesRegexp(ValidationError, 'Bar'):
             smart_load_from_upload(FOO_SCHEDULE, uploaded_csv_file(b'nope'))
+
+
+@override_settings(DATA_CAPTURE_SCHEDULES=[FAKE_SCHEDULE, FOO_SCHEDULE])
+class SniffTests(RegistryTestCase):
+    def test_best_match_is_returned(self):
+        self.assertEqual(registry.sniff(uploaded_csv_file()), FAKE_SCHEDULE)
+
+    def test_none_is_returned_when_nothing_matches(self):
+        self.assertIsNone(registry.sniff(uploaded_csv_file(b'nope'),
+                                         exclude=[FOO_SCHEDULE]))
+
+    def test_excluded_schedules_are_ignored(self):
+        self.assertEqual(registry.sniff(uploaded_csv_file(),
+                                        exclude=[FAKE_SCHEDULE]),
+                         FOO_SCHEDULE)
+
+    def test_schedules_that_do_not_sniff_are_a_last_resort(self):
+        self.assertEqual(FooSchedulePriceList.sniff(
+            SniffedUpload(uploaded_csv_file())), 0.01)
+        self.assertEqual(registry.sniff(uploaded_csv_file(b'nope')),
+                         FOO_SCHEDULE)
+
+    def test_file_is_only_inspected_once(self):
+        f = Mock(wraps=uploaded_csv_file())
+        registry.sniff(f)
+        self.assertEqual(f.read.call_count, 1)
+        self.assertEqual(f.tell(), 0)
+
+    def test_fake_schedule_sniffs_csv_header(self):
+        sniff = FakeSchedulePriceList.sniff
+        self.assertEqual(sniff(SniffedUpload(uploaded_csv_file())), 1)
+        self.assertEqual(sniff(SniffedUpload(uploaded_csv_file(
+            b'sin,service,foo,bar,baz\n'))), 0.4)
+        self.assertEqual(sniff(SniffedUpload(uploaded_csv_file(b'nope'))), 0)
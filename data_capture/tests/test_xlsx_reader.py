@@ -0,0 +1,82 @@
+from unittest.mock import patch
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from .test_s70 import S70_XLSX_PATH
+from ..xlsx_reader import XlsxWorkbook, XlsxSheet, is_xlsx
+
+LABOR_CATEGORIES = '(3)Labor Categories'
+
+
+class XlsxWorkbookTests(TestCase):
+    def setUp(self):
+        self.f = open(S70_XLSX_PATH, 'rb')
+        self.book = XlsxWorkbook(self.f, max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        self.f.close()
+
+    def read_rows(self, **kwargs):
+        return self.book.read_rows(
+            LABOR_CATEGORIES,
+            first_row=kwargs.get('first_row', 3),
+            max_rows=kwargs.get('max_rows', 100),
+            until=kwargs.get('until', lambda cells: not cells)
+        )
+
+    def test_is_xlsx_works(self):
+        # Opening the workbook in setUp() moved the file position.
+        self.f.seek(0)
+        self.assertTrue(is_xlsx(self.f))
+        self.assertEqual(self.f.tell(), 0)
+
+    def test_sheet_names_works(self):
+        self.assertEqual(self.book.sheet_names(), [
+            '(1)Information Page- Read First',
+            '(2)Products Categories',
+            '(3)Labor Categories',
+            '(4)Courses Categories',
+        ])
+
+    def test_read_rows_works(self):
+        sheet = self.read_rows()
+        self.assertEqual(list(sheet.rows), [3])
+        self.assertEqual(sheet.cell_value(3, 0), '132-51')
+        self.assertEqual(sheet.cell_value(3, 1), 'Project Manager')
+        self.assertEqual(sheet.cell_value(3, 3), 5.0)
+        self.assertEqual(sheet.cell_value(3, 11), 115.99)
+
+    def test_read_rows_stops_at_until(self):
+        sheet = self.read_rows(until=lambda cells: True)
+        self.assertEqual(sheet.rows, {})
+
+    def test_read_rows_raises_when_too_many_rows(self):
+        with self.assertRaisesRegexp(ValidationError, r'more than 0 rows'):
+            self.read_rows(max_rows=0)
+
+    def test_only_needed_shared_strings_are_read(self):
+        requested = []
+        get_shared_strings = self.book.get_shared_strings
+
+        def spy(indexes):
+            requested.extend(indexes)
+            return get_shared_strings(requested)
+
+        with patch.object(self.book, 'get_shared_strings', spy):
+            self.read_rows()
+        self.assertEqual(len(set(requested)), 5)
+
+    def test_raises_when_over_byte_budget(self):
+        book = XlsxWorkbook(self.f, max_bytes=1000)
+        with self.assertRaisesRegexp(ValidationError, r'too large'):
+            list(book.iter_rows(LABOR_CATEGORIES))
+
+
+class XlsxSheetTests(TestCase):
+    def test_missing_cells_raise_index_error(self):
+        sheet = XlsxSheet({3: {0: 'foo'}})
+        self.assertEqual(sheet.cell_value(3, 0), 'foo')
+        with self.assertRaises(IndexError):
+            sheet.cell_value(3, 1)
+        with self.assertRaises(IndexError):
+            sheet.cell_value(4, 0)
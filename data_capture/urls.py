@@ -6,6 +6,8 @@ urlpatterns = [
     url(r'^step/1$', price_list_upload.step_1, name='step_1'),
     url(r'^step/2$', price_list_upload.step_2, name='step_2'),
     url(r'^step/3$', price_list_upload.step_3, name='step_3'),
+    url(r'^step/3/status$', price_list_upload.step_3_status,
+        name='step_3_status'),
     url(r'^step/4$', price_list_upload.step_4, name='step_4'),
     url(r'^step/5$', price_list_upload.step_5, name='step_5'),
 
@@ -1,25 +1,71 @@
 import json
+from datetime import datetime, timedelta
 from functools import wraps
+from django.conf import settings
+from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render, redirect
 from django.http import HttpResponseBadRequest
+import django_rq
 
-from .. import forms
+from .. import forms, jobs
 from ..decorators import handle_cancel, contract_officer_perms_required
+from ..models import PriceListDraft, PriceListUpload
 from ..schedules import registry
 from .common import add_generic_form_error
 from frontend import ajaxform
 
 
-def gleaned_data_required(f):
+# The number of seconds that an uploaded price list may wait for a
+# worker to interpret it before we give up on it, e.g. because no
+# worker is running.
+GLEAN_QUEUE_TIMEOUT = 60
+
+
+def get_draft(request):
+    '''
+    Returns the PriceListDraft referenced by the user's session, or
+    None if there isn't one.
+    '''
+
+    draft_id = get_nested_item(request.session,
+                               ('data_capture:price_list', 'draft_id'))
+    if draft_id is None:
+        return None
+    return PriceListDraft.objects.filter(
+        id=draft_id,
+        submitter=request.user
+    ).first()
+
+
+def set_draft(request, draft_id):
+    '''
+    Makes the user's session reference the PriceListDraft with the given
+    id, deleting the one it previously referenced, if any.
+    '''
+
+    session_pl = request.session['data_capture:price_list']
+    old_draft_id = session_pl.get('draft_id')
+    if old_draft_id is not None and old_draft_id != draft_id:
+        PriceListDraft.objects.filter(
+            id=old_draft_id,
+            submitter=request.user
+        ).delete()
+    session_pl['draft_id'] = draft_id
+
+    # Changing the value of a subkey doesn't cause the session to save,
+    # so do it manually
+    request.session.modified = True
+
+
+def draft_required(f):
     @wraps(f)
     def wrapper(request):
-        try:
-            d = request.session['data_capture:price_list']['gleaned_data']
-        except:
+        draft = get_draft(request)
+        if draft is None:
             return redirect('data_capture:step_3')
 
-        return f(request, registry.deserialize(d))
+        return f(request, draft)
     return wrapper
 
 
@@ -103,6 +149,18 @@ def step_2(request):
     })
 
 
+def render_step_3(request, form):
+    return ajaxform.render(
+        request,
+        context={
+            'step_number': 3,
+            'form': form
+        },
+        template_name='data_capture/price_list/step_3.html',
+        ajax_template_name='data_capture/price_list/upload_form.html',
+    )
+
+
 @contract_officer_perms_required
 @require_http_methods(["GET", "POST"])
 @handle_cancel
@@ -118,39 +176,108 @@ def step_3(request):
             posted_data = dict(
                 request.POST,
                 schedule=session_pl['step_1_POST']['schedule'])
-            form = forms.Step3Form(posted_data, request.FILES)
+            glean_in_background = settings.DATA_CAPTURE_ASYNC_PARSING
+            form = forms.Step3Form(posted_data, request.FILES,
+                                   glean=not glean_in_background)
 
             if form.is_valid():
-                session_pl['gleaned_data'] = \
-                    registry.serialize(form.cleaned_data['gleaned_data'])
-
-                request.session.modified = True
+                if glean_in_background:
+                    upload_id = jobs.save_price_list_upload(
+                        form.cleaned_data['file'])
+                    job = jobs.glean_price_list.delay(
+                        form.cleaned_data['schedule'],
+                        upload_id,
+                        request.user.id,
+                    )
+                    session_pl['glean_job_id'] = job.id
+                    session_pl['glean_upload_id'] = upload_id
+
+                    request.session.modified = True
+
+                    return ajaxform.poll(request, 'data_capture:step_3_status')
+
+                draft = PriceListDraft.create(
+                    form.cleaned_data['gleaned_data'],
+                    submitter=request.user
+                )
+                set_draft(request, draft.id)
 
                 return ajaxform.redirect(request, 'data_capture:step_4')
             else:
                 add_generic_form_error(request, form)
 
-        return ajaxform.render(
-            request,
-            context={
-                'step_number': 3,
-                'form': form
-            },
-            template_name='data_capture/price_list/step_3.html',
-            ajax_template_name='data_capture/price_list/upload_form.html',
-        )
+        return render_step_3(request, form)
+
+
+def is_overdue(job):
+    '''
+    Returns whether the given job has been waiting for a worker to start
+    it for more than GLEAN_QUEUE_TIMEOUT seconds.
+    '''
+
+    waited = datetime.utcnow() - job.enqueued_at
+    return job.is_queued and waited > timedelta(seconds=GLEAN_QUEUE_TIMEOUT)
+
+
+@contract_officer_perms_required
+@require_http_methods(["GET"])
+def step_3_status(request):
+    '''
+    Reports on the background job started by step 3 to interpret an
+    uploaded price list, moving on to step 4 once it's finished. If no
+    worker has started the job within GLEAN_QUEUE_TIMEOUT seconds, it's
+    cancelled and treated as failed.
+    '''
+
+    session_pl = request.session.get('data_capture:price_list', {})
+    job_id = session_pl.get('glean_job_id')
+    if job_id is None:
+        return redirect('data_capture:step_3')
+
+    job = django_rq.get_queue().fetch_job(job_id)
+    if job is not None and is_overdue(job):
+        job.cancel()
+        PriceListUpload.objects.filter(
+            id=session_pl['glean_upload_id']).delete()
+        job = None
+    if job is not None and not (job.is_finished or job.is_failed):
+        if request.is_ajax():
+            return ajaxform.poll(request, 'data_capture:step_3_status')
+        return render(request, 'data_capture/price_list/step_3_status.html', {
+            'step_number': 3,
+        })
+
+    del session_pl['glean_job_id']
+    del session_pl['glean_upload_id']
+    request.session.modified = True
+
+    result = job.result if job is not None and job.is_finished else None
+    if result is None:
+        errors = ['Sorry, we were unable to process your price list. '
+                  'Please try again.']
+    else:
+        errors = result.get('errors', [])
+
+    if not errors:
+        set_draft(request, result['draft_id'])
+        return ajaxform.redirect(request, 'data_capture:step_4')
+
+    for error in errors:
+        messages.add_message(request, messages.ERROR, error)
+
+    return render_step_3(request, forms.Step3Form())
 
 
 @contract_officer_perms_required
-@gleaned_data_required
+@draft_required
 @handle_cancel
-def step_4(request, gleaned_data):
+def step_4(request, draft):
     session_pl = request.session['data_capture:price_list']
     preferred_schedule = registry.get_class(
         session_pl['step_1_POST']['schedule']
     )
     if request.method == 'POST':
-        if not gleaned_data.valid_rows:
+        if not draft.valid_row_count:
             # Our UI never should've let the user issue a request
             # like this.
             return HttpResponseBadRequest()
@@ -169,20 +296,24 @@ def step_4(request, gleaned_data):
             raise AssertionError('invalid step 2 data in session')
         step_2_form.save(commit=False)
 
+        serialized_gleaned_data = draft.get_serialized_gleaned_data()
         price_list.submitter = request.user
         price_list.serialized_gleaned_data = json.dumps(
-            session_pl['gleaned_data'])
+            serialized_gleaned_data)
         price_list.save()
-        gleaned_data.add_to_price_list(price_list)
+        registry.deserialize(serialized_gleaned_data).add_to_price_list(
+            price_list)
 
+        draft.delete()
         del request.session['data_capture:price_list']
 
         return redirect('data_capture:step_5')
 
     return render(request, 'data_capture/price_list/step_4.html', {
         'step_number': 4,
-        'gleaned_data': gleaned_data,
-        'is_preferred_schedule': isinstance(gleaned_data, preferred_schedule),
+        'draft': draft,
+        'is_preferred_schedule': (
+            draft.schedule == session_pl['step_1_POST']['schedule']),
         'preferred_schedule': preferred_schedule,
     })
 
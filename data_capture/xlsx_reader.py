@@ -0,0 +1,246 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+REL_NS = ('{http://schemas.openxmlformats.org/officeDocument/2006/'
+          'relationships}')
+
+PACKAGE_REL_NS = ('{http://schemas.openxmlformats.org/package/2006/'
+                  'relationships}')
+
+# The first bytes of every .xlsx file, which is a zip archive.
+XLSX_SIGNATURE = b'PK\x03\x04'
+
+
+def is_xlsx(f):
+    '''
+    Returns whether the given file looks like an .xlsx workbook, leaving
+    its position unchanged.
+    '''
+
+    position = f.tell()
+    signature = f.read(len(XLSX_SIGNATURE))
+    f.seek(position)
+    return signature == XLSX_SIGNATURE
+
+
+def column_index(cell_ref):
+    '''
+    Returns the zero-based column index of a cell reference.
+
+    >>> column_index('A1')
+    0
+    >>> column_index('AB12')
+    27
+    '''
+
+    index = 0
+    for char in re.match(r'[A-Z]+', cell_ref).group(0):
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index - 1
+
+
+def get_text(elem):
+    '''
+    Returns the text of an inline or shared string element, leaving out
+    any phonetic hints.
+    '''
+
+    parts = []
+    for child in elem:
+        if child.tag == MAIN_NS + 't':
+            parts.append(child.text or '')
+        elif child.tag == MAIN_NS + 'r':
+            text = child.find(MAIN_NS + 't')
+            if text is not None:
+                parts.append(text.text or '')
+    return ''.join(parts)
+
+
+class SharedString(int):
+    '''
+    The index of a cell's value in the workbook's shared strings, before
+    it has been looked up.
+    '''
+
+
+class BudgetedFile(object):
+    '''
+    A read-only file-like object that raises a ValidationError once more
+    than a given number of bytes have been read from a file (or from all
+    the files sharing its budget).
+    '''
+
+    def __init__(self, f, budget):
+        self.f = f
+        self.budget = budget
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.budget['remaining'] -= len(data)
+        if self.budget['remaining'] < 0:
+            raise ValidationError('The workbook is too large to read.')
+        return data
+
+
+class XlsxWorkbook(object):
+    '''
+    Reads worksheets from an .xlsx workbook a row at a time, without
+    loading the whole workbook (or even a whole worksheet) into memory,
+    unlike xlrd.
+
+    Reading stops with a ValidationError once more than max_bytes of
+    uncompressed XML have been read.
+    '''
+
+    def __init__(self, f, max_bytes):
+        self.zipfile = zipfile.ZipFile(f)
+        self.budget = {'remaining': max_bytes}
+        self.sheet_paths = OrderedDict()
+
+        workbook = ET.fromstring(self.zipfile.read('xl/workbook.xml'))
+        rels = ET.fromstring(
+            self.zipfile.read('xl/_rels/workbook.xml.rels'))
+        targets = dict(
+            (rel.get('Id'), rel.get('Target'))
+            for rel in rels.iter(PACKAGE_REL_NS + 'Relationship')
+        )
+        for sheet in workbook.iter(MAIN_NS + 'sheet'):
+            target = targets[sheet.get(REL_NS + 'id')]
+            if target.startswith('/'):
+                path = target[1:]
+            else:
+                path = posixpath.normpath(posixpath.join('xl', target))
+            self.sheet_paths[sheet.get('name')] = path
+
+        self.shared_strings_path = None
+        for target in targets.values():
+            if target.endswith('sharedStrings.xml'):
+                self.shared_strings_path = posixpath.normpath(
+                    posixpath.join('xl', target.lstrip('/')))
+
+    def sheet_names(self):
+        return list(self.sheet_paths)
+
+    def iter_elements(self, path, tag):
+        '''
+        Yields each element with the given tag in one of the workbook's
+        XML files, clearing it once the caller is done with it.
+        '''
+
+        with self.zipfile.open(path) as f:
+            for _, elem in ET.iterparse(BudgetedFile(f, self.budget)):
+                if elem.tag == tag:
+                    yield elem
+                    elem.clear()
+
+    def iter_rows(self, sheet_name):
+        '''
+        Yields (rownum, cells) for each row in a worksheet that has any
+        cells, where cells maps the zero-based column index of each cell
+        with a value to that value. Numbers are floats (as in xlrd) and
+        shared strings are SharedString indexes; see get_shared_strings().
+        '''
+
+        rownum = -1
+        for row in self.iter_elements(self.sheet_paths[sheet_name],
+                                      MAIN_NS + 'row'):
+            rownum = int(row.get('r', rownum + 2)) - 1
+            cells = {}
+            colnum = -1
+            for cell in row.iter(MAIN_NS + 'c'):
+                ref = cell.get('r')
+                colnum = colnum + 1 if ref is None else column_index(ref)
+                cell_type = cell.get('t', 'n')
+                if cell_type == 'inlineStr':
+                    cells[colnum] = get_text(cell.find(MAIN_NS + 'is'))
+                    continue
+                value = cell.find(MAIN_NS + 'v')
+                if value is None or value.text is None:
+                    continue
+                if cell_type == 's':
+                    cells[colnum] = SharedString(value.text)
+                elif cell_type == 'n':
+                    cells[colnum] = float(value.text)
+                elif cell_type == 'b':
+                    cells[colnum] = int(value.text)
+                else:
+                    cells[colnum] = value.text
+            yield rownum, cells
+
+    def get_shared_strings(self, indexes):
+        '''
+        Returns a dict mapping each of the given shared string indexes
+        to its string, reading only as far into the shared strings as
+        needed.
+        '''
+
+        indexes = set(indexes)
+        strings = {}
+        if not indexes or self.shared_strings_path is None:
+            return strings
+
+        for index, elem in enumerate(self.iter_elements(
+                self.shared_strings_path, MAIN_NS + 'si')):
+            if index in indexes:
+                strings[index] = get_text(elem)
+                if len(strings) == len(indexes):
+                    break
+        return strings
+
+    def read_rows(self, sheet_name, first_row, max_rows, until):
+        '''
+        Returns an XlsxSheet with the rows of a worksheet from first_row
+        up to (but not including) the first row for which until(cells)
+        is true, with shared strings looked up.
+
+        A ValidationError is raised if there are more than max_rows
+        such rows.
+        '''
+
+        rows = {}
+        for rownum, cells in self.iter_rows(sheet_name):
+            if rownum < first_row:
+                continue
+            if rownum != first_row + len(rows) or until(cells):
+                break
+            if len(rows) == max_rows:
+                raise ValidationError(
+                    'The "%s" sheet has more than %d rows.' % (
+                        sheet_name, max_rows)
+                )
+            rows[rownum] = cells
+
+        strings = self.get_shared_strings(
+            value for cells in rows.values() for value in cells.values()
+            if isinstance(value, SharedString)
+        )
+        for cells in rows.values():
+            for colnum, value in cells.items():
+                if isinstance(value, SharedString):
+                    cells[colnum] = strings.get(value, '')
+
+        return XlsxSheet(rows)
+
+
+class XlsxSheet(object):
+    '''
+    Rows read from a worksheet by XlsxWorkbook.read_rows(), with the
+    same cell_value() method as an xlrd sheet.
+    '''
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cell_value(self, rownum, colnum):
+        try:
+            return self.rows[rownum][colnum]
+        except KeyError:
+            raise IndexError((rownum, colnum))
@@ -35,6 +35,22 @@ def redirect(request, viewname):
     return HttpResponseRedirect(reverse(viewname))
 
 
+def poll(request, viewname):
+    '''
+    Tell the client to poll the given URL pattern name or the callable
+    view object until it responds with something other than another
+    poll, e.g. while a background job finishes.
+
+    ajaxform.js polls the URL via ajax; browser-initiated requests are
+    simply redirected to it, so the view should also be able to render
+    a page that refreshes itself.
+    '''
+    if request.is_ajax():
+        return JsonResponse({'poll_url': reverse(viewname)})
+
+    return HttpResponseRedirect(reverse(viewname))
+
+
 def render(request, context, template_name, ajax_template_name):
     '''
     Render a template response to the client, choosing a
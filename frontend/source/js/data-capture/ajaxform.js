@@ -11,6 +11,13 @@ const $ = jQuery;
 const MISC_ERROR = 'Sorry, we’re having trouble. ' +
                    'Please try again later or refresh your browser.';
 
+// How long to wait, in milliseconds, before polling a URL again.
+const POLL_INTERVAL = 1000;
+
+// How many times to poll before giving up on the server, e.g. because
+// the work it's doing in the background has stalled.
+const MAX_POLLS = 300;
+
 // This abstracts various actions for test suites to hook into.
 let delegate = {
   redirect(url) {
@@ -20,6 +27,9 @@ let delegate = {
     // TODO: Be more user-friendly here.
     window.alert(msg);   // eslint-disable-line no-alert
   },
+  setTimeout(cb, ms) {
+    return window.setTimeout(cb, ms);
+  },
 };
 
 exports.setDelegate = newDelegate => {
@@ -29,6 +39,10 @@ exports.setDelegate = newDelegate => {
 
 exports.MISC_ERROR = MISC_ERROR;
 
+exports.POLL_INTERVAL = POLL_INTERVAL;
+
+exports.MAX_POLLS = MAX_POLLS;
+
 /**
  * AjaxForm represents a <form is="ajax-form"> web component, which submits
  * a form via XMLHttpRequest (aka ajax) when the requisite browser
@@ -49,6 +63,12 @@ exports.MISC_ERROR = MISC_ERROR;
  *
  *   * `redirect_url`, containing a string value representing the URL to
  *     redirect the user's browser to.
+ *
+ *   * `poll_url`, containing a string value representing a URL to
+ *     request (via ajax GET) after a short delay, e.g. while the server
+ *     processes the form in the background. The server is expected to
+ *     respond to it with one of these same keys. If it still responds
+ *     with `poll_url` after `MAX_POLLS` polls, the form gives up.
  */
 
 class AjaxForm extends window.HTMLFormElement {
@@ -112,11 +132,23 @@ class AjaxForm extends window.HTMLFormElement {
 
     $(this).addClass('submit-in-progress');
 
+    this._pollCount = 0;
+    this._handleResponse(req);
+  }
+
+  _poll(url) {
+    this._handleResponse($.ajax(url, { method: 'GET' }));
+  }
+
+  _handleResponse(req) {
     req.done((data) => {
       if (data.form_html) {
         this._replaceWithNewForm(data.form_html);
       } else if (data.redirect_url) {
         delegate.redirect(data.redirect_url);
+      } else if (data.poll_url && this._pollCount < MAX_POLLS) {
+        this._pollCount++;
+        delegate.setTimeout(() => this._poll(data.poll_url), POLL_INTERVAL);
       } else {
         delegate.alert(MISC_ERROR);
         $(this).removeClass('submit-in-progress');
@@ -227,6 +227,71 @@ advancedTest('redirect_url redirects browser', (assert, s) => {
   assert.ok(delegate.redirect.calledWith('http://boop'));
 });
 
+advancedTest('poll_url polls until the server responds', (assert, s) => {
+  s.setFile(createBlob('blah'));
+  $(s.ajaxform).submit();
+
+  const delegate = ajaxform.setDelegate({
+    redirect: sinon.spy(),
+    setTimeout: sinon.spy(),
+  });
+
+  server.requests[0].respond(
+    200,
+    { 'Content-Type': 'application/json' },
+    JSON.stringify({
+      poll_url: '/status',
+    })
+  );
+
+  assert.ok(delegate.setTimeout.calledWith(sinon.match.func,
+                                           ajaxform.POLL_INTERVAL));
+  assert.equal(server.requests.length, 1);
+
+  delegate.setTimeout.args[0][0]();
+
+  assert.equal(server.requests.length, 2);
+  assert.equal(server.requests[1].method, 'GET');
+  assert.equal(urlParse(server.requests[1].url).path, '/status');
+
+  server.requests[1].respond(
+    200,
+    { 'Content-Type': 'application/json' },
+    JSON.stringify({
+      redirect_url: 'http://boop',
+    })
+  );
+
+  assert.ok(delegate.redirect.calledWith('http://boop'));
+});
+
+advancedTest('poll_url gives up after MAX_POLLS polls', (assert, s) => {
+  s.setFile(createBlob('blah'));
+  $(s.ajaxform).submit();
+
+  const delegate = ajaxform.setDelegate({
+    alert: sinon.spy(),
+    setTimeout: sinon.spy(),
+  });
+
+  for (let i = 0; i <= ajaxform.MAX_POLLS; i++) {
+    server.requests[i].respond(
+      200,
+      { 'Content-Type': 'application/json' },
+      JSON.stringify({
+        poll_url: '/status',
+      })
+    );
+    if (i < ajaxform.MAX_POLLS) {
+      delegate.setTimeout.args[i][0]();
+    }
+  }
+
+  assert.equal(delegate.setTimeout.callCount, ajaxform.MAX_POLLS);
+  assert.equal(server.requests.length, ajaxform.MAX_POLLS + 1);
+  assert.ok(delegate.alert.calledWith(ajaxform.MISC_ERROR));
+});
+
 advancedTest('500 results in alert', (assert, s) => {
   s.setFile(createBlob('blah'));
   $(s.ajaxform).submit();
@@ -188,6 +188,38 @@ if is_running_tests():
 
 PAGINATION = 200
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        # This lives in the memory of each web process, so it's kept
+        # well within what our instances have to spare.
+        'BACKEND': 'api.cache.LRUCache',
+        'LOCATION': 'api',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'MAX_BYTES': 16 * 1024 * 1024,
+        },
+    },
+}
+
+# The name of the cache in CACHES used for API results. Entries are
+# invalidated whenever contract data changes, so they don't need to
+# expire. Set this to None to disable caching of API results.
+API_CACHE = 'api'
+
+if is_running_tests():
+    # The cache lives in each process's memory, so results cached by
+    # one test would leak into the next. Tests that exercise caching
+    # re-enable it with override_settings().
+    API_CACHE = None
+
+# Whether to serve labor category autocomplete results from an index
+# kept in each worker's memory, rather than querying the database.
+API_AUTOCOMPLETE_IN_MEMORY = 'ENABLE_IN_MEMORY_AUTOCOMPLETE' in os.environ
+
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'WHITELIST': get_whitelisted_ips(),
@@ -280,6 +312,8 @@ if DEBUG and not HIDE_DEBUG_UI:
         'data_capture.schedules.fake_schedule.FakeSchedulePriceList',
     )
 
+DATA_CAPTURE_ASYNC_PARSING = 'ENABLE_ASYNC_PRICE_LIST_PARSING' in os.environ
+
 UAA_AUTH_URL = 'https://login.cloud.gov/oauth/authorize'
 
 UAA_TOKEN_URL = 'https://uaa.cloud.gov/oauth/token'
@@ -329,4 +363,5 @@ DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.logging.LoggingPanel',
     'debug_toolbar.panels.redirects.RedirectsPanel',
     'data_capture.panels.ScheduledJobsPanel',
+    'api.panels.ResultCachePanel',
 ]
@@ -14,5 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hourglass.settings")
 try:
     application = get_wsgi_application()
+
+    from django.conf import settings
+    if settings.API_AUTOCOMPLETE_IN_MEMORY:
+        from api.autocomplete import autocomplete_engine
+        autocomplete_engine.load()
 except Exception as e:
     print(e)